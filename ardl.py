@@ -2,31 +2,77 @@
 
 from __future__ import annotations
 
+import time
+
+_IMPORT_T0 = time.perf_counter()
+
+import itertools
 import json
-import math
-import pickle
-from typing import Dict, List
+import uuid
+from typing import Dict, List, Optional
 import os
 
 import numpy as np
 import pandas as pd
 import streamlit as st
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from streamlit.logger import get_logger
 
-import statsmodels.api as sm
-from statsmodels.stats.diagnostic import acorr_ljungbox, het_breuschpagan
-from statsmodels.stats.stattools import jarque_bera
+# statsmodels diagnostics, matplotlib (Styler gradients) and openpyxl (Excel
+# export) are imported on first use by the tabs that need them
 import base64
-import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from forecast_engine import (
+    INTERVAL_METHODS,
+    MC_MODES,
+    SWEEP_BANDS,
+    ForecastPaths,
+    head_shares,
+    scenario_grid,
+    total_paths,
+)
+from bundle_registry import BundleRegistry, RetiredVersion
+from derived_cache import DerivedCache, VersionUsers
+from history_buffer import HistoryBuffer
+from forecast_pool import ForecastPool, Prefetcher, default_workers
+from result_store import ResultStore
+from tax_forecaster import (
+    ARDL_VALIDATION_SIMS,
+    BUNDLE_NPZ,
+    BUNDLE_PKL,
+    DATA_CSV,
+    DEFAULT_EXOG_PARAMS,
+    META_JSON,
+    MC_DEFAULT_SEED,
+    TaxForecaster,
+    best_model_by_mape,
+    default_bundle_path,
+    perf_table,
+)
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_T0
+log = get_logger(__name__)
 
 
 # ═══════════════════════════════════════════════════════════════════════════
 # CONFIGURATION
 # ═══════════════════════════════════════════════════════════════════════════
-BUNDLE_PKL = "tax_models_bundle.pkl"
-META_JSON = "tax_models_meta.json"
-DATA_CSV = "tax_prepared_data.csv"
+RESULT_STORE_DB = os.environ.get("FORECAST_RESULT_DB", "forecast_results.sqlite")
+RESULT_STORE_MAX_BYTES = 256 * 1024 * 1024
+PREFETCH_THREADS = 4  # Shared background threads for tab prefetch
+PREFETCH_PER_SESSION = 2  # Max concurrent prefetch jobs per browser session
+FORECAST_POOL_WORKERS = int(os.environ.get("FORECAST_POOL_WORKERS", default_workers()))  # < 2 runs serially
+IMPORT_BUDGET_S = 2.0  # Cold import of this script's dependencies
+ASSET_LOAD_BUDGET_S = 6.0  # Cold bundle + history load, before first paint
+BUNDLE_POLL_SECONDS = float(os.environ.get("BUNDLE_POLL_SECONDS", 5))  # Artifact watch interval
+DERIVED_CACHE_ENTRIES = 512  # Forecasts, exog frames and sweeps shared across sessions
+ARDL_RLS_REFRESH = os.environ.get("ARDL_RLS_REFRESH", "0") == "1"  # Re-estimate ARDL on years past training
+DEFAULT_HORIZON = 5
+DEFAULT_SIMS = 250  # Lower default for faster initial load
+DEFAULT_MC_MODE = "lhs"
 
 TAX_LABELS = {
     "customs": "Customs Duty",
@@ -43,6 +89,29 @@ MODEL_LABELS = {
     "enet": "ElasticNet",
 }
 
+# Scenario inputs a sweep can vary, labelled as in the sidebar
+SCENARIO_DRIVER_LABELS = {
+    "gdp_nonagr_g": "Non-Agricultural GDP Growth (%)",
+    "lsm_g": "Large Scale Manufacturing (%)",
+    "cons_g": "Private Consumption Growth (%)",
+    "imports_g": "Total Imports Growth (%)",
+    "dutiable_g": "Dutiable Imports Growth (%)",
+    "exrate_g": "Exchange Rate Depreciation (%)",
+    "inflation_level": "Inflation Rate (%)",
+}
+
+# Attribution also covers the policy switches
+DRIVER_LABELS = {
+    **SCENARIO_DRIVER_LABELS,
+    "covid_on": "COVID-19 Impact",
+    "regime_on": "Tax Regime Change",
+}
+SCENARIO_TAB_KEYS = (  # Widget state kept while the (lazy) scenarios tab is hidden
+    "sweep_x_driver", "sweep_y_driver", "sweep_covid", "sweep_regime",
+    "sweep_year", "sweep_toggle", "attr_year",
+    *(f"sweep_{axis}_values_{driver}" for axis in "xy" for driver in SCENARIO_DRIVER_LABELS),
+)
+
 MODEL_ICONS = {
     "ardl": "📊",
     "arimax": "📈",
@@ -1526,83 +1595,170 @@ div.stDataFrame > div::-webkit-scrollbar-thumb:hover {
 # PERFORMANCE OPTIMIZATION - CACHING LAYER
 # ═══════════════════════════════════════════════════════════════════════════
 
-@st.cache_data(show_spinner=False, ttl=3600)  # Cache for 1 hour
+def base_dataset_fingerprint(bundle_version: str) -> str:
+    """Fingerprint of the on-disk history, hashed once per engine"""
+    return get_engine(bundle_version).dataset_fp
+
+
+# Every derived result is keyed by the bundle version and dataset version it
+# was computed from, and linked in the graph assets/dataset -> exog ->
+# per-head forecast -> total. Extending one session's history only creates
+# (and, once no session is left on it, invalidates) entries of that dataset version.
+@st.cache_resource(show_spinner=False)
+def get_derived_cache() -> DerivedCache:
+    """Process-wide cache of forecasts, exog and sweeps, shared by sessions"""
+    return DerivedCache(max_entries=DERIVED_CACHE_ENTRIES, ttl=3600)
+
+
+@st.cache_resource(show_spinner=False)
+def get_dataset_users() -> VersionUsers:
+    """Sessions per dataset version, shared by every session"""
+    return VersionUsers(ttl=3600)
+
+
+def use_dataset_version(bundle_version: str, dataset_version: str):
+    """Put this session on ``dataset_version`` and retire the one it left.
+
+    Dataset versions are content fingerprints, so sessions with identical
+    custom rows share one; it is only retired (derived entries and history
+    view dropped) once no session uses it, sessions idle for an hour
+    included. The base history is shared by every session and is never
+    retired here.
+    """
+    if 'session_key' not in st.session_state:
+        st.session_state.session_key = uuid.uuid4().hex
+    for left in get_dataset_users().use(st.session_state.session_key, dataset_version):
+        if left != base_dataset_fingerprint(bundle_version):
+            get_derived_cache().invalidate(("dataset", left))
+            get_registry().drop_history(left)
+
+
+def exog_node(bundle_version: str, dataset_version: str, head: str, horizon: int, exog_params_json: str):
+    """Graph node of one head's scenario exog"""
+    return get_derived_cache().node(
+        ("exog", bundle_version, dataset_version, head, horizon, exog_params_json),
+        [("assets", bundle_version), ("dataset", dataset_version)],
+    )
+
+
 def cached_build_future_exog(
-    df_hist_json: str,  # Pass JSON instead of DataFrame for hashability
+    bundle_version: str,
+    dataset_version: str,
+    head: str,
     horizon: int,
-    spec_x_tuple: tuple,  # Convert list to tuple for hashing
-    **kwargs
-) -> str:  # Return JSON instead of DataFrame
-    """Cached version of build_future_exog"""
-    df_hist = pd.read_json(df_hist_json)
-    df_hist.index = pd.PeriodIndex(df_hist.index, freq='Y')
-    result = build_future_exog(df_hist, horizon, list(spec_x_tuple), **kwargs)
-    return result.to_json()
+    exog_params_json: str,
+) -> pd.DataFrame:
+    """Cached scenario exog of one head, continuing the dataset version's history"""
+    return get_derived_cache().get(
+        exog_node(bundle_version, dataset_version, head, horizon, exog_params_json),
+        lambda: get_engine(bundle_version, dataset_version).future_exog(head, horizon, json.loads(exog_params_json)),
+    )
 
 
-@st.cache_data(show_spinner=False, ttl=3600, max_entries=20)
 def cached_forecast_single_category(
+    bundle_version: str,
+    dataset_version: str,
     model_kind: str,
     head: str,
     horizon: int,
     exog_params_json: str,  # JSON string of parameters
-    n_sims: int = 500
+    n_sims: int = 500,
+    mc_mode: str = "iid",
+    seed: int = MC_DEFAULT_SEED,
+    crn: bool = True,
+    interval_method: str = "bootstrap",
 ):
     """Cache individual category forecasts to avoid recalculation"""
-    # Parse parameters
-    exog_params = json.loads(exog_params_json)
-    
-    # Load data
-    bundle, _, df_hist = load_assets()
-    head_bundle = bundle["models"][head]
-    spec = head_bundle["spec"]
-    
-    # Build exog
-    exog_future_json = cached_build_future_exog(
-        df_hist.to_json(),
-        horizon,
-        tuple(spec["x"]),
-        **exog_params
+    return get_derived_cache().get(
+        ("forecast", bundle_version, dataset_version, model_kind, head, horizon, exog_params_json,
+         n_sims, mc_mode, seed, crn, interval_method),
+        lambda: get_engine(bundle_version, dataset_version).forecast_category(
+            model_kind, head, horizon, json.loads(exog_params_json), n_sims,
+            mc_mode=mc_mode, seed=seed, crn=crn, interval_method=interval_method,
+        ),
+        deps=[exog_node(bundle_version, dataset_version, head, horizon, exog_params_json)],
+    )
+
+
+def _head_paths_key(bundle_version, dataset_version, horizon, exog_params_json, n_sims, mc_mode, seed, crn):
+    return ("head_paths", bundle_version, dataset_version, horizon, exog_params_json, n_sims, mc_mode, seed, crn)
+
+
+def cached_head_paths(
+    bundle_version: str,
+    dataset_version: str,
+    horizon: int,
+    exog_params_json: str,
+    n_sims: int = 500,
+    mc_mode: str = "iid",
+    seed: int = MC_DEFAULT_SEED,
+    crn: bool = True,
+) -> Dict[str, ForecastPaths]:
+    """Best-model simulated paths per head; every total query derives from these"""
+    return get_derived_cache().get(
+        _head_paths_key(bundle_version, dataset_version, horizon, exog_params_json, n_sims, mc_mode, seed, crn),
+        lambda: get_engine(bundle_version, dataset_version).head_paths(
+            horizon, json.loads(exog_params_json), n_sims, mc_mode=mc_mode, seed=seed, crn=crn
+        ),
+        deps=[exog_node(bundle_version, dataset_version, h, horizon, exog_params_json) for h in TAX_LABELS],
     )
-    
-    # Get forecast
-    return get_cached_forecast(model_kind, head, horizon, exog_future_json, n_sims)
 
 
-@st.cache_data(show_spinner=False, ttl=3600)
 def cached_forecast_total_fast(
+    bundle_version: str,
+    dataset_version: str,
     horizon: int,
     exog_params_json: str,
-    n_sims: int = 500
+    n_sims: int = 500,
+    mc_mode: str = "iid",
+    seed: int = MC_DEFAULT_SEED,
+    crn: bool = True,
 ):
-    """Cached total forecast using best models"""
-    exog_params = json.loads(exog_params_json)
-    bundle, meta, df_hist = load_assets()
-    perf = perf_table(meta)
-    
-    # Get first head just for year index
-    first_head = list(TAX_LABELS.keys())[0]
-    hb = bundle["models"][first_head]
-    sp = hb["spec"]
-    ex_f_json = cached_build_future_exog(
-        df_hist.to_json(),
-        horizon,
-        tuple(sp["x"]),
-        **exog_params
+    """Cached total forecast using best models (joint path-wise bands)"""
+    parts_key = _head_paths_key(bundle_version, dataset_version, horizon, exog_params_json, n_sims, mc_mode, seed, crn)
+    return get_derived_cache().get(
+        ("total",) + parts_key[1:],
+        lambda: total_paths(cached_head_paths(
+            bundle_version, dataset_version, horizon, exog_params_json, n_sims, mc_mode=mc_mode, seed=seed, crn=crn,
+        ).values()).bands(),
+        deps=[parts_key],
     )
-    ex_f_template = pd.read_json(ex_f_json)
-    ex_f_template.index = pd.PeriodIndex(ex_f_template.index, freq='Y')
-    years = ex_f_template.index
-    
-    total = pd.DataFrame(0.0, index=years, columns=["yhat", "lo80", "hi80", "lo95", "hi95"])
-    
-    for h in TAX_LABELS.keys():
-        best = best_model_by_mape(perf, h)
-        forecast_json = json.dumps(exog_params)
-        s = cached_forecast_single_category(best, h, horizon, forecast_json, n_sims)
-        total = total + s
-    
-    return total
+
+
+def cached_scenario_sweep(
+    bundle_version: str,
+    dataset_version: str,
+    model_kind: str,
+    head: str,
+    horizon: int,
+    scenarios_json: str,  # JSON list of exog_params dicts
+    n_sims: int = 500,
+    mc_mode: str = "iid",
+    seed: int = MC_DEFAULT_SEED,
+    interval_method: str = "bootstrap",
+):
+    """Scenario x year x band cube (bands ordered as SWEEP_BANDS) and its years"""
+    return get_derived_cache().get(
+        ("sweep", bundle_version, dataset_version, model_kind, head, horizon, scenarios_json,
+         n_sims, mc_mode, seed, interval_method),
+        lambda: get_engine(bundle_version, dataset_version).sweep(
+            model_kind, head, horizon, json.loads(scenarios_json), n_sims,
+            mc_mode=mc_mode, seed=seed, interval_method=interval_method,
+        ),
+        deps=[("assets", bundle_version), ("dataset", dataset_version)],
+    )
+
+
+def cached_driver_attribution(
+    bundle_version: str, dataset_version: str, model_kind: str, head: str, horizon: int, exog_params_json: str
+):
+    """Per-driver contributions, Jacobians and +/-1pp swings for one head"""
+    return get_derived_cache().get(
+        ("attribution", bundle_version, dataset_version, model_kind, head, horizon, exog_params_json),
+        lambda: get_engine(bundle_version, dataset_version).attribution(model_kind, head, horizon, json.loads(exog_params_json)),
+        deps=[exog_node(bundle_version, dataset_version, head, horizon, exog_params_json)],
+    )
+
 
 # ═══════════════════════════════════════════════════════════════════════════
 # SIDEBAR LOGO INTEGRATION - PYTHON IMPLEMENTATION
@@ -1666,265 +1822,116 @@ st.sidebar.markdown(get_logo_html(), unsafe_allow_html=True)
 # ═══════════════════════════════════════════════════════════════════════════
 # DATA LOADING FUNCTIONS (ORIGINAL - UNCHANGED)
 # ═══════════════════════════════════════════════════════════════════════════
-def _to_year_index(df: pd.DataFrame) -> pd.DataFrame:
-    """Restore PeriodIndex from saved CSV index."""
-    out = df.copy()
-    try:
-        years = out.index.astype(str).str.extract(r"(\d{4})")[0].astype(int)
-        out.index = pd.PeriodIndex(years, freq="Y")
-    except Exception:
-        pass
-    return out
-
-
-@st.cache_data(show_spinner=False)
-def load_assets():
-    """Load all model artifacts and data"""
-    with open(BUNDLE_PKL, "rb") as f:
-        bundle = pickle.load(f)
-    with open(META_JSON, "r", encoding="utf-8") as f:
-        meta = json.load(f)
-    df = pd.read_csv(DATA_CSV, index_col=0)
-    df = _to_year_index(df)
-    
-    # Pre-calculate residuals for ENet to speed up bootstrap
-    for head, b in bundle["models"].items():
-        if "enet" in b:
-            model = b["enet"]["model"]
-            feat_cols = b["enet"]["feature_cols"]
-            y_name = b["spec"]["y"]
-            
-            train_resids = []
-            valid_hist = df.dropna(subset=[y_name]).index[2:]
-            for t in valid_hist:
-                row = {c: (df.loc[t, c[:-3]] if c.endswith("_L0") else 
-                          (df.shift(int(c.rsplit("_L", 1)[1])).loc[t, c.rsplit("_L", 1)[0]] 
-                           if "_L" in c else df.loc[t, c])) 
-                      for c in feat_cols}
-                try:
-                    pred = float(model.predict(pd.DataFrame([row], columns=feat_cols))[0])
-                    train_resids.append(df.loc[t, y_name] - pred)
-                except:
-                    continue
-            b["enet"]["residuals"] = train_resids if train_resids else [0.0]
+def load_assets(bundle_version: str):
+    """Load all model artifacts and data (shared, loaded once per engine)"""
+    engine = get_engine(bundle_version)
+    return engine.bundle, engine.meta, engine.df_hist
+
+
+@st.cache_resource(show_spinner=False)
+def startup_timings() -> Dict[str, float]:
+    """Cold-start timings of this server process, filled by the first run"""
+    return {}
+
+
+def report_startup(assets_s: float):
+    """Log the first run's import and asset-load times against their budgets"""
+    timings = startup_timings()
+    if timings:
+        return
+    timings.update(imports=IMPORT_SECONDS, assets=assets_s)
+    for name, took, budget in (("imports", IMPORT_SECONDS, IMPORT_BUDGET_S), ("assets", assets_s, ASSET_LOAD_BUDGET_S)):
+        if took > budget:
+            log.warning("cold start: %s took %.2fs (budget %.1fs)", name, took, budget)
+        else:
+            log.info("cold start: %s took %.2fs (budget %.1fs)", name, took, budget)
 
-    return bundle, meta, df
 
+# ═══════════════════════════════════════════════════════════════════════════
+# FORECASTING FUNCTIONS (ORIGINAL - UNCHANGED FROM WORKING CODE)
+# ═══════════════════════════════════════════════════════════════════════════
+@st.cache_resource(show_spinner=False)
+def get_result_store() -> ResultStore:
+    """Process-wide handle on the persistent forecast result store"""
+    return ResultStore(RESULT_STORE_DB, max_bytes=RESULT_STORE_MAX_BYTES)
 
-def perf_table(meta) -> pd.DataFrame:
-    """Extract performance metrics"""
-    return pd.DataFrame(meta["performance"])
 
+def make_forecast_pool(bundle_path: str):
+    """Warm worker pool over one bundle, or None when running serially"""
+    if FORECAST_POOL_WORKERS < 2:
+        return None
+    pool = ForecastPool(bundle_path, DATA_CSV, max_workers=FORECAST_POOL_WORKERS)
+    try:
+        pool.warm()
+    except BrokenProcessPool:
+        pool.shutdown()
+        return None
+    return pool
+
+
+@st.cache_resource(show_spinner=False)
+def get_prefetch_executor() -> ThreadPoolExecutor:
+    """Threads shared by every session's background prefetch"""
+    return ThreadPoolExecutor(max_workers=PREFETCH_THREADS, thread_name_prefix="prefetch")
+
+
+def make_engine() -> TaxForecaster:
+    """Forecasting core over the artifacts now on disk, with its own pool"""
+    bundle_path = default_bundle_path()
+    return TaxForecaster(
+        bundle_path, META_JSON, DATA_CSV,
+        store=get_result_store(),
+        pool=make_forecast_pool(bundle_path),
+        refresh_ardl=ARDL_RLS_REFRESH,
+    )
 
-def best_model_by_mape(perf: pd.DataFrame, head: str) -> str:
-    """Find best model by MAE%"""
-    sub = perf[perf["tax_head"] == head].sort_values("mae_pct")
-    return str(sub.iloc[0]["model"])
 
+def warm_engine(engine: TaxForecaster):
+    """Compute the default first paint into the result store before a swap"""
+    params = engine.exog_params()
+    engine.head_paths(DEFAULT_HORIZON, params, DEFAULT_SIMS, mc_mode=DEFAULT_MC_MODE)
+    for h in TAX_LABELS:
+        engine.forecast_category(
+            engine.best_model(h), h, DEFAULT_HORIZON, params, DEFAULT_SIMS,
+            mc_mode=DEFAULT_MC_MODE, interval_method=next(iter(INTERVAL_METHODS)),
+        )
 
-# ═══════════════════════════════════════════════════════════════════════════
-# SCENARIO BUILDING (ORIGINAL - UNCHANGED)
-# ═══════════════════════════════════════════════════════════════════════════
-def project_univariate(series: pd.Series, horizon: int) -> np.ndarray:
-    """Project using linear trend"""
-    y = series.values
-    x = np.arange(len(y)).reshape(-1, 1)
-    from sklearn.linear_model import LinearRegression
-    model = LinearRegression().fit(x, y)
-    fut_x = np.arange(len(y), len(y) + horizon).reshape(-1, 1)
-    return model.predict(fut_x)
-
-
-def build_future_exog(
-    df_hist: pd.DataFrame,
-    horizon: int,
-    spec_x: List[str],
-    gdp_nonagr_g: float,
-    lsm_g: float,
-    imports_g: float,
-    dutiable_g: float,
-    cons_g: float,
-    exrate_g: float,
-    inflation_level: float,
-    covid_on: bool,
-    regime_on: bool,
-    use_univariate: bool = False,
-) -> pd.DataFrame:
-    """Build future exogenous variables"""
-    g = {
-        "log_gdp_nonagr": gdp_nonagr_g / 100.0,
-        "log_lsm": lsm_g / 100.0,
-        "log_imports": imports_g / 100.0,
-        "log_dutiable_imports": dutiable_g / 100.0,
-        "log_consumption": cons_g / 100.0,
-        "log_exrate": exrate_g / 100.0,
-    }
 
-    last = df_hist.iloc[-1]
-    last_year = int(df_hist.index.max().year)
-    years = [last_year + i for i in range(1, horizon + 1)]
-    idx = pd.PeriodIndex(years, freq="Y")
-    
-    fut = pd.DataFrame(index=idx)
-    
-    # Project base variables
-    for col in g.keys():
-        if col in df_hist.columns:
-            if use_univariate:
-                fut[col] = project_univariate(df_hist[col], horizon)
-            else:
-                vals = []
-                cur = last[col]
-                for _ in range(horizon):
-                    cur = cur + np.log1p(g[col])
-                    vals.append(cur)
-                fut[col] = vals
-
-    fut["inflation"] = float(inflation_level)
-    fut["covid"] = 1 if covid_on else 0
-    fut["regime"] = 1 if regime_on else 0
-    
-    if "step_2024" in df_hist.columns:
-        fut["step_2024"] = 1
-    if "dummy_2024" in df_hist.columns:
-        fut["dummy_2024"] = 0
-    if "dummy_2025" in df_hist.columns:
-        fut["dummy_2025"] = 0
-
-    for c in spec_x:
-        if c not in fut.columns:
-            fut[c] = last[c] if c in last.index else 0
-            
-    return fut[spec_x].copy()
+@st.cache_resource(show_spinner=False)
+def get_registry() -> BundleRegistry:
+    """Process-wide engines; retrained artifacts are swapped in by a watcher"""
+    return BundleRegistry(
+        make_engine,
+        # The compact bundle is re-exported from these, so it is not watched itself
+        watch=[BUNDLE_PKL, META_JSON, DATA_CSV],
+        poll_interval=BUNDLE_POLL_SECONDS,
+        warm=warm_engine,
+        on_retire=lambda version: get_derived_cache().invalidate(("assets", version)),
+    ).start()
 
 
-# ═══════════════════════════════════════════════════════════════════════════
-# FORECASTING FUNCTIONS (ORIGINAL - UNCHANGED FROM WORKING CODE)
-# ═══════════════════════════════════════════════════════════════════════════
-@st.cache_data(show_spinner=False)
-def get_cached_forecast(model_kind, head, horizon, exog_future_json, n_sims=500):
-    """Generate forecast with uncertainty intervals - EXACT ORIGINAL LOGIC"""
-    b, _, df_hist = load_assets()
-    bundle_head = b["models"][head]
-    exog_future = pd.read_json(exog_future_json).sort_index()
-    exog_future.index = pd.PeriodIndex(exog_future.index, freq='Y')
-    
-    y_name = bundle_head["spec"]["y"]
-    
-    if model_kind == "ardl":
-        res = bundle_head["ardl"]["res"]
-        yhat_log = res.forecast(steps=horizon, exog=exog_future)
-        resid = res.resid.dropna().values
-        ar_params = [v for k, v in res.params.items() if k.startswith(y_name + ".L")]
-        
-        sims = []
-        for _ in range(n_sims):
-            noise_path = np.random.choice(resid, size=horizon, replace=True)
-            path_noise = np.zeros(horizon)
-            for i in range(horizon):
-                innovation = noise_path[i]
-                ar_cont = sum(coeff * path_noise[i-(p+1)] for p, coeff in enumerate(ar_params) if i-(p+1) >= 0)
-                path_noise[i] = ar_cont + innovation
-            sims.append(np.exp(yhat_log.values + path_noise))
-        
-        sims = np.array(sims)
-        return pd.DataFrame({
-            "yhat": np.exp(yhat_log.values),
-            "lo80": np.quantile(sims, 0.1, axis=0),
-            "hi80": np.quantile(sims, 0.9, axis=0),
-            "lo95": np.quantile(sims, 0.025, axis=0),
-            "hi95": np.quantile(sims, 0.975, axis=0)
-        }, index=exog_future.index)
-
-    elif model_kind == "arimax":
-        res = bundle_head["arimax"]["res"]
-        fc = res.get_forecast(steps=horizon, exog=exog_future)
-        yhat_log = fc.predicted_mean
-        ci80 = fc.conf_int(alpha=0.2)
-        ci95 = fc.conf_int(alpha=0.05)
-        return pd.DataFrame({
-            "yhat": np.exp(yhat_log.values),
-            "lo80": np.exp(ci80.iloc[:, 0].values),
-            "hi80": np.exp(ci80.iloc[:, 1].values),
-            "lo95": np.exp(ci95.iloc[:, 0].values),
-            "hi95": np.exp(ci95.iloc[:, 1].values)
-        }, index=exog_future.index)
-
-    elif model_kind == "enet":
-        model = bundle_head["enet"]["model"]
-        feat_cols = bundle_head["enet"]["feature_cols"]
-        train_resids = bundle_head["enet"]["residuals"]
-        
-        work_pt = pd.concat([df_hist, exog_future], axis=0)
-        preds_log = []
-        for t in exog_future.index:
-            row = {c: (work_pt.loc[t, c[:-3]] if c.endswith("_L0") else 
-                      (work_pt.shift(int(c.rsplit("_L", 1)[1])).loc[t, c.rsplit("_L", 1)[0]] 
-                       if "_L" in c else work_pt.loc[t, c])) 
-                  for c in feat_cols}
-            yhat_l = float(model.predict(pd.DataFrame([row], columns=feat_cols))[0])
-            preds_log.append(yhat_l)
-            work_pt.loc[t, y_name] = yhat_l
-        
-        sim_paths = []
-        for _ in range(n_sims):
-            path = []
-            work_sim = df_hist.copy()
-            for i, t in enumerate(exog_future.index):
-                ex_row = exog_future.iloc[i:i+1]
-                row = {c: (ex_row[c[:-3]].iloc[0] if c.endswith("_L0") else 
-                          (work_sim.shift(int(c.rsplit("_L", 1)[1])).iloc[-1][c.rsplit("_L", 1)[0]] 
-                           if "_L" in c else work_sim.iloc[-1][c])) 
-                      for c in feat_cols}
-                noisy_p = float(model.predict(pd.DataFrame([row], columns=feat_cols))[0]) + np.random.choice(train_resids)
-                path.append(math.exp(noisy_p))
-                new_row = pd.Series(index=df_hist.columns, dtype=float)
-                for c in exog_future.columns:
-                    new_row[c] = ex_row[c].iloc[0]
-                new_row[y_name] = noisy_p
-                work_sim = pd.concat([work_sim, new_row.to_frame().T], ignore_index=True)
-            sim_paths.append(path)
-        
-        sim_paths = np.array(sim_paths)
-        return pd.DataFrame({
-            "yhat": [math.exp(p) for p in preds_log],
-            "lo80": np.quantile(sim_paths, 0.1, axis=0),
-            "hi80": np.quantile(sim_paths, 0.9, axis=0),
-            "lo95": np.quantile(sim_paths, 0.025, axis=0),
-            "hi95": np.quantile(sim_paths, 0.975, axis=0)
-        }, index=exog_future.index)
-
-
-def forecast_total(horizon: int, bundle, exog_params, n_sims=500) -> pd.DataFrame:
-    """Aggregate forecast across all tax heads"""
-    _, _, df_hist = load_assets()
-    perf = perf_table(load_assets()[1])
-    
-    # Use first head just to get the year index
-    first_head = list(TAX_LABELS.keys())[0]
-    hb = bundle["models"][first_head]
-    sp = hb["spec"]
-    ex_f_template = build_future_exog(df_hist, horizon, sp["x"], **exog_params)
-    years = ex_f_template.index
-    
-    total = pd.DataFrame(0.0, index=years, columns=["yhat", "lo80", "hi80", "lo95", "hi95"])
-    
-    for h in TAX_LABELS.keys():
-        # Build exog specific to THIS tax head's spec
-        h_spec = bundle["models"][h]["spec"]
-        ex_f_h = build_future_exog(df_hist, horizon, h_spec["x"], **exog_params)
-        
-        best = best_model_by_mape(perf, h)
-        s = get_cached_forecast(best, h, horizon, ex_f_h.to_json(), n_sims=n_sims)
-        total = total + s
+def get_engine(bundle_version: Optional[str] = None, dataset_version: Optional[str] = None) -> TaxForecaster:
+    """Forecasting core of one bundle version (default: the newest).
 
-    return total
+    Each script run pins the version it started with, so a swap mid-run
+    never mixes models; cached results are keyed on that version. A
+    ``dataset_version`` other than the base history selects the session's
+    registered history view (custom rows). If the pinned version has been
+    retired meanwhile, the run starts over pinned to the current one.
+    """
+    try:
+        return get_registry().engine(bundle_version, dataset_version)
+    except RetiredVersion:
+        st.rerun()
+        raise  # outside a script run (prefetch threads) there is nothing to restart
 
 
 # ═══════════════════════════════════════════════════════════════════════════
 # DIAGNOSTICS (ORIGINAL - UNCHANGED)
 # ═══════════════════════════════════════════════════════════════════════════
 def _add_dual_jb(resid: pd.Series, out: Dict):
+    from statsmodels.stats.stattools import jarque_bera
+
     try:
         _, p_full, _, _ = jarque_bera(resid)
         out["jb_full_p"] = float(p_full)
@@ -1939,9 +1946,12 @@ def _add_dual_jb(resid: pd.Series, out: Dict):
 
 
 def diagnostics_ardl(res) -> Dict[str, object]:
+    from statsmodels.stats.diagnostic import acorr_ljungbox, het_breuschpagan
+    from statsmodels.stats.stattools import durbin_watson
+
     resid = pd.Series(res.resid).dropna()
     out: Dict[str, object] = {}
-    out["durbin_watson"] = float(sm.stats.stattools.durbin_watson(resid))
+    out["durbin_watson"] = float(durbin_watson(resid))
     
     try:
         lag = min(5, max(1, len(resid) // 5))
@@ -1967,11 +1977,14 @@ def diagnostics_ardl(res) -> Dict[str, object]:
 
 
 def diagnostics_arimax(res) -> Dict[str, object]:
+    from statsmodels.stats.diagnostic import acorr_ljungbox
+    from statsmodels.stats.stattools import durbin_watson
+
     resid = pd.Series(res.resid).dropna()
     out: Dict[str, object] = {}
     out["aic"] = float(res.aic)
     out["bic"] = float(res.bic) if hasattr(res, "bic") else None
-    out["durbin_watson"] = float(sm.stats.stattools.durbin_watson(resid))
+    out["durbin_watson"] = float(durbin_watson(resid))
 
     try:
         lag = min(5, max(1, len(resid) // 5))
@@ -1985,37 +1998,54 @@ def diagnostics_arimax(res) -> Dict[str, object]:
     return out
 
 
-def coef_table_ardl(res) -> pd.DataFrame:
-    params = res.params
-    bse = res.bse
-    pvalues = res.pvalues
+def compare_ardl_intervals(
+    bundle_version, dataset_version, head, horizon, exog_params_json, exog_future: pd.DataFrame, seed=MC_DEFAULT_SEED
+) -> pd.DataFrame:
+    """Analytic ARDL bands next to a large bootstrap reference, gaps in %"""
+    return get_derived_cache().get(
+        ("ardl_check", bundle_version, dataset_version, head, horizon, exog_params_json, seed),
+        lambda: get_engine(bundle_version, dataset_version).compare_ardl_intervals(head, horizon, exog_future, seed=seed),
+        deps=[exog_node(bundle_version, dataset_version, head, horizon, exog_params_json)],
+    )
+
+
+def fitted_results(bundle_version: str, head: str, model_kind: str):
+    """Full statsmodels results; a compact bundle loads its source pickle here"""
+    with st.spinner("Loading fitted model..."):
+        return get_engine(bundle_version).full_results(head, model_kind)
+
+
+def show_model_output(bundle_version: str, head: str, model_kind: str):
+    """Full summary expander; the results object is only loaded once opened"""
+    # Lazy expanders (key, on_change, .open) need Streamlit >= 1.55, like the tabs
+    box = st.expander("📋 Full Model Output", key=f"model_output_{head}_{model_kind}", on_change="rerun")
+    with box:
+        if box.open:
+            st.text(fitted_results(bundle_version, head, model_kind).summary().as_text())
+
+
+def coef_table_ardl(coefs: Dict) -> pd.DataFrame:
     return pd.DataFrame({
-        "term": params.index,
-        "coef": params.values,
-        "std_err": bse.values,
-        "p": pvalues.values
+        "term": coefs["term"],
+        "coef": coefs["coef"],
+        "std_err": coefs["std_err"],
+        "p": coefs["p"]
     })
 
 
-def coef_table_arimax(res) -> pd.DataFrame:
-    params = res.params
-    bse = res.bse
-    z = res.zvalues
-    p = res.pvalues
+def coef_table_arimax(coefs: Dict) -> pd.DataFrame:
     return pd.DataFrame({
-        "term": params.index,
-        "coef": params.values,
-        "std_err": bse.values,
-        "z": z.values,
-        "p": p.values
+        "term": coefs["term"],
+        "coef": coefs["coef"],
+        "std_err": coefs["std_err"],
+        "z": coefs["stat"],
+        "p": coefs["p"]
     })
 
 
 def coef_table_enet(bundle_head: Dict) -> pd.DataFrame:
-    model = bundle_head["enet"]["model"]
     feat_cols = bundle_head["enet"]["feature_cols"]
-    enet = model.named_steps["enet"]
-    coefs = enet.coef_
+    coefs = bundle_head["enet"]["kernel"].coef
     out = pd.DataFrame({"term": feat_cols, "coef": coefs})
     out["abs_coef"] = out["coef"].abs()
     out = out.sort_values("abs_coef", ascending=False).drop(columns=["abs_coef"])
@@ -2025,41 +2055,32 @@ def coef_table_enet(bundle_head: Dict) -> pd.DataFrame:
 # ═══════════════════════════════════════════════════════════════════════════
 # LOAD DATA
 # ═══════════════════════════════════════════════════════════════════════════
-if not os.path.exists(BUNDLE_PKL) or not os.path.exists(DATA_CSV) or not os.path.exists(META_JSON):
+if not (os.path.exists(BUNDLE_PKL) or os.path.exists(BUNDLE_NPZ)) or not os.path.exists(DATA_CSV) or not os.path.exists(META_JSON):
     st.error("⚠️ **Missing Required Files** • Please run 'train_tax_models.py' first to generate model artifacts.")
     st.stop()
 
-bundle, meta, df_hist = load_assets()
+_assets_t0 = time.perf_counter()
+bundle_version = get_engine().version  # pinned for the rest of this run
+bundle, meta, df_hist = load_assets(bundle_version)
+report_startup(time.perf_counter() - _assets_t0)
 perf = perf_table(meta)
 
-# Apply custom rows to df_hist if they exist in session state
-if 'custom_rows' in st.session_state and len(st.session_state.custom_rows) > 0:
-    # Show loading message
-    with st.spinner(f'Loading extended dataset with {len(st.session_state.custom_rows)} custom row(s)...'):
-        # Create a copy of the original dataframe
-        df_hist_extended = df_hist.copy()
-        
-        for custom_row in st.session_state.custom_rows:
-            year = custom_row['year']
-            data = custom_row['data']
-            
-            # Create new row with PeriodIndex
-            new_index = pd.PeriodIndex([year], freq='Y')
-            new_row_df = pd.DataFrame([data], index=new_index)
-            
-            # Ensure all columns are present
-            for col in df_hist_extended.columns:
-                if col not in new_row_df.columns:
-                    new_row_df[col] = df_hist_extended.iloc[-1][col]
-            
-            # Append to dataframe
-            df_hist_extended = pd.concat([df_hist_extended, new_row_df[df_hist_extended.columns]])
-        
-        # Sort by index
-        df_hist_extended = df_hist_extended.sort_index()
-        
-        # Replace df_hist with the extended version
-        df_hist = df_hist_extended
+# Session custom rows live in an append-only buffer over the base history;
+# the extended frame is rebuilt only when rows change (or the bundle swaps)
+if 'history_buffer' not in st.session_state:
+    st.session_state.history_buffer = HistoryBuffer(df_hist)
+history_buffer = st.session_state.history_buffer
+history_buffer.rebase(df_hist)
+
+# Dataset version: content fingerprint keying everything derived from df_hist.
+# Custom rows get their own engine view, so forecasts start from the extended history
+if len(history_buffer) > 0:
+    df_hist = history_buffer.frame()
+    df_hist_fp = history_buffer.fingerprint()
+    get_registry().with_history(df_hist, bundle_version, dataset_fp=df_hist_fp)
+else:
+    df_hist_fp = base_dataset_fingerprint(bundle_version)
+use_dataset_version(bundle_version, df_hist_fp)
 # ═══════════════════════════════════════════════════════════════════════════
 # SIDEBAR CONFIGURATION - ENHANCED STRUCTURE
 # ═══════════════════════════════════════════════════════════════════════════
@@ -2108,7 +2129,7 @@ with col1:
         "Horizon (Years)", 
         min_value=1, 
         max_value=10, 
-        value=5,
+        value=DEFAULT_HORIZON,
         help="Number of years to forecast"
     )
 with col2:
@@ -2117,10 +2138,42 @@ with col2:
 n_sims = st.sidebar.select_slider(
     "Uncertainty Simulations",
     options=[100, 250, 500, 1000],
-    value=250,  # Lower default for faster initial load
+    value=DEFAULT_SIMS,
     help="Higher values = better confidence intervals (slower computation). Use 100-250 for quick exploration, 500+ for final results."
 )
 
+interval_method = st.sidebar.selectbox(
+    "Interval Method",
+    options=list(INTERVAL_METHODS.keys()),
+    index=0,
+    format_func=lambda m: INTERVAL_METHODS[m],
+    help="How ARDL bands are computed. Analytic uses the closed-form AR forecast variance (no simulation) for instant interaction; switch to Bootstrap for final runs. ElasticNet always simulates."
+)
+
+mc_mode = st.sidebar.selectbox(
+    "Sampling Scheme",
+    options=list(MC_MODES.keys()),
+    index=list(MC_MODES.keys()).index(DEFAULT_MC_MODE),
+    format_func=lambda m: MC_MODES[m],
+    help="Variance-reduced resampling of model residuals. Latin hypercube reaches the band precision of plain sampling with far fewer simulations (see bench_mc_variance.py)."
+)
+
+col1, col2 = st.sidebar.columns([1, 1])
+with col1:
+    mc_seed = int(st.number_input(
+        "Random Seed",
+        min_value=0,
+        value=MC_DEFAULT_SEED,
+        step=1,
+        help="Root seed for the simulation streams. The same seed always reproduces the same bands."
+    ))
+with col2:
+    use_crn = st.checkbox(
+        "🎲 Common Random Numbers",
+        value=True,
+        help="Reuse the same random draws across scenarios so differences between scenarios reflect assumptions, not simulation noise"
+    )
+
 use_univariate = st.sidebar.checkbox(
     "📈 Use Trend Projection",
     value=(head == "fed"),
@@ -2135,21 +2188,21 @@ with st.sidebar.expander("📈 Economic Growth Assumptions", expanded=True):
     
     gdp_nonagr_g = st.number_input(
         "Non-Agricultural GDP Growth (%)", 
-        value=12.0, 
+        value=DEFAULT_EXOG_PARAMS["gdp_nonagr_g"], 
         step=0.5,
         help="Expected annual growth in non-agricultural GDP"
     )
     
     lsm_g = st.number_input(
         "Large Scale Manufacturing (%)", 
-        value=10.0, 
+        value=DEFAULT_EXOG_PARAMS["lsm_g"], 
         step=0.5,
         help="LSM index growth rate"
     )
     
     cons_g = st.number_input(
         "Private Consumption Growth (%)", 
-        value=12.0, 
+        value=DEFAULT_EXOG_PARAMS["cons_g"], 
         step=0.5,
         help="Expected growth in consumer spending"
     )
@@ -2158,21 +2211,21 @@ with st.sidebar.expander("📈 Economic Growth Assumptions", expanded=True):
     
     imports_g = st.number_input(
         "Total Imports Growth (%)", 
-        value=10.0, 
+        value=DEFAULT_EXOG_PARAMS["imports_g"], 
         step=0.5,
         help="Expected growth in import volumes"
     )
     
     dutiable_g = st.number_input(
         "Dutiable Imports Growth (%)", 
-        value=10.0, 
+        value=DEFAULT_EXOG_PARAMS["dutiable_g"], 
         step=0.5,
         help="Growth in imports subject to customs duty"
     )
     
     exrate_g = st.number_input(
         "Exchange Rate Depreciation (%)", 
-        value=8.0, 
+        value=DEFAULT_EXOG_PARAMS["exrate_g"], 
         step=0.5,
         help="Expected annual PKR depreciation vs USD"
     )
@@ -2192,13 +2245,13 @@ with st.sidebar.expander("🎚️ Policy & Structural Factors", expanded=False):
     
     covid_on = st.checkbox(
         "COVID-19 Impact Active",
-        value=False,
+        value=DEFAULT_EXOG_PARAMS["covid_on"],
         help="Include COVID-19 pandemic effects in forecast"
     )
     
     regime_on = st.checkbox(
         "Tax Regime Change Active",
-        value=True,
+        value=DEFAULT_EXOG_PARAMS["regime_on"],
         help="Account for structural tax policy changes"
     )
     
@@ -2218,13 +2271,13 @@ end_year = int(df_hist.index.max().year)
 n_observations = len(df_hist)
 
 # Check if custom rows are active
-custom_rows_active = 'custom_rows' in st.session_state and len(st.session_state.custom_rows) > 0
+custom_rows_active = len(history_buffer) > 0
 
 if custom_rows_active:
     # Extended dataset
     original_end = meta['data_span']['end']
     original_n = meta['data_span']['n']
-    n_custom = len(st.session_state.custom_rows)
+    n_custom = len(history_buffer)
     
     st.sidebar.success(f"""
 **Extended Dataset** 🔄
@@ -2292,6 +2345,22 @@ exog_params = {
 
 # Serialised once here so every downstream block (including tab2) can use it
 exog_params_json = json.dumps(exog_params)
+
+# Warm the "All Categories" tab in the background while tab 1 renders; a
+# changed scenario cancels the previous session's queued prefetch
+if 'prefetcher' not in st.session_state:
+    st.session_state.prefetcher = Prefetcher(get_prefetch_executor(), PREFETCH_PER_SESSION)
+st.session_state.prefetcher.start(
+    (bundle_version, df_hist_fp, chosen, horizon, n_sims, interval_method, mc_mode, mc_seed, use_crn, exog_params_json),
+    {
+        h: partial(
+            cached_forecast_single_category,
+            bundle_version, df_hist_fp, chosen, h, horizon, exog_params_json, n_sims,
+            mc_mode=mc_mode, seed=mc_seed, crn=use_crn, interval_method=interval_method,
+        )
+        for h in TAX_LABELS.keys() if h != head
+    },
+)
 # ═══════════════════════════════════════════════════════════════════════════
 # LOADING STATE MANAGEMENT
 # ═══════════════════════════════════════════════════════════════════════════
@@ -2299,7 +2368,7 @@ exog_params_json = json.dumps(exog_params)
 if 'last_params' not in st.session_state:
     st.session_state.last_params = None
 
-current_params = (head, model_choice, horizon, n_sims, json.dumps(exog_params, sort_keys=True))
+current_params = (head, model_choice, horizon, n_sims, interval_method, mc_mode, mc_seed, use_crn, json.dumps(exog_params, sort_keys=True))
 
 if st.session_state.last_params != current_params:
     with st.spinner('🔄 Recalculating forecasts with new parameters...'):
@@ -2313,7 +2382,7 @@ if 'computed_forecasts' not in st.session_state:
     st.session_state.computed_forecasts = {}
 
 # Create a hash of current parameters for caching
-param_hash = f"{head}_{chosen}_{horizon}_{n_sims}_{hash(json.dumps(exog_params, sort_keys=True))}"
+param_hash = f"{bundle_version}_{df_hist_fp}_{head}_{chosen}_{horizon}_{n_sims}_{interval_method}_{mc_mode}_{mc_seed}_{use_crn}_{hash(json.dumps(exog_params, sort_keys=True))}"
 
 # Check if we've already computed this exact configuration
 if param_hash in st.session_state.computed_forecasts:
@@ -2322,20 +2391,18 @@ if param_hash in st.session_state.computed_forecasts:
 else:
     # Compute fresh - use cached functions
     exog_params_json = json.dumps(exog_params)
-    fore = cached_forecast_single_category(chosen, head, horizon, exog_params_json, n_sims)
+    fore = cached_forecast_single_category(
+        bundle_version, df_hist_fp, chosen, head, horizon, exog_params_json, n_sims, mc_mode=mc_mode, seed=mc_seed, crn=use_crn,
+        interval_method=interval_method,
+    )
     
     # Get exog for display purposes only
-    exog_future_json = cached_build_future_exog(
-        df_hist.to_json(),
-        horizon,
-        tuple(x_cols),
-        **exog_params
-    )
-    exog_future = pd.read_json(exog_future_json)
-    exog_future.index = pd.PeriodIndex(exog_future.index, freq='Y')
+    exog_future = cached_build_future_exog(bundle_version, df_hist_fp, head, horizon, exog_params_json)
     
     # Calculate total forecast
-    total_fore = cached_forecast_total_fast(horizon, exog_params_json, n_sims)
+    total_fore = cached_forecast_total_fast(
+        bundle_version, df_hist_fp, horizon, exog_params_json, n_sims, mc_mode=mc_mode, seed=mc_seed, crn=use_crn
+    )
     
     # Store in session state cache (keep only last 5 configs to manage memory)
     if len(st.session_state.computed_forecasts) > 5:
@@ -2450,16 +2517,27 @@ st.markdown('</div>', unsafe_allow_html=True)
 # ═══════════════════════════════════════════════════════════════════════════
 # MAIN CONTENT TABS
 # ═══════════════════════════════════════════════════════════════════════════
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+# Lazy tabs: only the selected tab's body runs, so a first paint never pays
+# for diagnostics, Styler gradients or exports it does not show
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
     "📊 Forecast Plots",
     "🎯 All Categories",
     "📈 Model Accuracy",
     "⚙️ Model Summary",
     "🔬 Diagnostics",
-    "💾 Data Preview"
-])
+    "💾 Data Preview",
+    "🧪 Scenarios & Drivers"
+], key="main_tabs", on_change="rerun")
 
-with tab1:
+# Widgets of a tab that does not render would have their state dropped
+if not tab7.open:
+    for key in SCENARIO_TAB_KEYS:
+        if key in st.session_state:
+            st.session_state[key] = st.session_state[key]
+
+
+def render_tab1():
+    """Forecast Plots tab"""
     # Total Revenue
     st.markdown("""
     <div class="content-section">
@@ -2472,12 +2550,12 @@ with tab1:
         </div>
     </div>
     """, unsafe_allow_html=True)
-    
+
     fig_total = go.Figure()
-    
+
     x_hist = total_hist.index.to_timestamp()
     x_fore = total_fore.index.to_timestamp()
-    
+
     fig_total.add_trace(go.Scatter(
         x=x_hist,
         y=total_hist.values / 1000,
@@ -2487,27 +2565,27 @@ with tab1:
         fill='tozeroy',
         fillcolor='rgba(37, 99, 235, 0.06)'
     ))
-    
+
     fig_total.add_trace(go.Scatter(
         x=np.concatenate([x_fore, x_fore[::-1]]),
         y=np.concatenate([total_fore["hi95"]/1000, total_fore["lo95"][::-1]/1000]),
         fill='toself',
         fillcolor='rgba(139, 92, 246, 0.1)',
         line=dict(color='rgba(255,255,255,0)'),
-        name="95% CI",
+        name="95% CI (independent heads)",
         showlegend=True
     ))
-    
+
     fig_total.add_trace(go.Scatter(
         x=np.concatenate([x_fore, x_fore[::-1]]),
         y=np.concatenate([total_fore["hi80"]/1000, total_fore["lo80"][::-1]/1000]),
         fill='toself',
         fillcolor='rgba(139, 92, 246, 0.2)',
         line=dict(color='rgba(255,255,255,0)'),
-        name="80% CI",
+        name="80% CI (independent heads)",
         showlegend=True
     ))
-    
+
     fig_total.add_trace(go.Scatter(
         x=x_fore,
         y=total_fore["yhat"] / 1000,
@@ -2516,7 +2594,7 @@ with tab1:
         line=dict(color='#8B5CF6', width=3.5, dash='dash'),
         marker=dict(size=9, color='#8B5CF6', line=dict(width=2, color='white'))
     ))
-    
+
     fig_total.update_layout(
         height=460,
         margin=dict(l=0, r=0, t=20, b=0),
@@ -2527,10 +2605,54 @@ with tab1:
         xaxis=dict(title="Year", showgrid=True, gridcolor='rgba(0,0,0,0.03)'),
         yaxis=dict(title="Revenue (PKR Billion)", showgrid=True, gridcolor='rgba(0,0,0,0.03)')
     )
-    
+
     st.plotly_chart(fig_total, use_container_width=True)
+    st.caption(
+        "Bands assume the tax heads' forecast errors are independent (each head is simulated "
+        "on its own random stream). The heads share macro drivers, so their errors are likely "
+        "positively correlated and the total bands are probably too narrow."
+    )
+
+    # Path-level queries on the stored simulations (no re-simulation)
+    head_paths = cached_head_paths(
+        bundle_version, df_hist_fp, horizon, exog_params_json, n_sims, mc_mode=mc_mode, seed=mc_seed, crn=use_crn
+    )
+    all_paths = total_paths(head_paths.values())
+    col_target, col_share = st.columns([1, 1], gap="medium")
+    with col_target:
+        st.markdown("#### 🎯 Revenue Target Probability")
+        target_b = st.number_input(
+            "Total revenue target (PKR Billion)",
+            min_value=0.0,
+            value=float(round(total_fore["yhat"].iloc[-1] / 1000, -1)),
+            step=100.0,
+            help="Probability that aggregate revenue exceeds this level, from the joint simulated paths"
+        )
+        p_exceed = all_paths.prob_exceed(target_b * 1000)
+        # column_config rather than Styler: Styler pulls in matplotlib
+        st.dataframe(
+            pd.DataFrame({
+                "year": all_paths.years,
+                "P(total > target)": 100 * p_exceed,
+            }),
+            column_config={"P(total > target)": st.column_config.NumberColumn(format="%.1f%%")},
+            use_container_width=True,
+            hide_index=True
+        )
+    with col_share:
+        st.markdown(f"#### 🧩 Head Shares • FY {all_paths.years[-1]}")
+        shares = head_shares(head_paths)
+        shares["head"] = shares["head"].map(TAX_LABELS)
+        share_cols = ["share_mean", "share_lo80", "share_hi80"]
+        shares[share_cols] *= 100
+        st.dataframe(
+            shares,
+            column_config={c: st.column_config.NumberColumn(format="%.1f%%") for c in share_cols},
+            use_container_width=True,
+            hide_index=True
+        )
     st.markdown('</div>', unsafe_allow_html=True)
-    
+
     # Category Forecast
     st.markdown(f"""
     <div class="content-section">
@@ -2542,12 +2664,12 @@ with tab1:
             <div class="section-badge">{MODEL_ICONS.get(chosen, '📊')} {chosen.upper()}</div>
         </div>
     """, unsafe_allow_html=True)
-    
+
     fig_cat = go.Figure()
-    
+
     x_hist_cat = hist_level.index.to_timestamp()
     x_fore_cat = fore.index.to_timestamp()
-    
+
     fig_cat.add_trace(go.Scatter(
         x=x_hist_cat,
         y=hist_level.values / 1000,
@@ -2557,7 +2679,7 @@ with tab1:
         fill='tozeroy',
         fillcolor='rgba(37, 99, 235, 0.06)'
     ))
-    
+
     fig_cat.add_trace(go.Scatter(
         x=np.concatenate([x_fore_cat, x_fore_cat[::-1]]),
         y=np.concatenate([fore["hi95"]/1000, fore["lo95"][::-1]/1000]),
@@ -2566,7 +2688,7 @@ with tab1:
         line=dict(color='rgba(255,255,255,0)'),
         name="95% CI"
     ))
-    
+
     fig_cat.add_trace(go.Scatter(
         x=np.concatenate([x_fore_cat, x_fore_cat[::-1]]),
         y=np.concatenate([fore["hi80"]/1000, fore["lo80"][::-1]/1000]),
@@ -2575,7 +2697,7 @@ with tab1:
         line=dict(color='rgba(255,255,255,0)'),
         name="80% CI"
     ))
-    
+
     fig_cat.add_trace(go.Scatter(
         x=x_fore_cat,
         y=fore["yhat"] / 1000,
@@ -2584,7 +2706,7 @@ with tab1:
         line=dict(color='#8B5CF6', width=3.5, dash='dash'),
         marker=dict(size=9, color='#8B5CF6', line=dict(width=2, color='white'))
     ))
-    
+
     fig_cat.update_layout(
         height=420,
         margin=dict(l=0, r=0, t=10, b=0),
@@ -2595,10 +2717,10 @@ with tab1:
         xaxis=dict(title="Year", showgrid=True, gridcolor='rgba(0,0,0,0.03)'),
         yaxis=dict(title="Revenue (PKR Billion)", showgrid=True, gridcolor='rgba(0,0,0,0.03)')
     )
-    
+
     st.plotly_chart(fig_cat, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
-    
+
     # Forecast Table
     st.markdown("""
     <div class="content-section">
@@ -2609,20 +2731,26 @@ with tab1:
             </div>
         </div>
     """, unsafe_allow_html=True)
-    
+
     show_table = fore.copy()
+    show_table["Forecast"] = show_table["yhat"].map(lambda x: f"₨{x/1000:,.2f}B")
     show_table["80% interval"] = show_table.apply(lambda r: f"[{r.lo80/1000:,.2f}, {r.hi80/1000:,.2f}]", axis=1)
     show_table["95% interval"] = show_table.apply(lambda r: f"[{r.lo95/1000:,.2f}, {r.hi95/1000:,.2f}]", axis=1)
-    
+
     st.dataframe(
-        show_table[["yhat", "80% interval", "95% interval"]].rename(columns={"yhat": "Forecast"}).style.format({"Forecast": lambda x: f"₨{x/1000:,.2f}B"}),
+        show_table[["Forecast", "80% interval", "95% interval"]],
         use_container_width=True
     )
     st.markdown('</div>', unsafe_allow_html=True)
 
 
+with tab1:
+    if tab1.open:
+        render_tab1()
 
-with tab2:
+
+def render_tab2():
+    """All Categories tab"""
     st.markdown(f"""
     <div class="content-section">
         <div class="section-header">
@@ -2633,7 +2761,7 @@ with tab2:
             <div class="section-badge">{MODEL_ICONS.get(chosen, '📊')} {chosen.upper()}</div>
         </div>
     """, unsafe_allow_html=True)
-    
+
     # Add custom CSS for compact metrics with better overflow handling
     st.markdown("""
 <style>
@@ -2671,21 +2799,21 @@ div[data-testid="stMetric"] [data-testid="stMetricDelta"] {
 }
 </style>
 """, unsafe_allow_html=True)
-    
+
     # Initialize progress bar
     progress_bar = st.progress(0, text="Loading category forecasts...")
-    
+
     # Create a 2-column grid for all tax categories
     num_cols = 2
     total_categories = len(TAX_LABELS)
-    
+
     for i in range(0, total_categories, num_cols):
         # Update progress bar
         progress_bar.progress(
             min(1.0, (i + num_cols) / total_categories),
             text=f"Loading {min(i + num_cols, total_categories)}/{total_categories} categories..."
         )
-        
+    
         cols = st.columns(num_cols, gap="medium")
         for j in range(num_cols):
             if i + j < total_categories:
@@ -2695,21 +2823,25 @@ div[data-testid="stMetric"] [data-testid="stMetricDelta"] {
                     cat_bundle = bundle["models"][cat_head]
                     cat_spec = cat_bundle["spec"]
                     cat_y_name = cat_spec["y"]
-                    
+                
                     # Use cached forecast function
-                    cat_fore = cached_forecast_single_category(chosen, cat_head, horizon, exog_params_json, n_sims)
+                    cat_fore = cached_forecast_single_category(
+                        bundle_version, df_hist_fp, chosen, cat_head, horizon, exog_params_json, n_sims,
+                        mc_mode=mc_mode, seed=mc_seed, crn=use_crn,
+                        interval_method=interval_method,
+                    )
                     cat_hist_level = np.exp(df_hist[cat_y_name])
-                    
+                
                     # Calculate metrics
                     cat_hist_last = cat_hist_level.iloc[-1] / 1000
                     cat_fore_last = cat_fore["yhat"].iloc[-1] / 1000
                     cat_growth = ((cat_fore_last * 1000) / (cat_hist_last * 1000) - 1) * 100
                     cat_cagr = (((cat_fore_last * 1000) / (cat_hist_last * 1000)) ** (1/horizon) - 1) * 100
-                    
+                
                     # Get model accuracy
                     cat_mae = perf[(perf["tax_head"] == cat_head) & (perf["model"] == chosen)]["mae_pct"].values
                     cat_mae_display = f"{cat_mae[0]:.2f}%" if len(cat_mae) > 0 else "N/A"
-                    
+                
                     # Category title
                     st.markdown(f"""
                     <div style="
@@ -2724,7 +2856,7 @@ div[data-testid="stMetric"] [data-testid="stMetricDelta"] {
                         {TAX_LABELS[cat_head]}
                     </div>
                     """, unsafe_allow_html=True)
-                    
+                
                     # Metrics in 2 rows of 2 columns for better space utilization
                     metric_row1 = st.columns(2)
                     with metric_row1[0]:
@@ -2737,7 +2869,7 @@ div[data-testid="stMetric"] [data-testid="stMetricDelta"] {
                             label="Target",
                             value=f"₨{cat_fore_last:.1f}B"
                         )
-                    
+                
                     metric_row2 = st.columns(2)
                     with metric_row2[0]:
                         st.metric(
@@ -2750,7 +2882,7 @@ div[data-testid="stMetric"] [data-testid="stMetricDelta"] {
                             label="CAGR",
                             value=f"{cat_cagr:+.1f}%"
                         )
-                    
+                
                     # Compact info row
                     st.markdown(f"""
                     <div style="
@@ -2774,13 +2906,13 @@ div[data-testid="stMetric"] [data-testid="stMetricDelta"] {
                         ">MAE: {cat_mae_display}</span>
                     </div>
                     """, unsafe_allow_html=True)
-                    
+                
                     # Create chart
                     fig_cat = go.Figure()
-                    
+                
                     x_hist_cat = cat_hist_level.index.to_timestamp()
                     x_fore_cat = cat_fore.index.to_timestamp()
-                    
+                
                     fig_cat.add_trace(go.Scatter(
                         x=x_hist_cat,
                         y=cat_hist_level.values / 1000,
@@ -2790,7 +2922,7 @@ div[data-testid="stMetric"] [data-testid="stMetricDelta"] {
                         fill='tozeroy',
                         fillcolor='rgba(37, 99, 235, 0.06)'
                     ))
-                    
+                
                     fig_cat.add_trace(go.Scatter(
                         x=np.concatenate([x_fore_cat, x_fore_cat[::-1]]),
                         y=np.concatenate([cat_fore["hi95"]/1000, cat_fore["lo95"][::-1]/1000]),
@@ -2800,7 +2932,7 @@ div[data-testid="stMetric"] [data-testid="stMetricDelta"] {
                         name="95% CI",
                         showlegend=False
                     ))
-                    
+                
                     fig_cat.add_trace(go.Scatter(
                         x=np.concatenate([x_fore_cat, x_fore_cat[::-1]]),
                         y=np.concatenate([cat_fore["hi80"]/1000, cat_fore["lo80"][::-1]/1000]),
@@ -2810,7 +2942,7 @@ div[data-testid="stMetric"] [data-testid="stMetricDelta"] {
                         name="80% CI",
                         showlegend=False
                     ))
-                    
+                
                     fig_cat.add_trace(go.Scatter(
                         x=x_fore_cat,
                         y=cat_fore["yhat"] / 1000,
@@ -2819,7 +2951,7 @@ div[data-testid="stMetric"] [data-testid="stMetricDelta"] {
                         line=dict(color='#8B5CF6', width=3, dash='dash'),
                         marker=dict(size=7, color='#8B5CF6', line=dict(width=2, color='white'))
                     ))
-                    
+                
                     fig_cat.update_layout(
                         height=300,
                         margin=dict(l=0, r=0, t=10, b=0),
@@ -2829,7 +2961,7 @@ div[data-testid="stMetric"] [data-testid="stMetricDelta"] {
                         xaxis=dict(title="Year", showgrid=True, gridcolor='rgba(0,0,0,0.03)', title_font=dict(size=10)),
                         yaxis=dict(title="PKR Billion", showgrid=True, gridcolor='rgba(0,0,0,0.03)', title_font=dict(size=10))
                     )
-                    
+                
                     st.plotly_chart(fig_cat, use_container_width=True, config={
                         'displayModeBar': True,
                         'displaylogo': False,
@@ -2841,15 +2973,23 @@ div[data-testid="stMetric"] [data-testid="stMetricDelta"] {
                             'scale': 2
                         }
                     })
-                    
+                
                     # Small separator
                     st.markdown("<div style='margin: 1.5rem 0; border-bottom: 1px solid #E5E7EB;'></div>", unsafe_allow_html=True)
-    
+
     # Clear progress bar when done
     progress_bar.empty()
-    
+
     st.markdown('</div>', unsafe_allow_html=True)
-with tab3:
+
+
+with tab2:
+    if tab2.open:
+        render_tab2()
+
+
+def render_tab3():
+    """Model Accuracy tab"""
     st.markdown("""
     <div class="content-section">
         <div class="section-header">
@@ -2859,9 +2999,9 @@ with tab3:
             </div>
         </div>
     """, unsafe_allow_html=True)
-    
+
     perf_sub = perf[perf["tax_head"] == head].sort_values("mae_pct")
-    
+
     st.dataframe(
         perf_sub[["model", "mae_pct", "rmse_pct", "n_test"]].style.format({
             "mae_pct": "{:.2f}%",
@@ -2871,9 +3011,9 @@ with tab3:
         use_container_width=True,
         hide_index=True
     )
-    
+
     st.markdown('</div>', unsafe_allow_html=True)
-    
+
     # Accuracy Visualization
     st.markdown("""
     <div class="content-section">
@@ -2884,11 +3024,11 @@ with tab3:
             </div>
         </div>
     """, unsafe_allow_html=True)
-    
+
     fig_acc = go.Figure()
-    
+
     colors = ['#14B8A6' if m == chosen else '#9CA3AF' for m in perf_sub["model"]]
-    
+
     fig_acc.add_trace(go.Bar(
         x=perf_sub["model"],
         y=perf_sub["mae_pct"],
@@ -2896,7 +3036,7 @@ with tab3:
         text=perf_sub["mae_pct"].apply(lambda x: f"{x:.2f}%"),
         textposition='outside'
     ))
-    
+
     fig_acc.update_layout(
         height=350,
         margin=dict(l=0, r=0, t=10, b=0),
@@ -2906,11 +3046,18 @@ with tab3:
         xaxis=dict(title="Model", showgrid=False),
         yaxis=dict(title="MAE%", showgrid=True, gridcolor='rgba(0,0,0,0.03)')
     )
-    
+
     st.plotly_chart(fig_acc, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
-with tab4:
+
+with tab3:
+    if tab3.open:
+        render_tab3()
+
+
+def render_tab4():
+    """Model Summary tab"""
     st.markdown(f"""
     <div class="content-section">
         <div class="section-header">
@@ -2920,12 +3067,10 @@ with tab4:
             </div>
         </div>
     """, unsafe_allow_html=True)
-    
+
     if chosen == "ardl":
-        res = head_bundle["ardl"]["res"]
-        
         st.markdown("#### 📊 Coefficient Estimates")
-        coef = coef_table_ardl(res)
+        coef = coef_table_ardl(head_bundle["ardl"]["coefficients"])
         st.dataframe(
             coef.style.format({
                 "coef": "{:.4f}",
@@ -2935,12 +3080,12 @@ with tab4:
             use_container_width=True,
             hide_index=True
         )
-        
+    
         st.markdown("#### 📈 Long-Run Elasticities (ECM)")
-        vals = res.params
+        vals = head_bundle["ardl"]["kernel"].coef
         rho_sum = sum(vals[vals.index.str.startswith(f"{y_name}.L")])
         denom = 1.0 - rho_sum
-        
+    
         lr_rows = []
         for x_col in spec["x"]:
             gamma_sum = sum(vals[vals.index.str.startswith(f"{x_col}.L")])
@@ -2948,22 +3093,19 @@ with tab4:
                 "variable": x_col,
                 "elasticity": gamma_sum / denom if abs(denom) > 1e-4 else 0
             })
-        
+    
         st.markdown(f"**Error Correction Speed:** `{rho_sum - 1.0:.4f}`")
         st.dataframe(
             pd.DataFrame(lr_rows).style.format({"elasticity": "{:.3f}"}),
             use_container_width=True,
             hide_index=True
         )
-        
-        with st.expander("📋 Full Model Output"):
-            st.text(res.summary().as_text())
     
+        show_model_output(bundle_version, head, "ardl")
+
     elif chosen == "arimax":
-        res = head_bundle["arimax"]["res"]
-        
         st.markdown("#### 📊 Coefficient Estimates")
-        coef = coef_table_arimax(res)
+        coef = coef_table_arimax(head_bundle["arimax"]["coefficients"])
         st.dataframe(
             coef.style.format({
                 "coef": "{:.4f}",
@@ -2974,10 +3116,9 @@ with tab4:
             use_container_width=True,
             hide_index=True
         )
-        
-        with st.expander("📋 Full Model Output"):
-            st.text(res.summary().as_text())
     
+        show_model_output(bundle_version, head, "arimax")
+
     else:  # ElasticNet
         st.markdown("#### 📊 ElasticNet Coefficients")
         coef = coef_table_enet(head_bundle)
@@ -2986,13 +3127,20 @@ with tab4:
             use_container_width=True,
             hide_index=True
         )
-        
+    
         st.markdown("#### ⚙️ Model Settings")
         st.json(head_bundle["enet"].get("params", {}))
-    
+
     st.markdown('</div>', unsafe_allow_html=True)
 
-with tab5:
+
+with tab4:
+    if tab4.open:
+        render_tab4()
+
+
+def render_tab5():
+    """Diagnostics tab"""
     st.markdown(f"""
     <div class="content-section">
         <div class="section-header">
@@ -3002,23 +3150,23 @@ with tab5:
             </div>
         </div>
     """, unsafe_allow_html=True)
-    
+
     if chosen == "ardl":
-        res = head_bundle["ardl"]["res"]
+        res = fitted_results(bundle_version, head, "ardl")
         diag = diagnostics_ardl(res)
-        
+    
         col1, col2, col3, col4, col5 = st.columns(5)
         col1.metric("Durbin-Watson", f"{diag['durbin_watson']:.2f}")
         col2.metric("Ljung-Box p", "N/A" if diag["ljung_box_p"] is None else f"{diag['ljung_box_p']:.3f}")
         col3.metric("Jarque-Bera p", "N/A" if diag["jb_full_p"] is None else f"{diag['jb_full_p']:.3f}")
         col4.metric("JB Trimmed p", "N/A" if diag["jb_trim_p"] is None else f"{diag['jb_trim_p']:.3f}")
         col5.metric("Breusch-Pagan p", "N/A" if diag["breusch_pagan_p"] is None else f"{diag['breusch_pagan_p']:.3f}")
-        
+    
         st.markdown("#### 📉 Residual Plot")
         resid = pd.Series(res.resid).dropna()
         ridx = df_hist.index[-len(resid):]
         resid.index = ridx
-        
+    
         fig_resid = go.Figure()
         fig_resid.add_trace(go.Scatter(
             x=resid.index.to_timestamp(),
@@ -3037,22 +3185,62 @@ with tab5:
         )
         st.plotly_chart(fig_resid, use_container_width=True)
     
+        # Analytic interval validation against a large bootstrap, per head
+        st.markdown("#### 🧮 Analytic vs Bootstrap Intervals")
+        st.caption(
+            f"Closed-form ARDL bands compared with a {ARDL_VALIDATION_SIMS:,}-path bootstrap "
+            "under the current scenario. Gaps are relative to the bootstrap."
+        )
+        summary_rows = []
+        for cmp_head in TAX_LABELS.keys():
+            cmp_exog = cached_build_future_exog(bundle_version, df_hist_fp, cmp_head, horizon, exog_params_json)
+            cmp = compare_ardl_intervals(
+                bundle_version, df_hist_fp, cmp_head, horizon, exog_params_json, cmp_exog, mc_seed
+            )
+            summary_rows.append({
+                "head": TAX_LABELS[cmp_head],
+                "max_gap_analytic_pct": cmp["gap_analytic_pct"].abs().max(),
+                "max_gap_empirical_pct": cmp["gap_empirical_pct"].abs().max(),
+            })
+            if cmp_head == head:
+                head_cmp = cmp
+        st.dataframe(
+            pd.DataFrame(summary_rows).style.format({
+                "max_gap_analytic_pct": "{:.2f}%",
+                "max_gap_empirical_pct": "{:.2f}%"
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+        with st.expander(f"📋 Band detail • {TAX_LABELS[head]}"):
+            st.dataframe(
+                head_cmp.style.format({
+                    "bootstrap": "{:,.0f}",
+                    "analytic": "{:,.0f}",
+                    "analytic_empirical": "{:,.0f}",
+                    "gap_analytic_pct": "{:+.2f}%",
+                    "gap_empirical_pct": "{:+.2f}%"
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+
     elif chosen == "arimax":
-        res = head_bundle["arimax"]["res"]
+        res = fitted_results(bundle_version, head, "arimax")
         diag = diagnostics_arimax(res)
-        
+    
         col1, col2, col3, col4, col5 = st.columns(5)
         col1.metric("AIC", f"{diag['aic']:.1f}")
         col2.metric("Durbin-Watson", f"{diag['durbin_watson']:.2f}")
         col3.metric("Ljung-Box p", "N/A" if diag["ljung_box_p"] is None else f"{diag['ljung_box_p']:.3f}")
         col4.metric("Jarque-Bera p", "N/A" if diag["jb_full_p"] is None else f"{diag['jb_full_p']:.3f}")
         col5.metric("JB Trimmed p", "N/A" if diag["jb_trim_p"] is None else f"{diag['jb_trim_p']:.3f}")
-        
+    
         st.markdown("#### 📉 Residual Plot")
         resid = pd.Series(res.resid).dropna()
         ridx = df_hist.index[-len(resid):]
         resid.index = ridx
-        
+    
         fig_resid = go.Figure()
         fig_resid.add_trace(go.Scatter(
             x=resid.index.to_timestamp(),
@@ -3070,7 +3258,7 @@ with tab5:
             yaxis=dict(title="Residual", showgrid=True, gridcolor='rgba(0,0,0,0.03)', zeroline=True)
         )
         st.plotly_chart(fig_resid, use_container_width=True)
-    
+
     else:
         st.markdown("#### 🎯 Top Features")
         st.dataframe(
@@ -3078,15 +3266,22 @@ with tab5:
             use_container_width=True,
             hide_index=True
         )
-    
+
     st.markdown('</div>', unsafe_allow_html=True)
 
-with tab6:
+
+with tab5:
+    if tab5.open:
+        render_tab5()
+
+
+def render_tab6():
+    """Data Preview tab"""
     # Import for Excel export
     import io
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         st.markdown("""
         <div class="content-section">
@@ -3097,40 +3292,40 @@ with tab6:
                 </div>
             </div>
         """, unsafe_allow_html=True)
-        
+    
         # Show active custom rows notification
-        if 'custom_rows' in st.session_state and len(st.session_state.custom_rows) > 0:
-            st.success(f"🔄 **Active Dataset Extended**: {len(st.session_state.custom_rows)} custom row(s) included in all calculations, forecasts, and charts", icon="✅")
-        
+        if len(history_buffer) > 0:
+            st.success(f"🔄 **Active Dataset Extended**: {len(history_buffer)} custom row(s) included in all calculations, forecasts, and charts", icon="✅")
+    
         # Add row editing functionality
         st.markdown("#### ➕ Add New Row")
-        
+    
         with st.expander("Add Custom Historical Data Row", expanded=False):
             st.info("💡 Add a new year of data to extend the historical dataset. All values will be used in model calculations and forecasts.")
-            
+        
             # Get the current df_hist (which may already include custom rows)
             current_df = df_hist.copy()
             last_row = current_df.iloc[-1]
             last_year = int(current_df.index.max().year)
-            
+        
             # Create input form
             new_row_form = st.form(key="add_row_form", clear_on_submit=True)
-            
+        
             with new_row_form:
                 # Year input
                 new_year = st.number_input(
                     "Year",
                     min_value=last_year + 1,
-                    max_value=2050,
+                    max_value=last_year + 1,
                     value=last_year + 1,
                     step=1,
-                    help=f"Next available year is {last_year + 1}"
+                    help=f"Rows extend the history one year at a time; the next year is {last_year + 1}"
                 )
-                
+            
                 st.markdown("---")
                 st.markdown("### 📊 Tax Revenues (Actual Values)")
                 st.caption(f"💡 Default values from FY{last_year}. Enter actual values (NOT log-transformed).")
-                
+            
                 col_tax1, col_tax2 = st.columns(2)
                 with col_tax1:
                     dt = st.number_input(
@@ -3145,7 +3340,7 @@ with tab6:
                         format="%.2f",
                         help="GST revenue in billions"
                     )
-                
+            
                 with col_tax2:
                     fed = st.number_input(
                         "Federal Excise Duty (FED)", 
@@ -3159,10 +3354,10 @@ with tab6:
                         format="%.2f",
                         help="Customs revenue in billions"
                     )
-                
+            
                 st.markdown("---")
                 st.markdown("### 🏭 Economic Indicators (Actual Values)")
-                
+            
                 col_econ1, col_econ2 = st.columns(2)
                 with col_econ1:
                     gdp = st.number_input(
@@ -3189,7 +3384,7 @@ with tab6:
                         format="%.2f",
                         help="Private consumption in billions"
                     )
-                
+            
                 with col_econ2:
                     imports = st.number_input(
                         "Total Imports", 
@@ -3215,12 +3410,12 @@ with tab6:
                         format="%.2f",
                         help="CPI inflation rate"
                     )
-                
+            
                 st.markdown("---")
                 st.markdown("### 🎚️ Dummy Variables")
-                
+            
                 col_dummy1, col_dummy2, col_dummy3 = st.columns(3)
-                
+            
                 with col_dummy1:
                     covid = st.selectbox(
                         "COVID-19 Impact", 
@@ -3234,7 +3429,7 @@ with tab6:
                         index=int(last_row.get('regime', 1)),
                         help="1 if new tax regime active"
                     )
-                
+            
                 with col_dummy2:
                     if "step_2024" in current_df.columns:
                         step_2024 = st.selectbox(
@@ -3245,7 +3440,7 @@ with tab6:
                         )
                     else:
                         step_2024 = None
-                
+            
                 with col_dummy3:
                     if "dummy_2024" in current_df.columns:
                         dummy_2024 = st.selectbox(
@@ -3256,7 +3451,7 @@ with tab6:
                         )
                     else:
                         dummy_2024 = None
-                    
+                
                     if "dummy_2025" in current_df.columns:
                         dummy_2025 = st.selectbox(
                             "Dummy 2025", 
@@ -3266,24 +3461,24 @@ with tab6:
                         )
                     else:
                         dummy_2025 = None
-                
+            
                 st.markdown("---")
-                
+            
                 # Submit button
                 col_submit1, col_submit2 = st.columns([3, 1])
                 with col_submit1:
                     st.caption("⚠️ Click 'Add Row' to add this data. All forecasts will be recalculated.")
                 with col_submit2:
                     submitted = st.form_submit_button("➕ Add Row", use_container_width=True, type="primary")
-                
+            
                 if submitted:
                     # Create new row with ALL columns
                     new_row_data = {}
-                    
+                
                     # Copy all columns from last row first (as base)
                     for col in current_df.columns:
                         new_row_data[col] = last_row[col]
-                    
+                
                     # Update with actual values (these will be stored as-is)
                     new_row_data.update({
                         "dt": dt,
@@ -3301,7 +3496,7 @@ with tab6:
                         "covid": covid,
                         "regime": regime,
                     })
-                    
+                
                     # Calculate log-transformed values
                     import numpy as np
                     new_row_data.update({
@@ -3317,7 +3512,7 @@ with tab6:
                         "log_consumption": np.log(consumption) if consumption > 0 else 0,
                         "log_exrate": np.log(exrate) if exrate > 0 else 0,
                     })
-                    
+                
                     # Add optional dummy columns
                     if step_2024 is not None:
                         new_row_data["step_2024"] = step_2024
@@ -3325,64 +3520,53 @@ with tab6:
                         new_row_data["dummy_2024"] = dummy_2024
                     if dummy_2025 is not None:
                         new_row_data["dummy_2025"] = dummy_2025
-                    
-                    # Add to session state
-                    if 'custom_rows' not in st.session_state:
-                        st.session_state.custom_rows = []
-                    
-                    st.session_state.custom_rows.append({
-                        'year': new_year,
-                        'data': new_row_data
-                    })
-                    
-                    # Clear cache to force recalculation with new data
-                    st.cache_data.clear()
-                    
+                
+                    # Add to the session's history buffer
+                    history_buffer.append(new_year, new_row_data)
+                
                     st.success(f"✅ Added row for year {new_year}! Page will reload to recalculate all forecasts and charts...")
                     st.rerun()
-        
+    
         # Show current data (df_hist already includes custom rows if any)
         display_df = df_hist.copy()
-        
+    
         # Add custom rows info and clear button
-        if 'custom_rows' in st.session_state and len(st.session_state.custom_rows) > 0:
-            st.info(f"📝 **{len(st.session_state.custom_rows)} custom row(s) active** - All forecasts and charts updated", icon="🔄")
-            
+        if len(history_buffer) > 0:
+            st.info(f"📝 **{len(history_buffer)} custom row(s) active** - All forecasts and charts updated", icon="🔄")
+        
             # Show which years were added
-            custom_years = [row['year'] for row in st.session_state.custom_rows]
+            custom_years = history_buffer.years
             st.caption(f"Custom years: {', '.join(map(str, custom_years))}")
-            
+        
             # Add button row
             btn_col1, btn_col2 = st.columns([3, 1])
             with btn_col2:
                 if st.button("🗑️ Clear All", type="secondary", use_container_width=True):
-                    st.session_state.custom_rows = []
-                    # Clear cache to revert to original data
-                    st.cache_data.clear()
+                    history_buffer.clear()
                     st.rerun()
-        
+    
         # Display the data
         st.markdown("#### 📊 Data Table")
         st.caption(f"Showing last 25 rows of {len(display_df)} total rows")
-        
+    
         # Highlight custom rows in display
+        custom_years = set(history_buffer.years)
+
         def highlight_custom_rows(row):
-            if 'custom_rows' in st.session_state:
-                custom_years = [r['year'] for r in st.session_state.custom_rows]
-                if int(row.name.year) in custom_years:
-                    return ['background-color: #FEF3C7; font-weight: bold'] * len(row)
+            if int(row.name.year) in custom_years:
+                return ['background-color: #FEF3C7; font-weight: bold'] * len(row)
             return [''] * len(row)
-        
+    
         st.dataframe(
             display_df.tail(25).style.format("{:.4f}").apply(highlight_custom_rows, axis=1),
             use_container_width=True,
             height=500
         )
-        
+    
         # Download options
         st.markdown("#### 💾 Export Data")
         col_download1, col_download2 = st.columns(2)
-        
+    
         with col_download1:
             csv_data = display_df.to_csv()
             st.download_button(
@@ -3392,13 +3576,15 @@ with tab6:
                 mime="text/csv",
                 use_container_width=True
             )
-        
+    
         with col_download2:
-            excel_buffer = io.BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                display_df.to_excel(writer, sheet_name='Historical Data')
-            excel_data = excel_buffer.getvalue()
-            
+            def excel_data(df=display_df) -> bytes:
+                # Built (and openpyxl imported) only when the download is clicked
+                excel_buffer = io.BytesIO()
+                with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
+                    df.to_excel(writer, sheet_name='Historical Data')
+                return excel_buffer.getvalue()
+
             st.download_button(
                 label="📥 Download as Excel",
                 data=excel_data,
@@ -3406,9 +3592,9 @@ with tab6:
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 use_container_width=True
             )
-        
-        st.markdown('</div>', unsafe_allow_html=True)
     
+        st.markdown('</div>', unsafe_allow_html=True)
+
     with col2:
         st.markdown("""
         <div class="content-section">
@@ -3419,9 +3605,9 @@ with tab6:
                 </div>
             </div>
         """, unsafe_allow_html=True)
-        
+    
         st.dataframe(exog_future, use_container_width=True, height=400)
-        
+    
         # Download future scenario
         st.markdown("#### 💾 Export Scenario")
         csv_future = exog_future.to_csv()
@@ -3432,9 +3618,226 @@ with tab6:
             mime="text/csv",
             use_container_width=True
         )
-        
+    
         st.markdown('</div>', unsafe_allow_html=True)
 
+
+with tab6:
+    if tab6.open:
+        render_tab6()
+
+
+def render_tab7():
+    """Scenarios & Drivers tab"""
+    st.markdown(f"""
+    <div class="content-section">
+        <div class="section-header">
+            <div>
+                <div class="section-title">Scenario Sensitivity Grid</div>
+                <div class="section-subtitle">{TAX_LABELS[head]} • {MODEL_LABELS.get(chosen, chosen.upper())} • every combination evaluated in one pass</div>
+            </div>
+            <div class="section-badge">🧪 SWEEP</div>
+        </div>
+    """, unsafe_allow_html=True)
+
+    def _parse_values(text: str, fallback: float) -> List[float]:
+        try:
+            vals = [float(v) for v in text.replace(";", ",").split(",") if v.strip()]
+        except ValueError:
+            vals = []
+        return vals or [fallback]
+
+    driver_keys = list(SCENARIO_DRIVER_LABELS.keys())
+    col_x, col_y, col_t = st.columns([1, 1, 1], gap="medium")
+    with col_x:
+        x_driver = st.selectbox(
+            "Grid columns",
+            driver_keys,
+            index=driver_keys.index("gdp_nonagr_g"),
+            format_func=lambda k: SCENARIO_DRIVER_LABELS[k],
+            key="sweep_x_driver"
+        )
+        x_text = st.text_input(
+            "Column values",
+            value=", ".join(f"{exog_params[x_driver] + d:g}" for d in (-4, -2, 0, 2, 4)),
+            key=f"sweep_x_values_{x_driver}"
+        )
+    with col_y:
+        y_driver = st.selectbox(
+            "Grid rows",
+            driver_keys,
+            index=driver_keys.index("exrate_g"),
+            format_func=lambda k: SCENARIO_DRIVER_LABELS[k],
+            key="sweep_y_driver"
+        )
+        y_text = st.text_input(
+            "Row values",
+            value=", ".join(f"{exog_params[y_driver] + d:g}" for d in (-4, -2, 0, 2, 4)),
+            key=f"sweep_y_values_{y_driver}"
+        )
+    with col_t:
+        sweep_covid = st.checkbox("Sweep COVID switch (off/on)", value=False, key="sweep_covid")
+        sweep_regime = st.checkbox("Sweep regime switch (off/on)", value=False, key="sweep_regime")
+
+    if x_driver == y_driver:
+        st.warning("Choose two different drivers for the grid rows and columns.")
+    else:
+        x_vals = _parse_values(x_text, exog_params[x_driver])
+        y_vals = _parse_values(y_text, exog_params[y_driver])
+        axes = {y_driver: y_vals, x_driver: x_vals}
+        if sweep_covid:
+            axes["covid_on"] = [False, True]
+        if sweep_regime:
+            axes["regime_on"] = [False, True]
+        scenarios = scenario_grid(exog_params, axes)
+    
+        cube, sweep_years = cached_scenario_sweep(
+            bundle_version, df_hist_fp, chosen, head, horizon, json.dumps(scenarios), n_sims,
+            mc_mode=mc_mode, seed=mc_seed, interval_method=interval_method
+        )
+        st.caption(f"{len(scenarios)} scenarios × {len(sweep_years)} years × {len(SWEEP_BANDS)} bands")
+    
+        col_year, col_switch = st.columns([1, 1], gap="medium")
+        with col_year:
+            sweep_year = st.select_slider("Forecast year", options=list(sweep_years), value=sweep_years[-1], key="sweep_year")
+        n_toggle = len(scenarios) // (len(x_vals) * len(y_vals))
+        toggle_labels = [
+            ", ".join(f"{k.replace('_on', '')} {'on' if v else 'off'}" for k, v in zip(list(axes)[2:], combo))
+            for combo in itertools.product(*[axes[k] for k in list(axes)[2:]])
+        ] or ["sidebar switches"]
+        with col_switch:
+            toggle_pos = st.selectbox("Policy switches", range(n_toggle), format_func=lambda i: toggle_labels[i], key="sweep_toggle")
+    
+        year_pos = list(sweep_years).index(sweep_year)
+        grid = cube[:, year_pos, SWEEP_BANDS.index("yhat")].reshape(len(y_vals), len(x_vals), n_toggle)[:, :, toggle_pos] / 1000
+    
+        fig_heat = go.Figure(go.Heatmap(
+            z=grid,
+            x=[f"{v:g}" for v in x_vals],
+            y=[f"{v:g}" for v in y_vals],
+            colorscale="Blues",
+            text=np.round(grid, 0),
+            texttemplate="%{text:,.0f}",
+            hovertemplate=f"{SCENARIO_DRIVER_LABELS[x_driver]}: %{{x}}<br>{SCENARIO_DRIVER_LABELS[y_driver]}: %{{y}}<br>₨%{{z:,.0f}}B<extra></extra>",
+            colorbar=dict(title="₨B")
+        ))
+        fig_heat.update_layout(
+            title=f"FY {sweep_year} point forecast (PKR Billion)",
+            xaxis_title=SCENARIO_DRIVER_LABELS[x_driver],
+            yaxis_title=SCENARIO_DRIVER_LABELS[y_driver],
+            height=420,
+            margin=dict(l=20, r=20, t=50, b=20)
+        )
+        st.plotly_chart(fig_heat, use_container_width=True)
+    
+        # Fan overlay: the grid's extreme and centre scenarios with their 80% bands
+        pick = sorted({
+            int(np.argmin(cube[:, -1, SWEEP_BANDS.index("yhat")])),
+            int(np.argmax(cube[:, -1, SWEEP_BANDS.index("yhat")])),
+            len(scenarios) // 2,
+        })
+        fig_fan = go.Figure()
+        palette = ["#DC2626", "#2563EB", "#059669"]
+        for color, s_i in zip(palette, pick):
+            label = ", ".join(f"{SCENARIO_DRIVER_LABELS[k].split(' (')[0]} {scenarios[s_i][k]:g}" for k in (x_driver, y_driver))
+            fig_fan.add_trace(go.Scatter(
+                x=list(sweep_years) + list(sweep_years)[::-1],
+                y=list(cube[s_i, :, SWEEP_BANDS.index("hi80")] / 1000) + list(cube[s_i, ::-1, SWEEP_BANDS.index("lo80")] / 1000),
+                fill="toself", fillcolor=color, opacity=0.12, line=dict(width=0),
+                showlegend=False, hoverinfo="skip"
+            ))
+            fig_fan.add_trace(go.Scatter(
+                x=sweep_years, y=cube[s_i, :, SWEEP_BANDS.index("yhat")] / 1000,
+                mode="lines+markers", name=label, line=dict(color=color, width=2)
+            ))
+        fig_fan.update_layout(
+            title="Scenario fans (80% bands)",
+            xaxis_title="Fiscal Year",
+            yaxis_title="PKR Billion",
+            height=420,
+            margin=dict(l=20, r=20, t=50, b=20),
+            legend=dict(orientation="h", y=-0.2)
+        )
+        st.plotly_chart(fig_fan, use_container_width=True)
+
+    # ─── Driver attribution (exact, from the linear model kernels) ───
+    st.markdown("#### 🧭 Driver Attribution")
+    st.caption(
+        "Reference: zero growth, last observed inflation, policy switches off. "
+        "Contributions add up exactly to the scenario forecast."
+    )
+    attr = cached_driver_attribution(bundle_version, df_hist_fp, chosen, head, horizon, exog_params_json)
+    attr_year = st.select_slider("Attribution year", options=list(attr.years), value=attr.years[-1], key="attr_year")
+    a_pos = list(attr.years).index(attr_year)
+    level_contrib = attr.level_contributions()[a_pos] / 1000
+    active = [i for i, v in enumerate(level_contrib) if abs(v) > 1e-9]
+
+    col_wf, col_tor = st.columns([1, 1], gap="medium")
+    with col_wf:
+        fig_wf = go.Figure(go.Waterfall(
+            x=["Reference"] + [DRIVER_LABELS[attr.drivers[i]].split(" (")[0] for i in active] + ["Scenario"],
+            measure=["absolute"] + ["relative"] * len(active) + ["total"],
+            y=[np.exp(attr.reference[a_pos]) / 1000] + [level_contrib[i] for i in active] + [0],
+            connector=dict(line=dict(color="#9CA3AF")),
+            increasing=dict(marker=dict(color="#059669")),
+            decreasing=dict(marker=dict(color="#DC2626")),
+            totals=dict(marker=dict(color="#2563EB")),
+        ))
+        fig_wf.update_layout(
+            title=f"FY {attr_year} forecast build-up (PKR Billion)",
+            height=420,
+            margin=dict(l=20, r=20, t=50, b=20)
+        )
+        st.plotly_chart(fig_wf, use_container_width=True)
+
+    with col_tor:
+        base_level = np.exp(attr.scenario[a_pos])
+        swings = pd.DataFrame({
+            "driver": [DRIVER_LABELS[d] for d in attr.drivers],
+            "low": (np.exp(attr.scenario[a_pos] + attr.low[a_pos]) - base_level) / 1000,
+            "high": (np.exp(attr.scenario[a_pos] + attr.high[a_pos]) - base_level) / 1000,
+        })
+        swings = swings[(swings["low"].abs() + swings["high"].abs()) > 1e-9]
+        swings = swings.assign(span=(swings["high"] - swings["low"]).abs()).sort_values("span")
+        fig_tor = go.Figure()
+        fig_tor.add_trace(go.Bar(y=swings["driver"], x=swings["low"], orientation="h", name="−1pp / switch off", marker_color="#DC2626"))
+        fig_tor.add_trace(go.Bar(y=swings["driver"], x=swings["high"], orientation="h", name="+1pp / switch on", marker_color="#059669"))
+        fig_tor.update_layout(
+            title=f"FY {attr_year} sensitivity (Δ PKR Billion)",
+            barmode="overlay",
+            height=420,
+            margin=dict(l=20, r=20, t=50, b=20),
+            legend=dict(orientation="h", y=-0.15)
+        )
+        st.plotly_chart(fig_tor, use_container_width=True)
+
+    with st.expander("📐 Elasticities by head and year (best model per head)"):
+        st.caption("% change in the revenue forecast per +1 percentage point of each driver")
+        elast_rows = []
+        for h in TAX_LABELS.keys():
+            h_attr = cached_driver_attribution(bundle_version, df_hist_fp, best_model_by_mape(perf, h), h, horizon, exog_params_json)
+            for p, d in enumerate(h_attr.drivers):
+                if d in SCENARIO_DRIVER_LABELS and np.any(h_attr.jacobian[:, p] != 0):
+                    elast_rows.append({
+                        "Tax head": TAX_LABELS[h],
+                        "Driver": SCENARIO_DRIVER_LABELS[d],
+                        **{str(y): 100 * v for y, v in zip(h_attr.years, h_attr.jacobian[:, p])},
+                    })
+        elast_df = pd.DataFrame(elast_rows)
+        st.dataframe(
+            elast_df.style.format({str(y): "{:+.2f}%" for y in attr.years}),
+            use_container_width=True,
+            hide_index=True
+        )
+
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+with tab7:
+    if tab7.open:
+        render_tab7()
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # INSIGHTS PANEL
 # ═══════════════════════════════════════════════════════════════════════════
@@ -0,0 +1,378 @@
+"""Stream scenario records through the forecaster and write results as they finish.
+
+    python batch_runner.py scenarios.jsonl --out results.jsonl [--workers 4] [--resume]
+    cat scenarios.jsonl | python batch_runner.py - --out results.parquet --format parquet
+
+Each input line is one JSON record with the same fields as a /forecast
+request of ``forecast_service`` plus an optional ``id``:
+
+    {"id": "gst-high", "head": "gst", "model": "best", "horizon": 5,
+     "n_sims": 500, "exog_params": {"gdp_nonagr_g": 6.0}}
+
+``head`` may also be "total" (best models summed; its bands assume
+independent head errors, as ``band_basis`` says in jsonl output). Records
+without an ``id`` are named ``#<line number>`` (1-based); explicit ids may
+not start with ``#``, so the two can never collide on resume. Output is
+written as results complete, so its order follows completion, not input:
+
+* jsonl: one line per record with the band arrays, or an ``error`` field.
+* parquet: a directory of part files in long form, one row per record and
+  year, flushed every ``--flush-rows`` records.
+
+Input is read lazily and at most ``2 x workers`` records are in flight, so
+memory stays flat however long the file is. ``--resume`` skips records whose
+id already has a successful result in the output and appends the rest;
+failed records are retried. When the run finishes, the earlier rows of every
+record it wrote again are removed, so each id appears once.
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import logging
+import multiprocessing as mp
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from forecast_service import ForecastAPI
+from result_store import ResultStore
+from tax_forecaster import DATA_CSV, META_JSON, TaxForecaster, default_bundle_path
+
+log = logging.getLogger("batch_runner")
+
+BAND_COLUMNS = ("yhat", "lo80", "hi80", "lo95", "hi95")
+IMPLICIT_ID_PREFIX = "#"  # ids of records without one: "#<line number>"
+
+# Per-process API filled by _init_worker
+_WORKER: Dict[str, ForecastAPI] = {}
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RECORDS
+# ═══════════════════════════════════════════════════════════════════════════
+def read_records(stream) -> Iterator[Tuple[str, dict]]:
+    """(id, record) per non-blank line; unparsable lines become error records"""
+    for lineno, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        implicit = f"{IMPLICIT_ID_PREFIX}{lineno}"
+        try:
+            rec = json.loads(line)
+            if not isinstance(rec, dict):
+                raise ValueError("record must be a JSON object")
+        except ValueError as exc:
+            yield implicit, {"_error": f"line {lineno}: {exc}"}
+            continue
+        if "id" not in rec:
+            yield implicit, rec
+        elif str(rec["id"]).startswith(IMPLICIT_ID_PREFIX):
+            yield implicit, {"_error": f"line {lineno}: ids starting with {IMPLICIT_ID_PREFIX!r} are reserved"}
+        else:
+            yield str(rec["id"]), rec
+
+
+def run_record(api: ForecastAPI, rec_id: str, rec: dict) -> dict:
+    """Result dict for one record; failures are reported, never raised"""
+    try:
+        if "_error" in rec:
+            raise ValueError(rec["_error"])
+        if rec.get("head") == "total":
+            res = {"head": "total", **api.total(rec)}
+            res.pop("models")
+        else:
+            res = api.forecast(rec)
+            res.pop("batch_size")
+        res["horizon"] = len(res["years"])
+        res["n_sims"] = int(rec.get("n_sims", 500))
+        return {"id": rec_id, **res}
+    except Exception as exc:
+        return {"id": rec_id, "error": f"{type(exc).__name__}: {exc}"}
+
+
+def _make_api(bundle_path: str, meta_path: str, data_path: str, db: Optional[str]) -> ForecastAPI:
+    store = ResultStore(db) if db else None
+    engine = TaxForecaster(bundle_path, meta_path, data_path, store=store)
+    engine.bundle
+    # One record at a time per process: nothing to coalesce, so no window
+    return ForecastAPI(engine, window=0.0)
+
+
+def _init_worker(bundle_path: str, meta_path: str, data_path: str, db: Optional[str]):
+    warnings.filterwarnings("ignore")
+    _WORKER["api"] = _make_api(bundle_path, meta_path, data_path, db)
+
+
+def _run(rec_id: str, rec: dict) -> dict:
+    return run_record(_WORKER["api"], rec_id, rec)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# OUTPUT SINKS
+# ═══════════════════════════════════════════════════════════════════════════
+class JsonlSink:
+    """One JSON line per record, flushed as written"""
+
+    def __init__(self, path: str, resume: bool):
+        self.path = path
+        if resume and os.path.exists(path):
+            self._drop_torn_line(path)
+        self._f = open(path, "a" if resume else "w", encoding="utf-8")
+        self._start = self._f.tell()  # this run's lines begin here
+        self._written: Set[str] = set()
+
+    @staticmethod
+    def _drop_torn_line(path: str):
+        """Truncate after the last newline, so appends never extend a torn line"""
+        with open(path, "r+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            pos = size
+            while pos > 0:
+                step = min(65536, pos)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                nl = chunk.rfind(b"\n")
+                if nl >= 0:
+                    pos = pos - step + nl + 1
+                    break
+                pos -= step
+            if pos < size:
+                f.truncate(pos)
+
+    @staticmethod
+    def done_ids(path: str) -> Set[str]:
+        done = set()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    res = json.loads(line)
+                except ValueError:
+                    continue  # torn last line of an interrupted run
+                if "error" not in res:
+                    done.add(str(res["id"]))
+        return done
+
+    def write(self, res: dict):
+        self._f.write(json.dumps(res) + "\n")
+        self._f.flush()
+        self._written.add(str(res["id"]))
+
+    def close(self):
+        self._f.close()
+        if self._start and self._written:
+            self._drop_superseded()
+
+    @staticmethod
+    def _line_id(line: bytes) -> Optional[str]:
+        try:
+            return str(json.loads(line)["id"])
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def _drop_superseded(self):
+        """Remove earlier runs' lines for ids this run wrote again (retried errors)"""
+        tmp = self.path + ".tmp"
+        dropped = 0
+        with open(self.path, "rb") as src, open(tmp, "wb") as dst:
+            pos = 0
+            for line in src:
+                if pos < self._start and self._line_id(line) in self._written:
+                    dropped += 1
+                else:
+                    dst.write(line)
+                pos += len(line)
+        if dropped:
+            os.replace(tmp, self.path)
+        else:
+            os.remove(tmp)
+
+
+class ParquetSink:
+    """Directory of long-form parquet parts, one file per flushed chunk"""
+
+    def __init__(self, path: str, resume: bool, flush_rows: int = 200):
+        import pyarrow  # noqa: F401  (fail before any work is done)
+
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.flush_rows = max(1, int(flush_rows))
+        self._rows: List[dict] = []
+        self._pending = 0
+        self._part = len(self._parts(path))
+        self._earlier = self._parts(path) if resume else []
+        self._written: Set[str] = set()
+
+    @staticmethod
+    def _parts(path: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(path, "part-*.parquet")))
+
+    @classmethod
+    def done_ids(cls, path: str) -> Set[str]:
+        import pyarrow.parquet as pq
+
+        done = set()
+        for part in cls._parts(path):
+            t = pq.read_table(part, columns=["id", "error"]).to_pydict()
+            done.update(i for i, e in zip(t["id"], t["error"]) if e is None)
+        return done
+
+    def write(self, res: dict):
+        base = {
+            "id": res["id"],
+            "head": res.get("head"),
+            "model": res.get("model"),
+            "horizon": res.get("horizon"),
+            "n_sims": res.get("n_sims"),
+            "error": res.get("error"),
+        }
+        self._written.add(str(res["id"]))
+        if "error" in res:
+            self._rows.append({**base, "year": None, **{c: None for c in BAND_COLUMNS}})
+        else:
+            for i, year in enumerate(res["years"]):
+                self._rows.append({**base, "year": year, **{c: res[c][i] for c in BAND_COLUMNS}})
+        self._pending += 1
+        if self._pending >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema(
+            [("id", pa.string()), ("head", pa.string()), ("model", pa.string()),
+             ("horizon", pa.int32()), ("n_sims", pa.int32()), ("error", pa.string()),
+             ("year", pa.int32())]
+            + [(c, pa.float64()) for c in BAND_COLUMNS]
+        )
+        # Write then rename, so an interrupted flush never leaves a torn part
+        final = os.path.join(self.path, f"part-{self._part:05d}.parquet")
+        pq.write_table(pa.Table.from_pylist(self._rows, schema=schema), final + ".tmp")
+        os.replace(final + ".tmp", final)
+        self._part += 1
+        self._rows, self._pending = [], 0
+
+    def close(self):
+        self.flush()
+        if self._earlier and self._written:
+            self._drop_superseded()
+
+    def _drop_superseded(self):
+        """Rewrite earlier runs' parts without the ids this run wrote again"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        written = pa.array(sorted(self._written), type=pa.string())
+        for part in self._earlier:
+            table = pq.read_table(part)
+            stale = pc.is_in(table["id"], value_set=written)
+            if not pc.any(stale).as_py():
+                continue
+            kept = table.filter(pc.invert(stale))
+            pq.write_table(kept, part + ".tmp")
+            os.replace(part + ".tmp", part)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RUNNER
+# ═══════════════════════════════════════════════════════════════════════════
+def run_batch(records: Iterator[Tuple[str, dict]], sink, workers: int, skip: Set[str], init_args: tuple) -> Dict[str, int]:
+    """Process records into ``sink``, keeping at most 2 x workers in flight"""
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+
+    def emit(res: dict):
+        sink.write(res)
+        counts["error" if "error" in res else "ok"] += 1
+
+    def pending():
+        for rec_id, rec in records:
+            if rec_id in skip:
+                counts["skipped"] += 1
+            else:
+                yield rec_id, rec
+
+    todo = pending()
+
+    if workers <= 1:
+        api = _make_api(*init_args)
+        for rec_id, rec in todo:
+            emit(run_record(api, rec_id, rec))
+        return counts
+
+    method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=mp.get_context(method),
+        initializer=_init_worker, initargs=init_args,
+    ) as pool:
+        in_flight = set()
+        for rec_id, rec in todo:
+            if len(in_flight) >= 2 * workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for f in done:
+                    emit(f.result())
+            in_flight.add(pool.submit(_run, rec_id, rec))
+        for f in wait(in_flight).done:
+            emit(f.result())
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", nargs="?", default="-", help="scenario JSONL file, or - for stdin")
+    parser.add_argument("--out", required=True, help="results .jsonl file or parquet directory")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), default=None,
+                        help="default: parquet if --out ends in .parquet, else jsonl")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--resume", action="store_true", help="skip records already answered in --out")
+    parser.add_argument("--overwrite", action="store_true", help="replace an existing --out")
+    parser.add_argument("--flush-rows", type=int, default=200, help="records per parquet part")
+    parser.add_argument("--db", default=None, help="optional result store shared by the workers")
+    parser.add_argument("--bundle", default=None, help="default: compact bundle if current, else the pickle")
+    parser.add_argument("--meta", default=META_JSON)
+    parser.add_argument("--data", default=DATA_CSV)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    warnings.filterwarnings("ignore")
+    fmt = args.format or ("parquet" if args.out.endswith(".parquet") else "jsonl")
+    sink_cls = ParquetSink if fmt == "parquet" else JsonlSink
+
+    exists = os.path.exists(args.out)
+    if exists and not (args.resume or args.overwrite):
+        parser.error(f"{args.out} exists; pass --resume or --overwrite")
+    if exists and args.overwrite and fmt == "parquet":
+        for part in ParquetSink._parts(args.out):
+            os.remove(part)
+    skip = sink_cls.done_ids(args.out) if exists and args.resume else set()
+    if skip:
+        log.info("resuming: %d records already done", len(skip))
+
+    sink = sink_cls(args.out, args.resume) if fmt == "jsonl" else sink_cls(args.out, args.resume, args.flush_rows)
+    stream = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    t0 = time.perf_counter()
+    try:
+        counts = run_batch(
+            read_records(stream), sink, args.workers, skip,
+            (args.bundle or default_bundle_path(), args.meta, args.data, args.db),
+        )
+    finally:
+        sink.close()
+        if stream is not sys.stdin:
+            stream.close()
+    log.info(
+        "%d ok, %d failed, %d skipped in %.1fs",
+        counts["ok"], counts["error"], counts["skipped"], time.perf_counter() - t0,
+    )
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
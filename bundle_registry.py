@@ -0,0 +1,245 @@
+"""Hot-reload of retrained model bundles behind a live engine.
+
+A BundleRegistry owns the current TaxForecaster. A daemon thread polls the
+artifact files (bundle, metadata, history); once a change has settled it
+builds a new engine in the background, validates it, optionally warms the
+result store for it, and only then swaps it in. Callers keep working on
+the old engine throughout, so there is no window without a loaded model.
+The files are hashed first and the engine (and its worker pool) is only
+built when their content has changed since the last load, so a touched
+but unchanged file costs a hash, not a pool start-up.
+
+Engines are identified by ``TaxForecaster.version``. Caches keyed on that
+version keep serving the previous version's results until it is retired
+(``on_retire``) or they expire, while new requests are computed, and
+cached, against the new one. Asking for a retired version raises
+RetiredVersion rather than quietly answering from another bundle; the
+caller re-pins to ``current.version``. A
+version that fails validation is logged and skipped until the files
+change again.
+
+History views (``TaxForecaster.with_history``) are registered per bundle
+version and dataset version, so any thread can look one up by those two
+ids; they are dropped with their bundle version.
+
+    registry = BundleRegistry(TaxForecaster, watch=[BUNDLE_PKL, META_JSON, DATA_CSV])
+    registry.start()
+    registry.current.forecast_total(5, registry.current.exog_params())
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from result_store import file_fingerprint, result_key
+from tax_forecaster import MODEL_KINDS, TAX_HEADS, TaxForecaster
+
+log = logging.getLogger(__name__)
+
+VALIDATION_HORIZON = 3
+VALIDATION_SIMS = 100
+
+
+def validate_engine(engine: TaxForecaster):
+    """Raise ValueError unless every head has all models and a sane forecast"""
+    models = engine.bundle["models"]
+    for head in TAX_HEADS:
+        if head not in models:
+            raise ValueError(f"bundle has no models for {head!r}")
+        missing = [k for k in MODEL_KINDS if k not in models[head]]
+        if missing:
+            raise ValueError(f"{head}: bundle is missing {missing}")
+        best = engine.best_model(head)
+        fc = engine.forecast_category(best, head, VALIDATION_HORIZON, engine.exog_params(), VALIDATION_SIMS)
+        values = fc.to_numpy(dtype=float)
+        if not np.isfinite(values).all() or (values <= 0).any():
+            raise ValueError(f"{head}/{best}: forecast is not finite and positive")
+
+
+class RetiredVersion(KeyError):
+    """The requested bundle version is no longer held by the registry"""
+
+
+class BundleRegistry:
+    """Current engine plus the most recent previous versions, hot-swapped on change"""
+
+    def __init__(
+        self,
+        factory: Callable[[], TaxForecaster],
+        watch: Sequence[str],
+        poll_interval: float = 5.0,
+        keep: int = 2,
+        warm: Optional[Callable[[TaxForecaster], None]] = None,
+        on_retire: Optional[Callable[[str], None]] = None,
+        keep_histories: int = 32,
+    ):
+        self._factory = factory
+        self.watch = list(watch)
+        self.poll_interval = poll_interval
+        self.keep = max(1, keep)
+        self._warm = warm
+        self._on_retire = on_retire
+        self.keep_histories = max(1, keep_histories)
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._engines: "OrderedDict[str, TaxForecaster]" = OrderedDict()
+        self._current: Optional[TaxForecaster] = None
+        self._histories: "OrderedDict[Tuple[str, str], TaxForecaster]" = OrderedDict()
+        self._files_fp: Optional[str] = None  # content of the watched files at the last load
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ─── Engines ───
+    @property
+    def current(self) -> TaxForecaster:
+        """Newest validated engine; the first call loads it synchronously"""
+        if self._current is None:
+            with self._reload_lock:
+                if self._current is None:
+                    self._files_fp = self.files_fingerprint()
+                    engine = self._factory()
+                    engine.bundle
+                    self._install(engine)
+        return self._current
+
+    def engine(self, version: Optional[str] = None, dataset_version: Optional[str] = None) -> TaxForecaster:
+        """Engine of ``version`` (default: the current one).
+
+        Raises RetiredVersion once ``version`` has been retired. With
+        ``dataset_version``, the history view registered for it; raises
+        KeyError if that view was never registered or has been dropped.
+        """
+        current = self.current
+        with self._lock:
+            engine = current if version is None else self._engines.get(version)
+        if engine is None:
+            raise RetiredVersion(f"bundle version {version} is retired (current: {current.version})")
+        if dataset_version is None or dataset_version == engine.dataset_fp:
+            return engine
+        with self._lock:
+            view = self._histories.get((engine.version, dataset_version))
+        if view is None:
+            raise KeyError(f"history {dataset_version} is not registered for bundle version {engine.version}")
+        return view
+
+    def with_history(self, df_hist, version: Optional[str] = None, dataset_fp: Optional[str] = None) -> TaxForecaster:
+        """Register (or reuse) the view of ``version`` conditioned on ``df_hist``"""
+        engine = self.engine(version)
+        view = engine.with_history(df_hist, dataset_fp)
+        if view is engine:
+            return engine
+        key = (engine.version, view.dataset_fp)
+        with self._lock:
+            view = self._histories.setdefault(key, view)
+            self._histories.move_to_end(key)
+            while len(self._histories) > self.keep_histories:
+                self._histories.popitem(last=False)
+        return view
+
+    def drop_history(self, dataset_version: str):
+        """Forget every view of ``dataset_version``"""
+        with self._lock:
+            for key in [k for k in self._histories if k[1] == dataset_version]:
+                del self._histories[key]
+
+    @property
+    def versions(self) -> Tuple[str, ...]:
+        """Held versions, oldest first"""
+        with self._lock:
+            return tuple(self._engines)
+
+    def _install(self, engine: TaxForecaster):
+        with self._lock:
+            self._engines[engine.version] = engine
+            self._engines.move_to_end(engine.version)
+            self._current = engine
+            retired = []
+            while len(self._engines) > self.keep:
+                retired.append(self._engines.popitem(last=False)[1])
+            for key in [k for k in self._histories if k[0] not in self._engines]:
+                del self._histories[key]
+        for old in retired:
+            old.close()
+            if self._on_retire is not None:
+                self._on_retire(old.version)
+
+    # ─── Reload ───
+    def reload(self) -> bool:
+        """Load, validate and warm the artifacts on disk; swap if they are new.
+
+        Returns True when a new version was swapped in. Failures are logged
+        and leave the current engine in place.
+        """
+        current = self.current
+        with self._reload_lock:
+            files_fp = self.files_fingerprint()
+            if files_fp == self._files_fp:
+                return False
+            # Recorded up front: a failed version is not retried until the files change
+            self._files_fp = files_fp
+            try:
+                engine = self._factory()
+                if engine.version == current.version:
+                    engine.close()
+                    return False
+                validate_engine(engine)
+                if self._warm is not None:
+                    self._warm(engine)
+            except Exception:
+                log.exception("bundle reload failed; still serving version %s", current.version)
+                return False
+            self._install(engine)
+        log.info("bundle version %s swapped in (was %s)", engine.version, current.version)
+        return True
+
+    # ─── Watching ───
+    def files_fingerprint(self) -> str:
+        """Hash of the watched files' contents (missing files included as such)"""
+        fps = {}
+        for path in self.watch:
+            try:
+                fps[path] = file_fingerprint(path)
+            except OSError:
+                fps[path] = None
+        return result_key(**fps)
+
+    def _signature(self) -> tuple:
+        sig = []
+        for path in self.watch:
+            try:
+                st = os.stat(path)
+                sig.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append((path, None, None))
+        return tuple(sig)
+
+    def _watch_loop(self):
+        seen = self._signature()
+        while not self._stop.wait(self.poll_interval):
+            sig = self._signature()
+            if sig == seen:
+                continue
+            # Let a file that is still being written settle for one interval
+            if self._stop.wait(self.poll_interval) or self._signature() != sig:
+                continue
+            seen = sig
+            self.reload()
+
+    def start(self):
+        """Load the current engine and start watching (idempotent)"""
+        self.current
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch_loop, name="bundle-watch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
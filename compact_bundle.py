@@ -0,0 +1,261 @@
+"""Compact, versioned model bundle: forecast kernels as arrays + JSON metadata.
+
+    python compact_bundle.py export [--bundle tax_models_bundle.pkl] [--out tax_models_bundle.npz]
+    python compact_bundle.py info [tax_models_bundle.npz]
+
+The pickled bundle holds full statsmodels / sklearn objects; loading it
+imports both libraries and runs arbitrary pickle code. Forecasting only
+needs the parameter-only kernels of ``forecast_engine``, so ``export``
+writes those (plus residual pools and coefficient tables) to a single
+``.npz`` whose metadata is a JSON document. It loads with
+``allow_pickle=False`` and imports neither library.
+
+Export checks every kernel against the object it came from and refuses to
+write a bundle that does not reproduce it. The metadata records the
+fingerprints of the source pickle and of the data CSV (the ENet residual
+pools are computed from it), so a stale export can be detected, and the
+full results objects (model summaries, diagnostics) can still be loaded
+from the source on demand.
+
+The export is a build artefact, not versioned: ``default_bundle_path``
+re-creates it whenever it is missing or stale.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pickle
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from forecast_engine import (
+    ArdlKernel,
+    LinearKernel,
+    SarimaxKernel,
+    attach_model_kernels,
+    to_year_index,
+)
+from result_store import file_fingerprint
+
+COMPACT_FORMAT = "tax-forecast-compact"
+COMPACT_VERSION = 1
+
+KERNEL_TYPES = {"ardl": ArdlKernel, "arimax": SarimaxKernel, "enet": LinearKernel}
+
+# Model-dict entries rebuilt or stored as arrays, never as JSON metadata
+_DERIVED_FIELDS = ("res", "model", "kernel", "coefficients", "residuals", "lag_plan")
+
+VERIFY_TOL = 1e-8  # Max abs log-scale difference between kernel and source object
+VERIFY_HORIZON = 5
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════════════════
+def _verify_kernels(bundle: dict):
+    """Raise ValueError if a kernel does not reproduce its source object.
+
+    ARDL is checked against ``forecast``, ARIMAX against ``get_forecast``
+    (both on a probe that holds the last observed exog flat) and ENet
+    against ``Pipeline.predict``.
+    """
+    for head, b in bundle["models"].items():
+        if "ardl" in b:
+            res, kernel = b["ardl"]["res"], b["ardl"]["kernel"]
+            data = res.model.data
+            exog = pd.DataFrame(data.orig_exog).reset_index(drop=True)
+            hist = exog.assign(**{kernel.y_name: np.asarray(data.orig_endog, dtype=float)})
+            probe = pd.concat([exog.iloc[-1:]] * VERIFY_HORIZON, ignore_index=True)
+            probe.index = pd.RangeIndex(len(exog), len(exog) + VERIFY_HORIZON)
+            fc = np.asarray(res.forecast(steps=VERIFY_HORIZON, exog=probe), dtype=float)
+            err = np.max(np.abs(kernel.forecast(hist, probe) - fc))
+            if err > VERIFY_TOL:
+                raise ValueError(f"{head}/ardl kernel differs from forecast by {err:.2e}")
+        if "arimax" in b:
+            res, kernel = b["arimax"]["res"], b["arimax"]["kernel"]
+            X = np.repeat(np.asarray(res.model.exog)[-1:], VERIFY_HORIZON, axis=0)
+            fc = res.get_forecast(steps=VERIFY_HORIZON, exog=X)
+            mean, se = kernel.forecast(pd.DataFrame(X, columns=list(kernel.exog_names)))
+            err = max(
+                np.max(np.abs(mean - np.asarray(fc.predicted_mean))),
+                np.max(np.abs(se - np.asarray(fc.se_mean))),
+            )
+            if err > VERIFY_TOL:
+                raise ValueError(f"{head}/arimax kernel differs from get_forecast by {err:.2e}")
+        if "enet" in b:
+            pipe, kernel = b["enet"]["model"], b["enet"]["kernel"]
+            X = np.random.default_rng(0).normal(
+                kernel.mean, np.where(kernel.scale > 0, kernel.scale, 1.0), (64, len(kernel.coef))
+            )
+            err = np.max(np.abs(kernel.predict(X) - pipe.predict(X)))
+            if err > VERIFY_TOL:
+                raise ValueError(f"{head}/enet kernel differs from the pipeline by {err:.2e}")
+
+
+def flatten_bundle(bundle: dict) -> tuple:
+    """Split a kernel-attached bundle into named arrays and a JSON-able models dict"""
+    arrays: Dict[str, np.ndarray] = {}
+    models = {}
+    for head, b in bundle["models"].items():
+        entry = {"spec": b["spec"]}
+        for kind, kernel_cls in KERNEL_TYPES.items():
+            if kind not in b:
+                continue
+            m = b[kind]
+            prefix = f"{head}/{kind}"
+            kernel_json = {}
+            for field in kernel_cls._fields:
+                value = getattr(m["kernel"], field)
+                if isinstance(value, np.ndarray):
+                    arrays[f"{prefix}/kernel.{field}"] = value
+                else:
+                    kernel_json[field] = value
+            for col, values in (m.get("coefficients") or {}).items():
+                arrays[f"{prefix}/coefficients.{col}"] = values
+            if m.get("residuals") is not None:
+                arrays[f"{prefix}/residuals"] = np.asarray(m["residuals"], dtype=float)
+            entry[kind] = {
+                "kernel": kernel_json,
+                **{k: v for k, v in m.items() if k not in _DERIVED_FIELDS},
+            }
+        models[head] = entry
+    return arrays, models
+
+
+def export_compact_bundle(bundle_path: str, data_path: str, out_path: str) -> dict:
+    """Write the compact form of a pickled bundle; returns its metadata"""
+    with open(bundle_path, "rb") as f:
+        bundle = pickle.load(f)
+    df = to_year_index(pd.read_csv(data_path, index_col=0))
+    attach_model_kernels(bundle, df)
+    _verify_kernels(bundle)
+
+    arrays, models = flatten_bundle(bundle)
+    meta = {
+        "format": COMPACT_FORMAT,
+        "version": COMPACT_VERSION,
+        "source": {"file": os.path.basename(bundle_path), "fingerprint": file_fingerprint(bundle_path)},
+        "data": {"file": os.path.basename(data_path), "fingerprint": file_fingerprint(data_path)},
+        "meta": bundle.get("meta", {}),
+        "models": models,
+    }
+    arrays["__meta__"] = np.array(json.dumps(meta))
+
+    # Write then rename, so readers never see a half-written bundle
+    tmp = f"{out_path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, out_path)
+
+    # Round trip: every stored array must come back bit-identical
+    loaded = load_compact_bundle(out_path)
+    for head, b in bundle["models"].items():
+        for kind in KERNEL_TYPES:
+            if kind in b:
+                for a, c in zip(b[kind]["kernel"], loaded["models"][head][kind]["kernel"]):
+                    if isinstance(a, np.ndarray) and not np.array_equal(a, c):
+                        raise ValueError(f"{head}/{kind} kernel did not round-trip")
+    return meta
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# LOAD
+# ═══════════════════════════════════════════════════════════════════════════
+def _as_tuples(value):
+    """JSON lists back to the tuples they were written from"""
+    if isinstance(value, list):
+        return tuple(_as_tuples(v) for v in value)
+    return value
+
+
+def _read_meta(npz) -> dict:
+    if "__meta__" not in npz.files:
+        raise ValueError("not a compact model bundle (no __meta__ member)")
+    meta = json.loads(str(npz["__meta__"][()]))
+    if meta.get("format") != COMPACT_FORMAT:
+        raise ValueError(f"unknown bundle format {meta.get('format')!r}")
+    if meta.get("version") != COMPACT_VERSION:
+        raise ValueError(
+            f"compact bundle version {meta.get('version')} is not supported "
+            f"(expected {COMPACT_VERSION}); re-export it from the source pickle"
+        )
+    return meta
+
+
+def read_compact_meta(path: str) -> dict:
+    """Metadata document of a compact bundle, without loading its arrays"""
+    with np.load(path, allow_pickle=False) as npz:
+        return _read_meta(npz)
+
+
+def load_compact_bundle(path: str) -> dict:
+    """Bundle dict in the pickled layout, with kernels in place of model objects"""
+    with np.load(path, allow_pickle=False) as npz:
+        meta = _read_meta(npz)
+        arrays = {k: npz[k] for k in npz.files if k != "__meta__"}
+    return assemble_bundle(meta, arrays)
+
+
+def assemble_bundle(meta: dict, arrays: Dict[str, np.ndarray]) -> dict:
+    """Inverse of flatten_bundle; arrays are used as given (no copies)"""
+    models = {}
+    for head, entry in meta["models"].items():
+        b = {"spec": entry["spec"]}
+        for kind, kernel_cls in KERNEL_TYPES.items():
+            if kind not in entry:
+                continue
+            m = dict(entry[kind])
+            prefix = f"{head}/{kind}"
+            fields = {k: _as_tuples(v) for k, v in m.pop("kernel").items()}
+            for field in kernel_cls._fields:
+                if field not in fields:
+                    fields[field] = arrays[f"{prefix}/kernel.{field}"]
+            m["kernel"] = kernel_cls(**fields)
+            coef = {k.rsplit(".", 1)[1]: v for k, v in arrays.items() if k.startswith(f"{prefix}/coefficients.")}
+            if coef:
+                m["coefficients"] = coef
+            if f"{prefix}/residuals" in arrays:
+                m["residuals"] = arrays[f"{prefix}/residuals"]
+            if "order" in m:
+                m["order"] = tuple(m["order"])
+            b[kind] = m
+        models[head] = b
+    return {"models": models, "meta": meta["meta"], "compact": {"source": meta["source"], "version": meta["version"]}}
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════
+def main(argv=None):
+    from tax_forecaster import BUNDLE_NPZ, BUNDLE_PKL, DATA_CSV
+
+    parser = argparse.ArgumentParser(description="Export or inspect the compact model bundle")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    exp = sub.add_parser("export", help="write the compact bundle from the pickle")
+    exp.add_argument("--bundle", default=BUNDLE_PKL)
+    exp.add_argument("--data", default=DATA_CSV)
+    exp.add_argument("--out", default=BUNDLE_NPZ)
+    info = sub.add_parser("info", help="print a compact bundle's metadata")
+    info.add_argument("path", nargs="?", default=BUNDLE_NPZ)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "export":
+        meta = export_compact_bundle(args.bundle, args.data, args.out)
+        print(
+            f"wrote {args.out} ({os.path.getsize(args.out) / 1024:.0f} KB, "
+            f"{len(meta['models'])} heads) from {args.bundle} [{meta['source']['fingerprint']}]"
+        )
+    else:
+        meta = read_compact_meta(args.path)
+        print(f"{args.path}: {meta['format']} v{meta['version']}")
+        print(f"source: {meta['source']['file']} [{meta['source']['fingerprint']}]")
+        if "data" in meta:
+            print(f"data: {meta['data']['file']} [{meta['data']['fingerprint']}]")
+        for head, entry in meta["models"].items():
+            print(f"  {head}: {', '.join(k for k in KERNEL_TYPES if k in entry)}")
+
+
+if __name__ == "__main__":
+    main()
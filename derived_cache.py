@@ -0,0 +1,225 @@
+"""In-process cache of derived results with explicit dependencies.
+
+Keys are tuples that name their inputs' versions, e.g.
+
+    ("assets", bundle_version)                       root
+    ("dataset", dataset_version)                     root
+    ("exog", bundle_version, dataset_version, head, ...)   -> assets, dataset
+    ("forecast", ..., head, model, ...)              -> exog of that head
+    ("total", ...)                                   -> every head's exog
+
+Because every key carries its versions, a session that extends its history
+simply computes under a new dataset version while everyone else keeps
+hitting their warm entries. ``invalidate`` drops a node and everything
+derived from it, transitively, so retiring a dataset or bundle version
+frees exactly its own entries instead of flushing the whole cache.
+VersionUsers tracks which sessions are on a dataset version, so a version
+shared by several sessions is retired only when the last one leaves it.
+
+Concurrent misses on one key share a single computation: the first caller
+computes while the others wait on its future. Every invalidated key's
+generation is bumped, and a computation only stores its result if the
+key's generation is still the one it started under, so a value derived
+from a retired input can never land after ``invalidate`` has run.
+
+Entries also expire after ``ttl`` seconds and the least recently used are
+evicted beyond ``max_entries``; neither cascades, since a dependent entry
+is still valid when its parent is merely evicted. Values are deep-copied
+on the way out, as with ``st.cache_data``.
+"""
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Iterable, List, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class DerivedCache:
+    """Thread-safe LRU + TTL cache whose keys form a dependency graph"""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._parents: Dict[Hashable, Set[Hashable]] = {}
+        self._children: Dict[Hashable, Set[Hashable]] = defaultdict(set)
+        self._inflight: Dict[Hashable, Future] = {}
+        self._generation: Dict[Hashable, int] = {}  # keys being computed -> invalidation count
+        self.hits = 0
+        self.misses = 0
+
+    # ─── Graph ───
+    def node(self, key: Hashable, deps: Iterable[Hashable] = ()) -> Hashable:
+        """Declare ``key`` as derived from ``deps`` (no value needed); returns key"""
+        with self._lock:
+            self._link(key, deps)
+        return key
+
+    def _link(self, key, deps):
+        parents = self._parents.setdefault(key, set())
+        for dep in deps:
+            parents.add(dep)
+            self._children[dep].add(key)
+
+    def _unlink(self, key) -> Set[Hashable]:
+        """Remove key's edges to its parents; returns those parents"""
+        parents = self._parents.pop(key, set())
+        for dep in parents:
+            kids = self._children.get(dep)
+            if kids is not None:
+                kids.discard(key)
+                if not kids:
+                    del self._children[dep]
+        return parents
+
+    def _prune(self, keys: Iterable[Hashable]):
+        """Forget nodes with no value, computation or dependents, then their orphaned parents"""
+        stack = list(keys)
+        while stack:
+            k = stack.pop()
+            if k in self._entries or k in self._inflight or self._children.get(k):
+                continue
+            self._children.pop(k, None)
+            stack.extend(self._unlink(k))
+
+    # ─── Values ───
+    def get(self, key: Hashable, compute: Callable[[], T], deps: Iterable[Hashable] = ()) -> T:
+        """Cached value of ``key``, computing (outside the lock) on a miss.
+
+        Callers that miss while ``key`` is already being computed wait for
+        that computation instead of starting their own.
+        """
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and now - hit[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(hit[1])
+            self.misses += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                generation = self._generation.setdefault(key, 0)
+                # Linked before computing, so invalidating a parent reaches this key
+                self._link(key, deps)
+
+        if not leader:
+            return copy.deepcopy(future.result())
+        try:
+            value = compute()
+        except BaseException as exc:
+            with self._lock:
+                self._finish(key, future)
+                self._prune([key])
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            if self._generation.get(key) == generation:
+                self._entries[key] = (time.monotonic(), value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    old, _ = self._entries.popitem(last=False)
+                    self._prune([old])
+            else:
+                self._prune([key])
+            self._finish(key, future)
+        future.set_result(value)
+        return copy.deepcopy(value)
+
+    def _finish(self, key, future: Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if key not in self._inflight:
+            self._generation.pop(key, None)
+
+    def invalidate(self, key: Hashable) -> int:
+        """Drop ``key`` and every entry derived from it; returns entries removed"""
+        removed = 0
+        with self._lock:
+            stack, seen = [key], set()
+            while stack:
+                k = stack.pop()
+                if k in seen:
+                    continue
+                seen.add(k)
+                stack.extend(self._children.get(k, ()))
+                removed += k in self._entries
+            orphaned = set()
+            for k in seen:
+                if k in self._generation:
+                    # The running computation may not store; new callers start afresh
+                    self._generation[k] += 1
+                    self._inflight.pop(k, None)
+                self._entries.pop(k, None)
+                self._children.pop(k, None)
+                orphaned |= self._unlink(k)
+            self._prune(orphaned - seen)
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "nodes": len(self._parents),
+                "hits": self.hits,
+                "misses": self.misses,
+                "in_flight": len(self._inflight),
+            }
+
+
+class VersionUsers:
+    """Which users (sessions) are on which version, for shared-version retirement.
+
+    Versions are content fingerprints, so sessions that enter identical
+    custom rows share one. A version is only reported for retirement once
+    its last user has moved to another or has not been seen for ``ttl``
+    seconds (an abandoned browser tab never says goodbye).
+    """
+
+    def __init__(self, ttl: float = 3600.0, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._version: Dict[Hashable, Hashable] = {}
+        self._seen: Dict[Hashable, float] = {}
+        self._users: Dict[Hashable, Set[Hashable]] = defaultdict(set)
+
+    def use(self, user: Hashable, version: Hashable) -> List[Hashable]:
+        """Record ``user`` as being on ``version`` now.
+
+        Returns the versions nobody is on any more: the one ``user`` left,
+        and those of users idle for longer than ``ttl``.
+        """
+        now = self._clock()
+        with self._lock:
+            previous = self._version.get(user)
+            self._version[user] = version
+            self._seen[user] = now
+            self._users[version].add(user)
+            released = []
+            if previous is not None and previous != version:
+                released += self._leave(user, previous)
+            for idle in [u for u, t in self._seen.items() if now - t > self.ttl]:
+                released += self._leave(idle, self._version.pop(idle))
+                del self._seen[idle]
+            return released
+
+    def _leave(self, user, version) -> List[Hashable]:
+        users = self._users[version]
+        users.discard(user)
+        if users:
+            return []
+        del self._users[version]
+        return [version]
+
+    def users(self, version: Hashable) -> int:
+        with self._lock:
+            return len(self._users.get(version, ()))
@@ -0,0 +1,1100 @@
+"""Vectorised forecast simulation kernels (NumPy only, no Streamlit)."""
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import pickle
+import zlib
+from statistics import NormalDist
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtri
+
+# Version of the path-generation code (kernels, Monte Carlo sampling, RNG
+# streams). It is part of every persistent result key: bump it whenever the
+# same inputs would produce different paths, so stored results go stale.
+ENGINE_VERSION = 1
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# DATASET FINGERPRINT
+# ═══════════════════════════════════════════════════════════════════════════
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """Stable content hash of a frame's values, index and column names"""
+    h = hashlib.sha1()
+    h.update(json.dumps([str(c) for c in df.columns]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# INTERVAL SUMMARY
+# ═══════════════════════════════════════════════════════════════════════════
+INTERVAL_QUANTILES = {
+    "lo80": 0.1,
+    "hi80": 0.9,
+    "lo95": 0.025,
+    "hi95": 0.975,
+}
+
+# How ARDL bands are produced; ENet always simulates, ARIMAX is state-space
+INTERVAL_METHODS = {
+    "analytic": "Analytic (instant)",
+    "analytic_empirical": "Analytic + empirical tails",
+    "bootstrap": "Bootstrap simulation",
+}
+
+
+def interval_frame(yhat: np.ndarray, sims: np.ndarray, index) -> pd.DataFrame:
+    """Summarise simulated level paths (n_sims, horizon) into the band frame"""
+    out = {"yhat": np.asarray(yhat, dtype=float)}
+    for col, q in INTERVAL_QUANTILES.items():
+        out[col] = np.quantile(sims, q, axis=0)
+    return pd.DataFrame(out, index=index)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RANDOM STREAMS
+# ═══════════════════════════════════════════════════════════════════════════
+def forecast_rng(seed: int, *labels, worker: int = 0) -> np.random.Generator:
+    """Independent, reproducible Generator for one (seed, labels, worker).
+
+    Labels (head, model, ...) are mapped to stable integers and used as the
+    SeedSequence spawn key, so every combination gets its own statistically
+    independent PCG64 stream regardless of thread or process. Distinct
+    ``worker`` indices shard one request without correlated draws.
+    """
+    spawn_key = tuple(zlib.crc32(str(label).encode()) for label in labels) + (int(worker),)
+    return np.random.Generator(np.random.PCG64(np.random.SeedSequence(int(seed), spawn_key=spawn_key)))
+
+
+def path_stream_labels(model_kind: str, head: str, exog_future: pd.DataFrame, crn: bool = True) -> tuple:
+    """Stream labels for one head/model simulation.
+
+    With common random numbers every scenario reuses the (head, model) stream;
+    without, the scenario is mixed in so each gets independent draws.
+    """
+    if crn:
+        return (head, model_kind)
+    return (head, model_kind, dataset_fingerprint(exog_future))
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RESIDUAL RESAMPLING (MONTE CARLO MODES)
+# ═══════════════════════════════════════════════════════════════════════════
+MC_MODES = {
+    "iid": "Plain bootstrap (i.i.d.)",
+    "antithetic": "Antithetic pairs",
+    "lhs": "Latin hypercube (stratified)",
+}
+
+
+def _mode_uniforms(n_sims: int, horizon: int, mode: str, rng: np.random.Generator) -> np.ndarray:
+    """(n_sims, horizon) uniforms for the antithetic / LHS modes"""
+    if mode == "antithetic":
+        half = rng.random(((n_sims + 1) // 2, horizon))
+        return np.vstack([half, 1.0 - half])[:n_sims]
+    if mode == "lhs":
+        strata = np.argsort(rng.random((n_sims, horizon)), axis=0)
+        return (strata + rng.random((n_sims, horizon))) / n_sims
+    raise ValueError(f"unknown Monte Carlo mode {mode!r}")
+
+
+def draw_normals(n_sims: int, horizon: int, mode: str, rng: np.random.Generator) -> np.ndarray:
+    """Standard normal (n_sims, horizon) shocks under a Monte Carlo mode"""
+    if mode == "iid":
+        return rng.standard_normal((n_sims, horizon))
+    return ndtri(np.clip(_mode_uniforms(n_sims, horizon, mode, rng), 1e-12, 1 - 1e-12))
+
+
+def draw_residuals(
+    pool, n_sims: int, horizon: int, mode: str, rng: np.random.Generator
+) -> np.ndarray:
+    """Resample an (n_sims, horizon) innovation matrix from a residual pool.
+
+    ``iid`` draws with replacement. The other modes work on uniforms mapped
+    through the sorted pool (its empirical quantile function), so every mode
+    keeps the pool's marginal distribution:
+
+    * ``antithetic`` pairs each path U with its mirror 1 - U, i.e. the k-th
+      smallest residual with the k-th largest, cancelling odd-order noise;
+    * ``lhs`` splits each horizon step into n_sims equiprobable strata, hits
+      every stratum once and pairs strata across steps at random.
+
+    With an ``rng`` from forecast_rng keyed without the scenario, the uniforms
+    do not depend on the scenario, so scenarios compared under the same seed
+    share common random numbers.
+    """
+    pool = np.asarray(pool, dtype=float)
+    if mode == "iid":
+        return rng.choice(pool, size=(n_sims, horizon), replace=True)
+
+    u = _mode_uniforms(n_sims, horizon, mode, rng)
+    ordered = np.sort(pool)
+    idx = np.minimum((u * len(ordered)).astype(int), len(ordered) - 1)
+    return ordered[idx]
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# ARDL RESIDUAL BOOTSTRAP
+# ═══════════════════════════════════════════════════════════════════════════
+def ar_psi_weights(ar_params: Sequence[float], horizon: int) -> np.ndarray:
+    """MA(inf) weights psi_0..psi_{h-1} of the AR noise polynomial"""
+    ar = np.asarray(ar_params, dtype=float)
+    psi = np.zeros(horizon)
+    if horizon == 0:
+        return psi
+    psi[0] = 1.0
+    for i in range(1, horizon):
+        k = min(i, len(ar))
+        psi[i] = ar[:k] @ psi[i - 1::-1][:k]
+    return psi
+
+
+def psi_kernel(psi: np.ndarray) -> np.ndarray:
+    """Lower-triangular Toeplitz map from innovations to accumulated noise"""
+    horizon = len(psi)
+    lag = np.subtract.outer(np.arange(horizon), np.arange(horizon))
+    return np.where(lag >= 0, psi[np.clip(lag, 0, None)], 0.0)
+
+
+def ar_noise_kernel(ar_params: Sequence[float], horizon: int) -> np.ndarray:
+    """Lower-triangular (horizon, horizon) map from innovations to AR noise"""
+    return psi_kernel(ar_psi_weights(ar_params, horizon))
+
+
+def simulate_ardl_paths(
+    yhat_log: np.ndarray,
+    innovations: np.ndarray,
+    ar_params: Sequence[float],
+) -> np.ndarray:
+    """Bootstrap ARDL level paths for all simulations in one batch.
+
+    Applies the AR noise recursion to the whole (n_sims, horizon) innovation
+    matrix with a single matrix product against the psi-weight kernel. The
+    sums run in a different order than the per-step recursion, so paths
+    match it to ~1e-12, not bit for bit.
+    """
+    yhat_log = np.asarray(yhat_log, dtype=float)
+    noise = innovations @ ar_noise_kernel(ar_params, len(yhat_log)).T
+    return np.exp(yhat_log + noise)
+
+
+def ardl_analytic_frame(
+    yhat_log: np.ndarray,
+    resid: np.ndarray,
+    ar_params: Sequence[float],
+    index,
+    empirical: bool = False,
+) -> pd.DataFrame:
+    """Closed-form ARDL bands in O(horizon), no simulation.
+
+    The bootstrap noise at step h is sum_j psi_j * e_{h-j} with e drawn from
+    the residual pool, so its mean is mu * cumsum(psi) and its variance is
+    sigma^2 * cumsum(psi^2) (pool moments, ddof=0). Bands use normal
+    quantiles, or with ``empirical`` the standardised residual quantiles
+    scaled to each step's spread (keeps the pool's skew and tails).
+    """
+    yhat_log = np.asarray(yhat_log, dtype=float)
+    resid = np.asarray(resid, dtype=float)
+    psi = ar_psi_weights(ar_params, len(yhat_log))
+    mu, sigma = resid.mean(), resid.std()
+    centre = yhat_log + mu * np.cumsum(psi)
+    spread = sigma * np.sqrt(np.cumsum(psi ** 2))
+
+    out = {"yhat": np.exp(yhat_log)}
+    for col, q in INTERVAL_QUANTILES.items():
+        if empirical and sigma > 0:
+            z = np.quantile((resid - mu) / sigma, q)
+        else:
+            z = NormalDist().inv_cdf(q)
+        out[col] = np.exp(centre + z * spread)
+    return pd.DataFrame(out, index=index)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# ARIMAX GAUSSIAN PATHS
+# ═══════════════════════════════════════════════════════════════════════════
+def arma_psi_weights(ar_poly: Sequence[float], ma_poly: Sequence[float], horizon: int) -> np.ndarray:
+    """psi weights of MA(L)/AR(L) for lag polynomials [1, a1, a2, ...]"""
+    ar = np.asarray(ar_poly, dtype=float)
+    ma = np.asarray(ma_poly, dtype=float)
+    psi = np.zeros(horizon)
+    for i in range(horizon):
+        acc = ma[i] if i < len(ma) else 0.0
+        for j in range(1, min(i, len(ar) - 1) + 1):
+            acc -= ar[j] * psi[i - j]
+        psi[i] = acc
+    return psi
+
+
+def simulate_arimax_paths(
+    mean_log: np.ndarray,
+    se_log: np.ndarray,
+    psi: np.ndarray,
+    shocks: np.ndarray,
+) -> np.ndarray:
+    """Jointly Gaussian ARIMAX level paths from standard normal shocks.
+
+    The psi kernel gives the serial correlation of multi-step forecast
+    errors; each step is rescaled to the model's own forecast standard error
+    so the marginal bands match ``conf_int`` exactly.
+    """
+    kernel = psi_kernel(psi)
+    scale = np.sqrt((kernel ** 2).sum(axis=1))
+    kernel = kernel * (np.asarray(se_log, dtype=float) / np.where(scale > 0, scale, 1.0))[:, None]
+    return np.exp(np.asarray(mean_log, dtype=float) + shocks @ kernel.T)
+
+
+def gaussian_band_frame(mean_log: np.ndarray, se_log: np.ndarray, index) -> pd.DataFrame:
+    """Band frame from a Gaussian log forecast (the state-space conf_int)"""
+    mean_log = np.asarray(mean_log, dtype=float)
+    se_log = np.asarray(se_log, dtype=float)
+    out = {"yhat": np.exp(mean_log)}
+    for col, q in INTERVAL_QUANTILES.items():
+        out[col] = np.exp(mean_log + ndtri(q) * se_log)
+    return pd.DataFrame(out, index=index)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# PATH STORE AND JOINT AGGREGATION
+# ═══════════════════════════════════════════════════════════════════════════
+class ForecastPaths(NamedTuple):
+    """Simulated level paths of one forecast, kept for later queries"""
+    years: np.ndarray   # (horizon,) int
+    yhat: np.ndarray    # (horizon,) point forecast in levels
+    paths: np.ndarray   # (n_sims, horizon) float32 levels
+
+    @classmethod
+    def build(cls, index, yhat, paths) -> "ForecastPaths":
+        return cls(
+            years=np.asarray(pd.PeriodIndex(index, freq="Y").year, dtype=int),
+            yhat=np.asarray(yhat, dtype=float),
+            paths=np.asarray(paths, dtype=np.float32),
+        )
+
+    @property
+    def index(self) -> pd.PeriodIndex:
+        return pd.PeriodIndex(self.years, freq="Y")
+
+    def quantile(self, q) -> np.ndarray:
+        """Any quantile(s) per year, straight from the stored paths"""
+        return np.quantile(self.paths, q, axis=0)
+
+    def bands(self) -> pd.DataFrame:
+        """The usual yhat/lo80/hi80/lo95/hi95 frame"""
+        return interval_frame(self.yhat, self.paths.astype(float), self.index)
+
+    def prob_exceed(self, target: float) -> np.ndarray:
+        """P(level > target) per year"""
+        return (self.paths > target).mean(axis=0)
+
+    def to_arrays(self) -> dict:
+        return {"years": self.years, "yhat": self.yhat, "paths": self.paths}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> "ForecastPaths":
+        return cls(years=arrays["years"], yhat=arrays["yhat"], paths=arrays["paths"])
+
+
+def total_paths(parts: Sequence[ForecastPaths]) -> ForecastPaths:
+    """Aggregate heads path-by-path, so total bands are quantiles of the sum.
+
+    The joint distribution is whatever the parts were drawn from: heads
+    simulated on independent streams give a total that assumes independent
+    head errors, which understates the spread when the errors co-move.
+    """
+    parts = list(parts)
+    years = parts[0].years
+    for p in parts[1:]:
+        if not np.array_equal(p.years, years) or p.paths.shape != parts[0].paths.shape:
+            raise ValueError("paths must share years and n_sims to be aggregated")
+    return ForecastPaths(
+        years=years,
+        yhat=np.sum([p.yhat for p in parts], axis=0),
+        paths=np.sum([p.paths for p in parts], axis=0, dtype=np.float64).astype(np.float32),
+    )
+
+
+def head_shares(parts: Dict[str, ForecastPaths], year_pos: int = -1) -> pd.DataFrame:
+    """Distribution of each head's share of the total in one forecast year"""
+    total = np.sum([p.paths[:, year_pos] for p in parts.values()], axis=0, dtype=np.float64)
+    rows = []
+    for head, p in parts.items():
+        share = p.paths[:, year_pos] / total
+        rows.append({
+            "head": head,
+            "share_mean": float(share.mean()),
+            "share_lo80": float(np.quantile(share, 0.1)),
+            "share_hi80": float(np.quantile(share, 0.9)),
+        })
+    return pd.DataFrame(rows)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# ELASTICNET LAG PLAN
+# ═══════════════════════════════════════════════════════════════════════════
+def _split_lag_feature(col: str):
+    """'log_gdp_L1' -> ('log_gdp', 1); names without a lag suffix are L0"""
+    if "_L" in col:
+        base, lag = col.rsplit("_L", 1)
+        if lag.isdigit():
+            return base, int(lag)
+    return col, 0
+
+
+class LagPlan(NamedTuple):
+    """Compiled mapping from ENet feature names to (source column, lag)"""
+    feature_cols: Tuple[str, ...]
+    sources: Tuple[str, ...]
+    src_idx: np.ndarray
+    lags: np.ndarray
+
+    @classmethod
+    def compile(cls, feature_cols: Sequence[str]) -> "LagPlan":
+        parsed = [_split_lag_feature(c) for c in feature_cols]
+        sources = tuple(dict.fromkeys(base for base, _ in parsed))
+        return cls(
+            feature_cols=tuple(feature_cols),
+            sources=sources,
+            src_idx=np.array([sources.index(base) for base, _ in parsed], dtype=int),
+            lags=np.array([lag for _, lag in parsed], dtype=int),
+        )
+
+    @property
+    def depth(self) -> int:
+        """Rows of history needed to form one feature row"""
+        return int(self.lags.max()) + 1 if len(self.lags) else 1
+
+    def source_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """(n_rows, n_sources) float matrix; missing columns become NaN"""
+        return df.reindex(columns=list(self.sources)).to_numpy(dtype=float)
+
+    def design_matrix(self, values: np.ndarray) -> np.ndarray:
+        """Lagged feature matrix for every row of a source matrix.
+
+        Row r holds values[r - lag, src] per feature, NaN where r < lag.
+        """
+        pad = self.depth - 1
+        padded = np.vstack([np.full((pad, values.shape[1]), np.nan), values])
+        rows = np.arange(len(values))[:, None] + pad - self.lags
+        return padded[rows, self.src_idx]
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# ELASTICNET BATCHED SIMULATION
+# ═══════════════════════════════════════════════════════════════════════════
+def simulate_enet_paths(
+    model,
+    plan: LagPlan,
+    df_hist: pd.DataFrame,
+    exog_future,
+    y_name: str,
+    noise: np.ndarray,
+) -> np.ndarray:
+    """Advance every ENet path together; returns log paths (n_paths, horizon).
+
+    Lag state lives in a preallocated ring buffer of shape
+    (plan.depth, n_paths, n_sources), so each horizon step is one fancy-index
+    gather plus a single ``model.predict`` on an (n_paths, n_features) matrix
+    (``model`` is the head's LinearKernel).
+    ``noise`` holds the residual added to each step's prediction; pass zeros
+    with one row for the point forecast. ``exog_future`` is a DataFrame
+    shared by all paths, or an ExogStack with one scenario per path.
+    """
+    noise = np.atleast_2d(np.asarray(noise, dtype=float))
+    n_paths, horizon = noise.shape
+    depth = plan.depth
+
+    hist = plan.source_matrix(df_hist)
+    if isinstance(exog_future, ExogStack):
+        # One exog path per simulated path: (horizon, n_paths, n_sources)
+        fut = exog_future.select(plan.sources).transpose(1, 0, 2)
+    else:
+        fut = plan.source_matrix(exog_future)
+    y_pos = plan.sources.index(y_name) if y_name in plan.sources else None
+    n_hist = len(hist)
+
+    ring = np.full((depth, n_paths, len(plan.sources)), np.nan)
+    for row in range(max(0, n_hist - depth + 1), n_hist):
+        ring[row % depth] = hist[row]
+
+    out = np.empty((n_paths, horizon))
+    for i in range(horizon):
+        slot = (n_hist + i) % depth
+        ring[slot] = fut[i]
+        X = ring[(slot - plan.lags) % depth, :, plan.src_idx].T
+        out[:, i] = model.predict(X) + noise[:, i]
+        if y_pos is not None:
+            ring[slot, :, y_pos] = out[:, i]
+    return out
+
+
+def enet_train_residuals(model, plan: LagPlan, df: pd.DataFrame, y_name: str) -> np.ndarray:
+    """In-sample ENet residuals from one lagged design matrix and one predict.
+
+    Mirrors the training window: the first two observed years are skipped and
+    rows whose lagged features are incomplete are dropped.
+    """
+    X_all = plan.design_matrix(plan.source_matrix(df))
+    pos = df.index.get_indexer(df.dropna(subset=[y_name]).index[2:])
+    X = X_all[pos]
+    keep = ~np.isnan(X).any(axis=1)
+    if not keep.any():
+        return np.zeros(1)
+    y = df[y_name].to_numpy(dtype=float)[pos][keep]
+    return y - model.predict(X[keep])
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# MODEL KERNELS
+# ═══════════════════════════════════════════════════════════════════════════
+# Parameter-only forms of the fitted models: everything the forecast and
+# simulation paths need, as plain arrays. They are built from the pickled
+# statsmodels / sklearn objects or read back from a compact bundle.
+class ArdlKernel(NamedTuple):
+    """Fitted ARDL equation: coefficients by 'name.Lk' term + residual pool"""
+    y_name: str
+    names: Tuple[str, ...]
+    params: np.ndarray
+    resid: np.ndarray
+
+    @classmethod
+    def from_results(cls, res, y_name: str) -> "ArdlKernel":
+        """Kernel of a fitted ARDL; ValueError if it has terms the kernel cannot replay"""
+        names = tuple(str(k) for k in res.params.index)
+        for name in names:
+            if name != "const":
+                _split_param(name)
+        return cls(
+            y_name=y_name,
+            names=names,
+            params=res.params.to_numpy(dtype=float),
+            resid=res.resid.dropna().to_numpy(dtype=float),
+        )
+
+    @property
+    def coef(self) -> pd.Series:
+        return pd.Series(self.params, index=list(self.names))
+
+    @property
+    def ar_params(self) -> List[float]:
+        """Coefficients on the target's own lags, in lag order"""
+        return [float(v) for k, v in zip(self.names, self.params) if k.startswith(self.y_name + ".L")]
+
+    def forecast(self, df_hist: pd.DataFrame, exog_future: pd.DataFrame) -> np.ndarray:
+        """Log point forecast over the rows of ``exog_future``"""
+        stack = ExogStack(
+            index=exog_future.index,
+            columns=tuple(exog_future.columns),
+            values=exog_future.to_numpy(dtype=float)[None],
+        )
+        return ardl_point_stack(self, df_hist, stack)[0]
+
+    def design(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Regressor matrix and target over the rows of ``df`` (NaN where a lag is missing)"""
+        cols = []
+        for name in self.names:
+            if name == "const":
+                cols.append(np.ones(len(df)))
+            else:
+                col, lag = _split_param(name)
+                cols.append(df[col].astype(float).shift(lag).to_numpy())
+        return np.column_stack(cols), df[self.y_name].to_numpy(dtype=float)
+
+    def refresh(self, df: pd.DataFrame, n_new: int) -> "ArdlKernel":
+        """Recursive least-squares update with the last ``n_new`` rows of ``df``.
+
+        The inverse moment matrix is seeded from the earlier rows, so when
+        those rows identify every coefficient (as the training sample does)
+        the result matches re-running OLS on the extended sample up to
+        rounding (~1e-10 on the shipped heads), at O(k^2) per year. A
+        regressor that is all zero before the new rows (a fresh year dummy)
+        is not identified by the seed; refit instead. The new years'
+        residuals join the bootstrap pool.
+        """
+        X, y = self.design(df)
+        ok = np.isfinite(X).all(axis=1) & np.isfinite(y)
+        split = len(df) - n_new
+        X0 = X[:split][ok[:split]]
+        P = np.linalg.pinv(X0.T @ X0)
+        theta = self.params.copy()
+        new_resid = []
+        for x_t, y_t in zip(X[split:][ok[split:]], y[split:][ok[split:]]):
+            Px = P @ x_t
+            gain = Px / (1.0 + x_t @ Px)
+            theta = theta + gain * (y_t - x_t @ theta)
+            P = P - np.outer(gain, Px)
+            new_resid.append(y_t - x_t @ theta)
+        return self._replace(params=theta, resid=np.concatenate([self.resid, new_resid]))
+
+
+class SarimaxKernel(NamedTuple):
+    """Regression with ARIMA errors as an end-of-sample state-space system.
+
+    y_t = Z a_t + obs_offset + x_t' beta + eps_t, a_{t+1} = T a_t + c + R eta_t,
+    starting from the one-step-ahead predicted state of the last sample
+    year; forecasting is the Kalman prediction step, repeated.
+    """
+    exog_names: Tuple[str, ...]
+    beta: np.ndarray
+    obs_offset: float
+    obs_var: float
+    design: np.ndarray           # (k_states,)
+    transition: np.ndarray       # (k_states, k_states)
+    state_intercept: np.ndarray  # (k_states,)
+    state_noise_cov: np.ndarray  # (k_states, k_states) = R Q R'
+    state: np.ndarray            # (k_states,) predicted state for the first forecast year
+    state_cov: np.ndarray        # (k_states, k_states)
+    ar_poly: np.ndarray
+    ma_poly: np.ndarray
+    k_diff: int
+
+    @classmethod
+    def from_results(cls, res) -> "SarimaxKernel":
+        """Extract the system; raises ValueError if it is not time-invariant"""
+        model, ssm = res.model, res.model.ssm
+        names = tuple(str(n) for n in model.exog_names)
+        beta = res.params[list(names)].to_numpy(dtype=float)
+
+        def fixed(name):
+            m = np.asarray(ssm[name], dtype=float)
+            if m.ndim == 3 or (name.endswith("_intercept") and m.ndim == 2):
+                if not np.allclose(m, m[..., -1:], rtol=0, atol=1e-10):
+                    raise ValueError(f"SARIMAX {name} varies over time; no compact kernel")
+                m = m[..., -1]
+            return m
+
+        offset = np.asarray(ssm["obs_intercept"], dtype=float)[0] - np.asarray(model.exog) @ beta
+        if np.ptp(offset) > 1e-10:
+            raise ValueError("SARIMAX observation intercept is not x'beta plus a constant")
+        R, Q = fixed("selection"), fixed("state_cov")
+        return cls(
+            exog_names=names,
+            beta=beta,
+            obs_offset=float(offset[-1]),
+            obs_var=float(fixed("obs_cov")[0, 0]),
+            design=fixed("design")[0],
+            transition=fixed("transition"),
+            state_intercept=fixed("state_intercept"),
+            state_noise_cov=R @ Q @ R.T,
+            state=np.asarray(res.predicted_state[:, -1], dtype=float),
+            state_cov=np.asarray(res.predicted_state_cov[:, :, -1], dtype=float),
+            ar_poly=np.asarray(res.polynomial_ar, dtype=float),
+            ma_poly=np.asarray(res.polynomial_ma, dtype=float),
+            k_diff=int(model.k_diff),
+        )
+
+    def state_forecast(self, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exog-free part of the log mean and the forecast variance, (horizon,) each"""
+        a, P = self.state.copy(), self.state_cov.copy()
+        Z, T = self.design, self.transition
+        mean, var = np.empty(horizon), np.empty(horizon)
+        for t in range(horizon):
+            mean[t] = Z @ a + self.obs_offset
+            var[t] = Z @ P @ Z + self.obs_var
+            a = T @ a + self.state_intercept
+            P = T @ P @ T.T + self.state_noise_cov
+        return mean, var
+
+    def extend(self, y: np.ndarray, X: np.ndarray) -> "SarimaxKernel":
+        """Kernel after filtering new observations with the fitted parameters.
+
+        One Kalman update + prediction step per new year, as
+        ``results.extend`` does, without re-estimation; a missing ``y`` only
+        advances the state.
+        """
+        a, P = self.state.copy(), self.state_cov.copy()
+        Z, T = self.design, self.transition
+        for y_t, x_t in zip(np.asarray(y, dtype=float), np.asarray(X, dtype=float)):
+            v = y_t - (Z @ a + self.obs_offset + x_t @ self.beta)
+            if np.isfinite(v):
+                PZ = P @ Z
+                F = Z @ PZ + self.obs_var
+                a = a + PZ * (v / F)
+                P = P - np.outer(PZ, PZ) / F
+            a = T @ a + self.state_intercept
+            P = T @ P @ T.T + self.state_noise_cov
+        return self._replace(state=a, state_cov=P)
+
+    def forecast(self, exog_future: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Log mean and standard error over the rows of ``exog_future``"""
+        X = exog_future[list(self.exog_names)].to_numpy(dtype=float)
+        mean, var = self.state_forecast(len(X))
+        return mean + X @ self.beta, np.sqrt(var)
+
+    def psi(self, horizon: int) -> np.ndarray:
+        """psi weights of the integrated ARMA error"""
+        ar_poly = self.ar_poly
+        for _ in range(self.k_diff):
+            ar_poly = np.convolve(ar_poly, [1.0, -1.0])
+        return arma_psi_weights(ar_poly, self.ma_poly, horizon)
+
+
+class LinearKernel(NamedTuple):
+    """StandardScaler + linear model (the ENet pipeline) as plain arrays"""
+    mean: np.ndarray
+    scale: np.ndarray
+    coef: np.ndarray
+    intercept: float
+
+    @classmethod
+    def from_pipeline(cls, pipe) -> "LinearKernel":
+        scaler, model = pipe.steps[0][1], pipe.steps[-1][1]
+        coef = np.asarray(model.coef_, dtype=float).ravel()
+        mean = getattr(scaler, "mean_", None)
+        scale = getattr(scaler, "scale_", None)
+        return cls(
+            mean=np.zeros_like(coef) if mean is None else np.asarray(mean, dtype=float),
+            scale=np.ones_like(coef) if scale is None else np.asarray(scale, dtype=float),
+            coef=coef,
+            intercept=float(np.ravel(model.intercept_)[0]),
+        )
+
+    def predict(self, X) -> np.ndarray:
+        return ((np.asarray(X, dtype=float) - self.mean) / self.scale) @ self.coef + self.intercept
+
+
+def coef_summary(res, stat: str = "tvalues") -> Dict[str, np.ndarray]:
+    """Coefficient table arrays of a results object (term, coef, std_err, stat, p)"""
+    return {
+        "term": np.asarray(res.params.index, dtype=str),
+        "coef": res.params.to_numpy(dtype=float),
+        "std_err": np.asarray(res.bse, dtype=float),
+        "stat": np.asarray(getattr(res, stat), dtype=float),
+        "p": np.asarray(res.pvalues, dtype=float),
+    }
+
+
+def attach_model_kernels(bundle: dict, df: pd.DataFrame) -> dict:
+    """Fill kernels, coefficient tables, ENet lag plans and residual pools in place.
+
+    Anything already present (a compact bundle's kernels, residuals written
+    at training time) is kept as-is.
+    """
+    for b in bundle["models"].values():
+        y_name = b["spec"]["y"]
+        if "ardl" in b and "kernel" not in b["ardl"]:
+            b["ardl"]["kernel"] = ArdlKernel.from_results(b["ardl"]["res"], y_name)
+            b["ardl"]["coefficients"] = coef_summary(b["ardl"]["res"], "tvalues")
+        if "arimax" in b and "kernel" not in b["arimax"]:
+            b["arimax"]["kernel"] = SarimaxKernel.from_results(b["arimax"]["res"])
+            b["arimax"]["coefficients"] = coef_summary(b["arimax"]["res"], "zvalues")
+        if "enet" in b:
+            enet = b["enet"]
+            if "kernel" not in enet:
+                enet["kernel"] = LinearKernel.from_pipeline(enet["model"])
+            enet["lag_plan"] = LagPlan.compile(enet["feature_cols"])
+            if enet.get("residuals") is None:
+                enet["residuals"] = enet_train_residuals(enet["kernel"], enet["lag_plan"], df, y_name)
+    return bundle
+
+
+def extend_model_kernels(bundle: dict, df: pd.DataFrame, n_new: int, refresh_ardl: bool = False) -> dict:
+    """Bundle whose kernels have absorbed the last ``n_new`` rows of ``df``.
+
+    ARIMAX states are filtered through the new years. ARDL and ENet already
+    forecast from the tail of ``df``; ``refresh_ardl`` also updates the ARDL
+    coefficients by recursive least squares. The input bundle is left as
+    is; unchanged entries are shared, not copied.
+
+    The state updates step one year per row, so the new rows must continue
+    the history year by year; a gap raises ValueError (refit instead).
+    """
+    if n_new <= 0:
+        return bundle
+    years = np.asarray(df.index[-n_new - 1:].year)
+    gaps = years[1:][np.diff(years) != 1]
+    if len(gaps):
+        raise ValueError(f"appended years must follow on consecutively; {int(gaps[0])} leaves a gap or repeats a year")
+    new = df.iloc[-n_new:]
+    models = {}
+    for head, b in bundle["models"].items():
+        b = dict(b)
+        if "arimax" in b:
+            kernel = b["arimax"]["kernel"]
+            b["arimax"] = {
+                **b["arimax"],
+                "kernel": kernel.extend(new[b["spec"]["y"]].to_numpy(dtype=float), new[list(kernel.exog_names)].to_numpy(dtype=float)),
+            }
+        if refresh_ardl and "ardl" in b:
+            b["ardl"] = {**b["ardl"], "kernel": b["ardl"]["kernel"].refresh(df, n_new)}
+        models[head] = b
+    return {**bundle, "models": models}
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# PER-HEAD PATH DISPATCH
+# ═══════════════════════════════════════════════════════════════════════════
+def to_year_index(df: pd.DataFrame) -> pd.DataFrame:
+    """Restore PeriodIndex from saved CSV index."""
+    out = df.copy()
+    try:
+        years = out.index.astype(str).str.extract(r"(\d{4})")[0].astype(int)
+        out.index = pd.PeriodIndex(years, freq="Y")
+    except Exception:
+        pass
+    return out
+
+
+def load_model_assets(bundle_path: str, data_path: str) -> Tuple[dict, pd.DataFrame]:
+    """Load the model bundle and the year-indexed history.
+
+    A ``.npz`` path is a compact bundle (arrays + JSON, no pickle, no
+    statsmodels/sklearn import); anything else is unpickled and its results
+    objects are reduced to the same kernels.
+    """
+    if bundle_path.endswith(".npz"):
+        from compact_bundle import load_compact_bundle
+
+        bundle = load_compact_bundle(bundle_path)
+    else:
+        with open(bundle_path, "rb") as f:
+            bundle = pickle.load(f)
+    df = to_year_index(pd.read_csv(data_path, index_col=0))
+    attach_model_kernels(bundle, df)
+    return bundle, df
+
+
+def simulate_head_paths(
+    bundle_head: dict,
+    df_hist: pd.DataFrame,
+    model_kind: str,
+    horizon: int,
+    exog_future: pd.DataFrame,
+    n_sims: int,
+    mc_mode: str,
+    rng: np.random.Generator,
+) -> ForecastPaths:
+    """Simulate (n_sims, horizon) level paths for one head and model"""
+    exog_future = exog_future.sort_index()
+    y_name = bundle_head["spec"]["y"]
+
+    if model_kind == "ardl":
+        kernel = bundle_head["ardl"]["kernel"]
+        yhat_log = kernel.forecast(df_hist, exog_future.iloc[:horizon])
+
+        # All bootstrap paths in one batch: (n_sims, horizon) draws + AR kernel
+        innovations = draw_residuals(kernel.resid, n_sims, horizon, mc_mode, rng)
+        sims = simulate_ardl_paths(yhat_log, innovations, kernel.ar_params)
+        return ForecastPaths.build(exog_future.index, np.exp(yhat_log), sims)
+
+    if model_kind == "arimax":
+        # Jointly Gaussian paths matching the state-space forecast bands
+        kernel = bundle_head["arimax"]["kernel"]
+        mean, se = kernel.forecast(exog_future.iloc[:horizon])
+        shocks = draw_normals(n_sims, horizon, mc_mode, rng)
+        sims = simulate_arimax_paths(mean, se, kernel.psi(horizon), shocks)
+        return ForecastPaths.build(exog_future.index, np.exp(mean), sims)
+
+    if model_kind == "enet":
+        enet = bundle_head["enet"]
+
+        # Point path and all noisy paths advance in lockstep, one predict per step
+        preds_log = simulate_enet_paths(
+            enet["kernel"], enet["lag_plan"], df_hist, exog_future, y_name, np.zeros((1, horizon))
+        )[0]
+        draws = draw_residuals(enet["residuals"], n_sims, horizon, mc_mode, rng)
+        sim_paths = np.exp(
+            simulate_enet_paths(enet["kernel"], enet["lag_plan"], df_hist, exog_future, y_name, draws)
+        )
+        return ForecastPaths.build(exog_future.index, np.exp(preds_log), sim_paths)
+
+    raise ValueError(f"unknown model kind: {model_kind!r}")
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SCENARIO STACKS
+# ═══════════════════════════════════════════════════════════════════════════
+# Sidebar growth assumption (% p.a.) -> log column it drives
+GROWTH_DRIVERS = {
+    "gdp_nonagr_g": "log_gdp_nonagr",
+    "lsm_g": "log_lsm",
+    "imports_g": "log_imports",
+    "dutiable_g": "log_dutiable_imports",
+    "cons_g": "log_consumption",
+    "exrate_g": "log_exrate",
+}
+
+
+def project_univariate(series: pd.Series, horizon: int) -> np.ndarray:
+    """Project using linear trend"""
+    y = series.values
+    slope, intercept = np.polyfit(np.arange(len(y)), y, 1)
+    return intercept + slope * np.arange(len(y), len(y) + horizon)
+
+
+class ExogStack(NamedTuple):
+    """Future exog for many scenarios as one (n_scenarios, horizon, n_cols) array"""
+    index: pd.PeriodIndex
+    columns: Tuple[str, ...]
+    values: np.ndarray
+
+    def frame(self, s: int = 0) -> pd.DataFrame:
+        """Scenario ``s`` as the DataFrame the models' forecast() expects"""
+        return pd.DataFrame(self.values[s], index=self.index, columns=list(self.columns))
+
+    def select(self, columns: Sequence[str]) -> np.ndarray:
+        """(n_scenarios, horizon, len(columns)); columns not stacked are NaN"""
+        pos = [self.columns.index(c) if c in self.columns else -1 for c in columns]
+        out = self.values[:, :, [max(p, 0) for p in pos]]
+        out[:, :, [i for i, p in enumerate(pos) if p < 0]] = np.nan
+        return out
+
+
+def build_exog_stack(
+    df_hist: pd.DataFrame,
+    horizon: int,
+    spec_x: Sequence[str],
+    scenarios: Sequence[dict],
+) -> ExogStack:
+    """Future exog paths for every scenario in one array.
+
+    Each scenario holds the ``build_future_exog`` keyword arguments. Growth
+    drivers compound from the last observed log level; policy switches and
+    inflation are flat; every other column is held at its last value.
+    """
+    n = len(scenarios)
+    last = df_hist.iloc[-1]
+    last_year = int(df_hist.index.max().year)
+    idx = pd.PeriodIndex([last_year + i for i in range(1, horizon + 1)], freq="Y")
+    univariate = np.array([bool(s.get("use_univariate", False)) for s in scenarios])
+
+    cols = {}
+    for param, col in GROWTH_DRIVERS.items():
+        if col not in df_hist.columns:
+            continue
+        # Same left-to-right sums as compounding one year at a time
+        steps = np.empty((n, horizon + 1))
+        steps[:, 0] = last[col]
+        steps[:, 1:] = np.log1p(np.array([s[param] for s in scenarios], dtype=float) / 100.0)[:, None]
+        vals = np.cumsum(steps, axis=1)[:, 1:]
+        if univariate.any():
+            vals[univariate] = project_univariate(df_hist[col], horizon)
+        cols[col] = vals
+
+    flat = {
+        "inflation": [float(s["inflation_level"]) for s in scenarios],
+        "covid": [1.0 if s["covid_on"] else 0.0 for s in scenarios],
+        "regime": [1.0 if s["regime_on"] else 0.0 for s in scenarios],
+    }
+    for col, v in flat.items():
+        cols[col] = np.repeat(np.asarray(v, dtype=float)[:, None], horizon, axis=1)
+    for col, v in {"step_2024": 1.0, "dummy_2024": 0.0, "dummy_2025": 0.0}.items():
+        if col in df_hist.columns:
+            cols[col] = np.full((n, horizon), v)
+
+    values = np.empty((n, horizon, len(spec_x)))
+    for k, c in enumerate(spec_x):
+        if c in cols:
+            values[:, :, k] = cols[c]
+        else:
+            values[:, :, k] = last[c] if c in last.index else 0
+    return ExogStack(index=idx, columns=tuple(spec_x), values=values)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SCENARIO SWEEP
+# ═══════════════════════════════════════════════════════════════════════════
+# Quantile axis of the sweep cube, low to high
+SWEEP_BANDS = ("lo95", "lo80", "yhat", "hi80", "hi95")
+
+
+def scenario_grid(base: dict, axes: Dict[str, Sequence]) -> List[dict]:
+    """Cartesian product of ``axes`` values over a base scenario, first axis slowest"""
+    names = list(axes)
+    return [
+        {**base, **dict(zip(names, combo))}
+        for combo in itertools.product(*(axes[n] for n in names))
+    ]
+
+
+def _split_param(name: str):
+    """'log_lsm.L1' -> ('log_lsm', 1); ValueError for any other kind of term"""
+    base, sep, lag = name.rpartition(".L")
+    if not (sep and base and lag.isdigit()):
+        raise ValueError(
+            f"ARDL term {name!r} is neither 'const' nor a '<name>.L<k>' lag; "
+            "trend, seasonal and fixed regressors are not supported by the kernel"
+        )
+    return base, int(lag)
+
+
+def ardl_point_stack(kernel: ArdlKernel, df_hist: pd.DataFrame, stack: ExogStack) -> np.ndarray:
+    """ARDL log point forecasts for every scenario, (n_scenarios, horizon).
+
+    The fitted equation is applied directly: const + AR terms on the
+    (forecast) target + distributed lags of the exog, with lags reaching
+    back into history where needed.
+    """
+    n, horizon, _ = stack.values.shape
+    params, y_name = kernel.coef, kernel.y_name
+    const = float(params.get("const", 0.0))
+    terms = [(*_split_param(k), float(v)) for k, v in params.items() if k != "const"]
+    depth = max([lag for _, lag, _ in terms], default=0)
+
+    def extended(col):
+        hist = df_hist[col].to_numpy(dtype=float)[-depth:] if depth else np.empty(0)
+        fut = stack.select([col])[:, :, 0] if col != y_name else np.full((n, horizon), np.nan)
+        return np.hstack([np.broadcast_to(hist, (n, len(hist))), fut])
+
+    series = {col: extended(col) for col in {c for c, _, _ in terms}}
+    y = series.setdefault(y_name, extended(y_name))
+    for i in range(horizon):
+        t = depth + i
+        y[:, t] = const + sum(b * series[col][:, t - lag] for col, lag, b in terms)
+    return y[:, depth:].copy()
+
+
+def arimax_point_stack(kernel: SarimaxKernel, stack: ExogStack) -> np.ndarray:
+    """SARIMAX log point forecasts for every scenario, (n_scenarios, horizon).
+
+    With regression errors y = X.beta + u, only the X.beta part depends on
+    the scenario, so one state-space forecast plus a matrix product covers
+    the whole grid.
+    """
+    mean, _ = kernel.state_forecast(len(stack.index))
+    return mean + stack.select(list(kernel.exog_names)) @ kernel.beta
+
+
+def point_forecast_stack(
+    bundle_head: dict,
+    df_hist: pd.DataFrame,
+    model_kind: str,
+    stack: ExogStack,
+) -> np.ndarray:
+    """Log point forecasts (n_scenarios, horizon) for one head and model"""
+    if model_kind == "ardl":
+        return ardl_point_stack(bundle_head["ardl"]["kernel"], df_hist, stack)
+    if model_kind == "arimax":
+        return arimax_point_stack(bundle_head["arimax"]["kernel"], stack)
+    if model_kind == "enet":
+        enet = bundle_head["enet"]
+        n, horizon, _ = stack.values.shape
+        return simulate_enet_paths(
+            enet["kernel"], enet["lag_plan"], df_hist, stack, bundle_head["spec"]["y"], np.zeros((n, horizon))
+        )
+    raise ValueError(f"unknown model kind: {model_kind!r}")
+
+
+def sweep_cube(yhat_log: np.ndarray, base_bands: pd.DataFrame) -> np.ndarray:
+    """(n_scenarios, horizon, len(SWEEP_BANDS)) level cube from one band frame.
+
+    Every model here is linear in log space and its noise does not depend on
+    the exog path, so under common random numbers each scenario's bands are
+    the base scenario's log offsets around its own point forecast.
+    """
+    offsets = np.log(base_bands[list(SWEEP_BANDS)].to_numpy()) - np.log(base_bands[["yhat"]].to_numpy())
+    return np.exp(yhat_log[:, :, None] + offsets[None, :, :])
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# DRIVER ATTRIBUTION
+# ═══════════════════════════════════════════════════════════════════════════
+ATTRIBUTION_DRIVERS = tuple(GROWTH_DRIVERS) + ("inflation_level", "covid_on", "regime_on")
+_SWITCHES = ("covid_on", "regime_on")
+
+
+class DriverAttribution(NamedTuple):
+    """Exact per-driver decomposition of one head's log point forecast"""
+    years: np.ndarray
+    drivers: Tuple[str, ...]
+    reference: np.ndarray      # (horizon,) log forecast of the reference scenario
+    scenario: np.ndarray       # (horizon,) log forecast of the scenario
+    contributions: np.ndarray  # (horizon, n_drivers); reference + sum = scenario
+    jacobian: np.ndarray       # (horizon, n_drivers) d log yhat / d driver (per pp; 0 for switches)
+    low: np.ndarray            # (horizon, n_drivers) log change at driver - step (switch off)
+    high: np.ndarray           # (horizon, n_drivers) log change at driver + step (switch on)
+
+    def level_contributions(self) -> np.ndarray:
+        """Contributions in levels, summing exactly to the level change.
+
+        Log contributions are additive; the level change is split across
+        drivers in proportion to them.
+        """
+        total_log = self.scenario - self.reference
+        total_level = np.exp(self.scenario) - np.exp(self.reference)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(np.abs(total_log) > 1e-12, total_level / total_log, np.exp(self.reference))
+        return self.contributions * scale[:, None]
+
+
+def reference_scenario(scenario: dict, df_hist: pd.DataFrame) -> dict:
+    """Zero growth, last observed inflation, policy switches off"""
+    ref = {**scenario, **{p: 0.0 for p in GROWTH_DRIVERS}}
+    ref["inflation_level"] = float(df_hist["inflation"].iloc[-1])
+    ref.update({s: False for s in _SWITCHES})
+    return ref
+
+
+def _driver_derivatives(stack: ExogStack, scenario: dict) -> np.ndarray:
+    """d exog / d driver, shape (horizon, n_cols, n_drivers), for one scenario"""
+    horizon, cols = len(stack.index), stack.columns
+    out = np.zeros((horizon, len(cols), len(ATTRIBUTION_DRIVERS)))
+    steps = np.arange(1, horizon + 1)
+    for p, driver in enumerate(ATTRIBUTION_DRIVERS):
+        if driver in GROWTH_DRIVERS and GROWTH_DRIVERS[driver] in cols and not scenario.get("use_univariate"):
+            # X_h = last + h * log1p(g / 100)
+            out[:, cols.index(GROWTH_DRIVERS[driver]), p] = steps / (100.0 + scenario[driver])
+        elif driver == "inflation_level" and "inflation" in cols:
+            out[:, cols.index("inflation"), p] = 1.0
+    return out
+
+
+def driver_attribution(
+    bundle_head: dict,
+    df_hist: pd.DataFrame,
+    model_kind: str,
+    horizon: int,
+    scenario: dict,
+    reference: dict = None,
+    step: float = 1.0,
+) -> DriverAttribution:
+    """Contributions, Jacobians and +/- step effects of every driver in one pass.
+
+    All models are linear in the log exog, and each driver moves its own
+    exog columns, so switching drivers one at a time from the reference
+    decomposes the forecast exactly. The exog Jacobian comes from unit bumps
+    of every (year, column) cell, evaluated with the other scenarios in a
+    single stacked forecast.
+    """
+    spec_x = bundle_head["spec"]["x"]
+    ref = reference or reference_scenario(scenario, df_hist)
+    n_drv = len(ATTRIBUTION_DRIVERS)
+
+    rows = [ref, scenario]
+    rows += [{**ref, d: scenario[d]} for d in ATTRIBUTION_DRIVERS]
+    rows += [{**scenario, d: False if d in _SWITCHES else scenario[d] - step} for d in ATTRIBUTION_DRIVERS]
+    rows += [{**scenario, d: True if d in _SWITCHES else scenario[d] + step} for d in ATTRIBUTION_DRIVERS]
+    stack = build_exog_stack(df_hist, horizon, spec_x, rows)
+
+    n_cols = len(spec_x)
+    bumps = np.repeat(stack.values[1:2], 1 + horizon * n_cols, axis=0)
+    cells = np.arange(horizon * n_cols)
+    bumps[1 + cells, cells // n_cols, cells % n_cols] += 1.0
+    stack = stack._replace(values=np.concatenate([stack.values, bumps]))
+
+    P = point_forecast_stack(bundle_head, df_hist, model_kind, stack)
+    ref_log, scen_log = P[0], P[1]
+    contrib = (P[2:2 + n_drv] - ref_log).T
+    low = (P[2 + n_drv:2 + 2 * n_drv] - scen_log).T
+    high = (P[2 + 2 * n_drv:2 + 3 * n_drv] - scen_log).T
+
+    jac_start = 2 + 3 * n_drv
+    J = (P[jac_start + 1:] - P[jac_start]).reshape(horizon, n_cols, horizon)  # (h_in, col, h_out)
+    dX = _driver_derivatives(stack, scenario)
+    jacobian = np.einsum("ikh,ikp->hp", J, dX)
+
+    return DriverAttribution(
+        years=np.asarray(stack.index.year, dtype=int),
+        drivers=ATTRIBUTION_DRIVERS,
+        reference=ref_log,
+        scenario=scen_log,
+        contributions=contrib,
+        jacobian=jacobian,
+        low=low,
+        high=high,
+    )
@@ -0,0 +1,211 @@
+"""Warm process pool for per-head forecast simulation.
+
+Each worker maps the shared model store once, in its initializer, and then
+serves any number of (head, model, scenario) path simulations. Tasks carry
+only the scenario frame and simulation settings; results come back as the
+compact float32 arrays of ``ForecastPaths.to_arrays()``. Every task derives
+its RNG stream from (seed, head, model), so pooled results are identical to
+running the same forecasts serially.
+"""
+from __future__ import annotations
+
+import contextlib
+import multiprocessing as mp
+import os
+import sys
+import threading
+import types
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from forecast_engine import (
+    ForecastPaths,
+    forecast_rng,
+    path_stream_labels,
+    simulate_head_paths,
+)
+from model_store import open_model_assets
+from tax_forecaster import TAX_HEADS
+
+# Per-process state filled by _init_worker
+_WORKER: Dict[str, object] = {}
+
+
+def _init_worker(bundle_path: str, data_path: str):
+    bundle, df = open_model_assets(bundle_path, data_path)
+    _WORKER["bundle"] = bundle
+    _WORKER["df_hist"] = df
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _run_paths(
+    model_kind: str,
+    head: str,
+    horizon: int,
+    exog_future: pd.DataFrame,
+    n_sims: int,
+    mc_mode: str,
+    seed: int,
+    crn: bool,
+    df_hist: Optional[pd.DataFrame] = None,
+    kernel=None,
+) -> dict:
+    bundle_head = _WORKER["bundle"]["models"][head]
+    if kernel is not None:
+        bundle_head = {**bundle_head, model_kind: {**bundle_head[model_kind], "kernel": kernel}}
+    rng = forecast_rng(seed, *path_stream_labels(model_kind, head, exog_future, crn))
+    paths = simulate_head_paths(
+        bundle_head, _WORKER["df_hist"] if df_hist is None else df_hist,
+        model_kind, horizon, exog_future, n_sims, mc_mode, rng,
+    )
+    return paths.to_arrays()
+
+
+@contextlib.contextmanager
+def _detached_main():
+    """Hide the host script while worker processes start.
+
+    Spawn/forkserver children re-run the parent's ``__main__`` by path, and
+    under Streamlit that is the dashboard script itself.
+    """
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+def default_workers() -> int:
+    """One worker per core, capped by the number of tax heads"""
+    return min(len(TAX_HEADS), os.cpu_count() or 1)
+
+
+class ForecastPool:
+    """Pre-started worker processes holding a loaded bundle each"""
+
+    def __init__(self, bundle_path: str, data_path: str, max_workers: Optional[int] = None):
+        # forkserver/spawn: never fork a process that already runs server threads
+        method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        self.max_workers = max_workers or default_workers()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=mp.get_context(method),
+            initializer=_init_worker,
+            initargs=(os.path.abspath(bundle_path), os.path.abspath(data_path)),
+        )
+        self._spawn_lock = threading.Lock()
+        self._started = False
+
+    def warm(self):
+        """Spawn every worker now, so bundles load before the first request.
+
+        One no-op task per worker is submitted back to back and awaited;
+        workers take far longer to start (imports, bundle load) than the
+        submits, so none is idle to take a second task and each submit
+        starts a process. Workers are only started here, so ``__main__`` is
+        swapped out once, under a lock, rather than around every submit.
+        """
+        with self._spawn_lock:
+            if self._started:
+                return
+            with _detached_main():
+                futures = [self._executor.submit(_ping) for _ in range(self.max_workers)]
+            for f in futures:
+                f.result()
+            self._started = True
+
+    def submit_paths(
+        self,
+        model_kind: str,
+        head: str,
+        horizon: int,
+        exog_future: pd.DataFrame,
+        n_sims: int = 500,
+        mc_mode: str = "iid",
+        seed: int = 0,
+        crn: bool = True,
+        df_hist: Optional[pd.DataFrame] = None,
+        kernel=None,
+    ) -> Future:
+        """Queue one simulation; the future resolves to ``to_arrays()`` output.
+
+        ``df_hist`` and ``kernel`` replace the worker's base history and the
+        model's kernel for this task only (e.g. after incremental updates).
+        """
+        # All workers are running after warm(), so a submit never spawns one
+        self.warm()
+        return self._executor.submit(
+            _run_paths, model_kind, head, int(horizon), exog_future,
+            int(n_sims), mc_mode, int(seed), bool(crn), df_hist, kernel,
+        )
+
+    def map_paths(self, tasks: Sequence[dict], df_hist: Optional[pd.DataFrame] = None) -> List[ForecastPaths]:
+        """Run ``submit_paths(**task)`` for every task concurrently, in order"""
+        futures = [self.submit_paths(**task, df_hist=df_hist) for task in tasks]
+        return [ForecastPaths.from_arrays(f.result()) for f in futures]
+
+    def shutdown(self, cancel_futures: bool = True):
+        self._executor.shutdown(wait=False, cancel_futures=cancel_futures)
+
+
+class Prefetcher:
+    """Bounded, cancellable background warm-up of one scenario's results.
+
+    Jobs are plain callables run on a shared executor, at most
+    ``max_in_flight`` at a time for this prefetcher; the next queued job is
+    submitted as one finishes. Starting a different scenario cancels
+    whatever is still queued for the previous one (a job already running is
+    left to finish; its result simply lands in the caches).
+    """
+
+    def __init__(self, executor: Executor, max_in_flight: int = 2):
+        self._executor = executor
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._lock = threading.RLock()
+        self._cancelled = threading.Event()
+        self._queue: List[Tuple[Hashable, Callable[[], object]]] = []
+        self._futures: Dict[Hashable, Future] = {}
+        self.signature: Optional[Hashable] = None
+
+    def start(self, signature: Hashable, jobs: Dict[Hashable, Callable[[], object]]):
+        """Prefetch ``jobs`` for ``signature`` unless it is already underway"""
+        with self._lock:
+            if signature == self.signature:
+                return
+            self.cancel()
+            self.signature = signature
+            self._cancelled = threading.Event()
+            self._queue = list(jobs.items())
+            for _ in range(self.max_in_flight):
+                self._submit_next(self._cancelled)
+
+    def _submit_next(self, cancelled: threading.Event):
+        with self._lock:
+            if cancelled.is_set() or not self._queue:
+                return
+            key, fn = self._queue.pop(0)
+            future = self._executor.submit(fn)
+            self._futures[key] = future
+        future.add_done_callback(lambda _f: self._submit_next(cancelled))
+
+    def cancel(self):
+        """Drop queued jobs and cancel submitted ones that have not started"""
+        with self._lock:
+            self._cancelled.set()
+            self._queue.clear()
+            for future in self._futures.values():
+                future.cancel()
+            self._futures = {}
+            self.signature = None
+
+    def progress(self) -> Tuple[int, int]:
+        """(finished, total) jobs for the current scenario"""
+        with self._lock:
+            done = sum(f.done() for f in self._futures.values())
+            return done, len(self._futures) + len(self._queue)
@@ -0,0 +1,312 @@
+"""Local HTTP/JSON forecast service over the model bundle (stdlib only).
+
+    python forecast_service.py [--host 127.0.0.1] [--port 8765] [--window-ms 5]
+
+Endpoints (JSON in, JSON out; HTTP/1.1 keep-alive):
+
+    GET  /health     bundle/dataset fingerprints
+    POST /forecast   {"head", "model", "horizon", "exog_params", "n_sims",
+                      "mc_mode", "seed", "crn", "interval_method"}
+    POST /total      {"horizon", "exog_params", "n_sims", "mc_mode", "seed", "crn"}
+    POST /sweep      {"head", "model", "horizon", "scenarios": [exog_params...], ...}
+
+/total bands assume independent head errors; the response says so in
+``band_basis`` ("independent_heads").
+
+``exog_params`` only needs the assumptions that differ from the dashboard
+defaults; ``model`` may be "best" (best by MAPE for the head). Concurrent
+/forecast requests for the same head, model and settings (with common random
+numbers) are micro-batched into one stacked sweep evaluation.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import os
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Hashable, List, Tuple
+
+from forecast_engine import INTERVAL_METHODS, MC_MODES, SWEEP_BANDS
+from result_store import ResultStore
+from tax_forecaster import MC_DEFAULT_SEED, MODEL_KINDS, TAX_HEADS, TOTAL_BAND_BASIS, TaxForecaster
+
+log = logging.getLogger("forecast_service")
+
+MAX_HORIZON = 10
+MAX_SIMS = 5000
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# MICRO-BATCHING
+# ═══════════════════════════════════════════════════════════════════════════
+class MicroBatcher:
+    """Coalesce concurrent calls with the same key into one batch call.
+
+    The first caller for a key becomes the batch leader: it waits up to
+    ``window`` seconds (less if the batch fills), then runs
+    ``fn(key, items)`` once and hands every caller its own result.
+    """
+
+    def __init__(self, fn: Callable[[Hashable, List], List], window: float = 0.005, max_batch: int = 64):
+        self._fn = fn
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, Tuple[List, threading.Event]] = {}
+
+    def submit(self, key: Hashable, item):
+        """Result of ``item`` as computed in its batch; blocks until done.
+
+        Returns (result, batch_size).
+        """
+        future = Future()
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = ([], threading.Event())
+            entries, full = batch
+            entries.append((item, future))
+            if len(entries) >= self.max_batch:
+                # Close the batch; later arrivals start a new one
+                del self._pending[key]
+                full.set()
+
+        if leader:
+            full.wait(self.window)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+            try:
+                results = self._fn(key, [item for item, _ in entries])
+                for (_, f), res in zip(entries, results):
+                    f.set_result((res, len(entries)))
+            except Exception as exc:
+                for _, f in entries:
+                    f.set_exception(exc)
+        return future.result()
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# REQUEST HANDLING
+# ═══════════════════════════════════════════════════════════════════════════
+class BadRequest(ValueError):
+    pass
+
+
+def _flag(body: dict, name: str, default: bool) -> bool:
+    """A JSON boolean field; strings such as "false" are rejected, not truthy"""
+    value = body.get(name, default)
+    if not isinstance(value, bool):
+        raise BadRequest(f"{name} must be true or false")
+    return value
+
+
+def _frame_json(df) -> dict:
+    out = {"years": [int(p.year) for p in df.index]}
+    out.update({c: [float(v) for v in df[c]] for c in df.columns})
+    return out
+
+
+class ForecastAPI:
+    """Validates requests and routes them to the engine"""
+
+    def __init__(self, engine: TaxForecaster, window: float = 0.005, max_batch: int = 64):
+        self.engine = engine
+        self.batcher = MicroBatcher(self._run_batch, window=window, max_batch=max_batch)
+
+    def _settings(self, body: dict, with_interval: bool = True) -> dict:
+        horizon = int(body.get("horizon", 5))
+        n_sims = int(body.get("n_sims", 500))
+        mc_mode = body.get("mc_mode", "iid")
+        if not 1 <= horizon <= MAX_HORIZON:
+            raise BadRequest(f"horizon must be 1..{MAX_HORIZON}")
+        if not 1 <= n_sims <= MAX_SIMS:
+            raise BadRequest(f"n_sims must be 1..{MAX_SIMS}")
+        if mc_mode not in MC_MODES:
+            raise BadRequest(f"mc_mode must be one of {sorted(MC_MODES)}")
+        out = {
+            "horizon": horizon,
+            "n_sims": n_sims,
+            "mc_mode": mc_mode,
+            "seed": int(body.get("seed", MC_DEFAULT_SEED)),
+        }
+        if with_interval:
+            method = body.get("interval_method", "bootstrap")
+            if method not in INTERVAL_METHODS:
+                raise BadRequest(f"interval_method must be one of {sorted(INTERVAL_METHODS)}")
+            out["interval_method"] = method
+        return out
+
+    def _head_model(self, body: dict) -> Tuple[str, str]:
+        head = body.get("head")
+        if head not in TAX_HEADS:
+            raise BadRequest(f"head must be one of {list(TAX_HEADS)}")
+        model = body.get("model", "best")
+        if model == "best":
+            model = self.engine.best_model(head)
+        if model not in MODEL_KINDS:
+            raise BadRequest(f"model must be 'best' or one of {list(MODEL_KINDS)}")
+        return head, model
+
+    def _exog(self, params) -> dict:
+        """Full scenario for one request, validated before it can join a batch.
+
+        Keys must be scenario parameters (``DEFAULT_EXOG_PARAMS`` plus
+        ``inflation_level``); switches must be booleans, the rest numbers.
+        """
+        if not isinstance(params, dict):
+            raise BadRequest("exog_params must be an object")
+        defaults = self.engine.exog_params()
+        unknown = sorted(set(params) - set(defaults))
+        if unknown:
+            raise BadRequest(f"unknown exog_params {unknown}; expected any of {sorted(defaults)}")
+        clean = {}
+        for name, value in params.items():
+            if isinstance(defaults[name], bool):
+                if not isinstance(value, bool):
+                    raise BadRequest(f"exog_params.{name} must be true or false")
+                clean[name] = value
+            elif isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise BadRequest(f"exog_params.{name} must be a finite number")
+            else:
+                clean[name] = float(value)
+        return self.engine.exog_params(clean)
+
+    def _run_batch(self, key, scenarios: List[dict]) -> List:
+        head, model, horizon, n_sims, mc_mode, seed, method = key
+        return self.engine.forecast_batch(
+            model, head, horizon, scenarios, n_sims, mc_mode=mc_mode, seed=seed, interval_method=method,
+        )
+
+    def forecast(self, body: dict) -> dict:
+        head, model = self._head_model(body)
+        cfg = self._settings(body)
+        exog = self._exog(body.get("exog_params", {}))
+        if _flag(body, "crn", True):
+            key = (head, model, cfg["horizon"], cfg["n_sims"], cfg["mc_mode"], cfg["seed"], cfg["interval_method"])
+            frame, batch = self.batcher.submit(key, exog)
+        else:
+            # Independent draws per scenario cannot share a simulation
+            frame, batch = self.engine.forecast_category(model, head, crn=False, exog_params=exog, **cfg), 1
+        return {"head": head, "model": model, "batch_size": batch, **_frame_json(frame)}
+
+    def total(self, body: dict) -> dict:
+        cfg = self._settings(body, with_interval=False)
+        exog = self._exog(body.get("exog_params", {}))
+        frame = self.engine.forecast_total(
+            cfg["horizon"], exog, cfg["n_sims"], mc_mode=cfg["mc_mode"], seed=cfg["seed"],
+            crn=_flag(body, "crn", True),
+        )
+        return {
+            "models": {h: self.engine.best_model(h) for h in TAX_HEADS},
+            "band_basis": TOTAL_BAND_BASIS,
+            **_frame_json(frame),
+        }
+
+    def sweep(self, body: dict) -> dict:
+        head, model = self._head_model(body)
+        cfg = self._settings(body)
+        scenarios = body.get("scenarios")
+        if not isinstance(scenarios, list) or not scenarios:
+            raise BadRequest("scenarios must be a non-empty list")
+        cube, years = self.engine.sweep(
+            model, head, cfg["horizon"], [self._exog(s) for s in scenarios], cfg["n_sims"],
+            mc_mode=cfg["mc_mode"], seed=cfg["seed"], interval_method=cfg["interval_method"],
+        )
+        return {
+            "head": head,
+            "model": model,
+            "years": [int(y) for y in years],
+            "bands": list(SWEEP_BANDS),
+            "cube": cube.tolist(),
+        }
+
+    def health(self) -> dict:
+        return {"status": "ok", "bundle": self.engine.bundle_fp, "dataset": self.engine.dataset_fp}
+
+
+class ForecastHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive; every response sets Content-Length
+    api: ForecastAPI = None
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, self.api.health())
+        else:
+            self._send(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        routes = {"/forecast": self.api.forecast, "/total": self.api.total, "/sweep": self.api.sweep}
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError("negative Content-Length")
+        except ValueError as exc:
+            # The body cannot be delimited, so the connection cannot be reused
+            self.close_connection = True
+            self._send(400, {"error": f"bad Content-Length header: {exc}"})
+            return
+        raw = self.rfile.read(length) if length else b"{}"
+        route = routes.get(self.path)
+        if route is None:
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            body = json.loads(raw or b"{}")
+            if not isinstance(body, dict):
+                raise BadRequest("request body must be a JSON object")
+            self._send(200, route(body))
+        except (BadRequest, json.JSONDecodeError, TypeError, ValueError) as exc:
+            self._send(400, {"error": str(exc)})
+        except Exception as exc:  # pragma: no cover - surfaced to the client
+            log.exception("request failed")
+            self._send(500, {"error": f"{type(exc).__name__}: {exc}"})
+
+    def log_message(self, fmt, *args):
+        log.info("%s - %s", self.address_string(), fmt % args)
+
+
+def make_server(engine: TaxForecaster, host: str = "127.0.0.1", port: int = 8765, window: float = 0.005) -> ThreadingHTTPServer:
+    """Bound (not yet serving) server; call serve_forever() on it"""
+    handler = type("BoundForecastHandler", (ForecastHandler,), {"api": ForecastAPI(engine, window=window)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve tax forecasts over local HTTP/JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--window-ms", type=float, default=5.0, help="micro-batch collection window")
+    parser.add_argument("--db", default=os.environ.get("FORECAST_RESULT_DB", "forecast_results.sqlite"))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    engine = TaxForecaster(store=ResultStore(args.db))
+    engine.bundle  # load before accepting requests
+    server = make_server(engine, args.host, args.port, window=args.window_ms / 1000.0)
+    log.info("serving on http://%s:%d", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
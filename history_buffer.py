@@ -0,0 +1,113 @@
+"""Append-only buffer of user-entered years on top of the base history.
+
+A session's custom rows used to be replayed on every script run: one
+single-row frame, column back-fill and ``pd.concat`` per row, then a sort.
+HistoryBuffer keeps the rows column by column in arrays that grow by
+doubling, and materialises the extended frame (and its dataset
+fingerprint) once per version. Every append, clear or rebase bumps the
+version; reruns in between reuse the same frame.
+
+    buf = HistoryBuffer(df_hist)
+    buf.append(2026, {"log_gst": 8.4, ...})
+    df_ext, fp = buf.frame(), buf.fingerprint()
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from forecast_engine import dataset_fingerprint
+
+
+class HistoryBuffer:
+    """Year-indexed base frame plus appended rows, materialised lazily"""
+
+    def __init__(self, base: pd.DataFrame, capacity: int = 4):
+        self._lock = threading.Lock()
+        self._capacity = max(1, capacity)
+        self.version = 0
+        self._frame: Optional[Tuple[int, pd.DataFrame, str]] = None
+        self._reset(base)
+
+    def _reset(self, base: pd.DataFrame):
+        self.base = base
+        self.columns = list(base.columns)
+        self._n = 0
+        self._years = np.empty(self._capacity, dtype=np.int64)
+        self._cols: Dict[str, np.ndarray] = {
+            c: np.empty(self._capacity, dtype=float if pd.api.types.is_numeric_dtype(base[c]) else object)
+            for c in self.columns
+        }
+        self.version += 1
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def years(self) -> Tuple[int, ...]:
+        """Appended years, in the order they were added"""
+        return tuple(int(y) for y in self._years[:self._n])
+
+    # ─── Writes ───
+    def append(self, year: int, data: dict):
+        """Add one year; columns missing from ``data`` repeat the previous row"""
+        with self._lock:
+            if self._n == len(self._years):
+                grow = len(self._years)
+                self._years = np.concatenate([self._years, np.empty(grow, dtype=self._years.dtype)])
+                for c, arr in self._cols.items():
+                    self._cols[c] = np.concatenate([arr, np.empty(grow, dtype=arr.dtype)])
+            i = self._n
+            self._years[i] = int(year)
+            for c, arr in self._cols.items():
+                if c in data:
+                    arr[i] = data[c]
+                else:
+                    arr[i] = arr[i - 1] if i else self.base[c].iloc[-1]
+            self._n += 1
+            self.version += 1
+
+    def clear(self):
+        """Drop every appended row"""
+        with self._lock:
+            self._reset(self.base)
+
+    def rebase(self, base: pd.DataFrame):
+        """Put the appended rows on top of a new base history (no-op if unchanged)"""
+        with self._lock:
+            if base is self.base:
+                return
+            years = self._years[:self._n].copy()
+            cols = {c: arr[:self._n].copy() for c, arr in self._cols.items()}
+            self._reset(base)
+        for i, year in enumerate(years):
+            self.append(year, {c: arr[i] for c, arr in cols.items() if c in self._cols})
+
+    # ─── Reads ───
+    def _materialise(self) -> Tuple[int, pd.DataFrame, str]:
+        with self._lock:
+            cached = self._frame
+            if cached is not None and cached[0] == self.version:
+                return cached
+            version, n = self.version, self._n
+            added = pd.DataFrame(
+                {c: arr[:n] for c, arr in self._cols.items()},
+                index=pd.PeriodIndex(self._years[:n], freq="Y"),
+            )
+        frame = pd.concat([self.base, added]).sort_index() if n else self.base
+        cached = (version, frame, dataset_fingerprint(frame))
+        with self._lock:
+            if self.version == version:
+                self._frame = cached
+        return cached
+
+    def frame(self) -> pd.DataFrame:
+        """Base history extended by the appended rows, sorted by year"""
+        return self._materialise()[1]
+
+    def fingerprint(self) -> str:
+        """Dataset version of ``frame()``"""
+        return self._materialise()[2]
@@ -0,0 +1,205 @@
+"""Read-only model store memory-mapped by every forecasting process.
+
+    python model_store.py build [--bundle tax_models_bundle.npz] [--data tax_prepared_data.csv]
+    python model_store.py info [tax_models_bundle.npz.store]
+
+One file holds everything a process needs to forecast: the model kernels,
+residual pools and coefficient tables of a bundle plus the prepared history,
+one column per array. Processes map it read-only and wrap the arrays in
+place, so the dashboard, its pool workers and batch workers on a box all
+read the same page-cache pages instead of each unpickling and parsing a
+private copy.
+
+Layout: 8-byte magic, little-endian uint64 header length, JSON header
+(sources, bundle metadata, array table), then the raw arrays, each
+64-byte aligned.
+
+The store is derived: ``open_model_assets`` rebuilds it (write, then
+rename) whenever the bundle or the history file no longer match the
+fingerprints in its header, and falls back to a private load if the
+directory is not writable.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from compact_bundle import assemble_bundle, flatten_bundle
+from forecast_engine import attach_model_kernels, load_model_assets
+from result_store import file_fingerprint
+
+log = logging.getLogger(__name__)
+
+STORE_MAGIC = b"TAXSTOR1"
+STORE_VERSION = 1
+STORE_SUFFIX = ".store"
+_ALIGN = 64
+_PREAMBLE = struct.Struct("<8sQ")
+
+
+def store_path_for(bundle_path: str) -> str:
+    """Default store file of a bundle: next to it, named after it"""
+    return bundle_path + STORE_SUFFIX
+
+
+def _source(path: str) -> dict:
+    return {"file": os.path.basename(path), "fingerprint": file_fingerprint(path)}
+
+
+def _aligned(n: int) -> int:
+    return -(-n // _ALIGN) * _ALIGN
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# WRITE
+# ═══════════════════════════════════════════════════════════════════════════
+def write_model_store(bundle: dict, df: pd.DataFrame, path: str, sources: dict):
+    """Write a kernel-attached bundle and its year-indexed history to ``path``"""
+    if not isinstance(df.index, pd.PeriodIndex):
+        raise ValueError("history must be year-indexed (PeriodIndex)")
+    arrays, models = flatten_bundle(bundle)
+    for col in df.columns:
+        arrays[f"history/{col}"] = df[col].to_numpy()
+
+    # Bundles read from the pickle are their own source of full results
+    source = bundle.get("compact", {}).get("source", sources["bundle"])
+    table, offset = {}, 0
+    for name, arr in arrays.items():
+        arr = arrays[name] = np.ascontiguousarray(arr)
+        if arr.dtype.hasobject:
+            raise ValueError(f"{name}: object arrays cannot be memory-mapped")
+        table[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset = _aligned(offset + arr.nbytes)
+
+    header = json.dumps({
+        "format": "tax-forecast-store",
+        "version": STORE_VERSION,
+        "sources": sources,
+        "bundle": {"models": models, "meta": bundle.get("meta", {}), "source": source, "version": STORE_VERSION},
+        "history": {
+            "years": [int(p.year) for p in df.index],
+            "columns": [str(c) for c in df.columns],
+        },
+        "arrays": table,
+    }).encode()
+    data_start = _aligned(_PREAMBLE.size + len(header))
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBLE.pack(STORE_MAGIC, len(header)))
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(data_start + table[name]["offset"])
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# READ
+# ═══════════════════════════════════════════════════════════════════════════
+def _read_header(buf) -> Tuple[dict, int]:
+    magic, n = _PREAMBLE.unpack_from(buf, 0)
+    if magic != STORE_MAGIC:
+        raise ValueError("not a model store")
+    header = json.loads(bytes(buf[_PREAMBLE.size:_PREAMBLE.size + n]))
+    if header.get("version") != STORE_VERSION:
+        raise ValueError(f"model store version {header.get('version')} is not supported")
+    return header, _aligned(_PREAMBLE.size + n)
+
+
+def read_store_header(path: str) -> dict:
+    """Header of a store file, without mapping its arrays"""
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        return _read_header(preamble + f.read(_PREAMBLE.unpack(preamble)[1]))[0]
+
+
+def open_model_store(path: str) -> Tuple[dict, pd.DataFrame]:
+    """(bundle, history) whose arrays are read-only views of the mapped file"""
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header, data_start = _read_header(buf)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+        count = int(np.prod(shape, dtype=np.int64))
+        arrays[name] = np.frombuffer(buf, dtype=dtype, count=count, offset=data_start + spec["offset"]).reshape(shape)
+
+    hist = header["history"]
+    df = pd.DataFrame(
+        {c: arrays.pop(f"history/{c}") for c in hist["columns"]},
+        index=pd.PeriodIndex(hist["years"], freq="Y"),
+        copy=False,
+    )
+    bundle = assemble_bundle(header["bundle"], arrays)
+    attach_model_kernels(bundle, df)
+    return bundle, df
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SHARED LOADING
+# ═══════════════════════════════════════════════════════════════════════════
+def ensure_model_store(bundle_path: str, data_path: str, store_path: Optional[str] = None) -> str:
+    """Path of a store matching the bundle and history, (re)building it if needed.
+
+    Concurrent builders each write a private temp file and rename it into
+    place, so readers only ever see a complete store.
+    """
+    store_path = store_path or store_path_for(bundle_path)
+    sources = {"bundle": _source(bundle_path), "data": _source(data_path)}
+    try:
+        if read_store_header(store_path)["sources"] == sources:
+            return store_path
+    except (OSError, ValueError, struct.error):
+        pass
+    bundle, df = load_model_assets(bundle_path, data_path)
+    write_model_store(bundle, df, store_path, sources)
+    log.info("built model store %s", store_path)
+    return store_path
+
+
+def open_model_assets(bundle_path: str, data_path: str) -> Tuple[dict, pd.DataFrame]:
+    """Bundle and history from the shared store; a private load if it cannot be written"""
+    try:
+        return open_model_store(ensure_model_store(bundle_path, data_path))
+    except OSError as exc:
+        log.warning("model store unavailable (%s); loading %s privately", exc, bundle_path)
+        return load_model_assets(bundle_path, data_path)
+
+
+def main(argv=None):
+    from tax_forecaster import DATA_CSV, default_bundle_path
+
+    parser = argparse.ArgumentParser(description="Build or inspect the shared model store")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    build = sub.add_parser("build", help="(re)build the store of a bundle if it is stale")
+    build.add_argument("--bundle", default=None, help="default: compact bundle if current, else the pickle")
+    build.add_argument("--data", default=DATA_CSV)
+    info = sub.add_parser("info", help="print a store's sources and array table size")
+    info.add_argument("path", nargs="?", default=None)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        path = ensure_model_store(args.bundle or default_bundle_path(), args.data)
+        print(f"{path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    else:
+        path = args.path or store_path_for(default_bundle_path())
+        header = read_store_header(path)
+        nbytes = sum(np.dtype(s["dtype"]).itemsize * int(np.prod(s["shape"])) for s in header["arrays"].values())
+        print(f"{path}: {len(header['arrays'])} arrays, {nbytes / 1024:.0f} KB of data")
+        for kind, src in header["sources"].items():
+            print(f"  {kind}: {src['file']} [{src['fingerprint']}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Persistent forecast result store (SQLite index + compressed NumPy blobs).
+
+Survives restarts and deploys. Entries are keyed by a hash of everything a
+forecast depends on (including ``forecast_engine.ENGINE_VERSION``) and evicted least-recently-used once the store grows past
+its size budget. Run ``python result_store.py --help`` for maintenance.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+# Bundles `prune` keeps when none are named: the pickle and its compact export
+DEFAULT_BUNDLES = ("tax_models_bundle.pkl", "tax_models_bundle.npz")
+
+
+def file_fingerprint(path: str, chunk: int = 1 << 20) -> str:
+    """sha256 of a file's bytes (used to tag entries with their bundle)"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def result_key(**parts) -> str:
+    """Canonical hash of the key parts (order-insensitive, JSON-normalised)"""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _pack(arrays: Dict[str, np.ndarray]) -> bytes:
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **arrays)
+    return buf.getvalue()
+
+
+def _unpack(blob: bytes) -> Dict[str, np.ndarray]:
+    with np.load(io.BytesIO(blob), allow_pickle=False) as npz:
+        return {k: npz[k] for k in npz.files}
+
+
+class ResultStore:
+    """Size-bounded LRU store of forecast arrays on local disk"""
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            key         TEXT PRIMARY KEY,
+            bundle_hash TEXT NOT NULL,
+            meta        TEXT NOT NULL,
+            blob        BLOB NOT NULL,
+            nbytes      INTEGER NOT NULL,
+            created     REAL NOT NULL,
+            last_used   REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_results_lru ON results(last_used);
+        CREATE INDEX IF NOT EXISTS idx_results_bundle ON results(bundle_hash);
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        with self._connect() as con:
+            con.executescript(self._SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """Arrays stored under ``key`` (touching its LRU stamp), or None"""
+        with self._connect() as con:
+            row = con.execute("SELECT blob FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            con.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return _unpack(row[0])
+
+    def put(self, key: str, bundle_hash: str, arrays: Dict[str, np.ndarray], meta: Optional[dict] = None):
+        """Store arrays under ``key`` and evict old entries if over budget"""
+        blob = _pack(arrays)
+        now = time.time()
+        with self._lock, self._connect() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, bundle_hash, json.dumps(meta or {}, default=str), blob, len(blob), now, now),
+            )
+            self._evict(con)
+
+    def _evict(self, con: sqlite3.Connection):
+        total = con.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        doomed, freed = [], 0
+        for key, nbytes in con.execute("SELECT key, nbytes FROM results ORDER BY last_used"):
+            doomed.append((key,))
+            freed += nbytes
+            if freed >= excess:
+                break
+        con.executemany("DELETE FROM results WHERE key = ?", doomed)
+
+    def prune(self, keep_bundles: Iterable[str]) -> int:
+        """Drop entries of every bundle not in ``keep_bundles``; returns count"""
+        keep = list(keep_bundles)
+        marks = ",".join("?" * len(keep)) or "NULL"
+        with self._lock, self._connect() as con:
+            cur = con.execute(f"DELETE FROM results WHERE bundle_hash NOT IN ({marks})", keep)
+            removed = cur.rowcount
+        with self._connect() as con:
+            con.execute("VACUUM")
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        """Entry count and bytes, overall and per bundle"""
+        with self._connect() as con:
+            rows = con.execute(
+                "SELECT bundle_hash, COUNT(*), SUM(nbytes) FROM results GROUP BY bundle_hash"
+            ).fetchall()
+        return {
+            "entries": sum(r[1] for r in rows),
+            "bytes": sum(r[2] for r in rows),
+            "bundles": {r[0]: {"entries": r[1], "bytes": r[2]} for r in rows},
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or prune the forecast result store")
+    parser.add_argument("--db", default=os.environ.get("FORECAST_RESULT_DB", "forecast_results.sqlite"))
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="show entry counts per bundle")
+    pr = sub.add_parser("prune", help="drop entries of retired bundles")
+    pr.add_argument("--bundle", action="append", default=[], help="bundle file(s) to keep (default: the pickled and compact bundles)")
+    args = parser.parse_args(argv)
+
+    store = ResultStore(args.db)
+    if args.cmd == "stats":
+        print(json.dumps(store.stats(), indent=2))
+    else:
+        paths = args.bundle or [p for p in DEFAULT_BUNDLES if os.path.exists(p)]
+        keep = [file_fingerprint(p) for p in paths]
+        print(f"removed {store.prune(keep)} entries; kept bundles {', '.join(keep)}")
+
+
+if __name__ == "__main__":
+    main()
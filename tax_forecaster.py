@@ -0,0 +1,589 @@
+"""Headless tax revenue forecasting API (no Streamlit).
+
+A TaxForecaster wraps one model bundle, its metadata and the prepared
+history, plus an optional persistent result store and worker pool. Every
+method takes explicit, hashable-friendly inputs, so callers can cache on the
+arguments: the dashboard wraps these methods in its derived-result cache;
+batch jobs, services and notebooks call them directly. ``with_history``
+gives an engine that forecasts from an extended history (e.g. years the
+user has entered) while sharing the loaded bundle.
+
+    from tax_forecaster import TaxForecaster
+    fc = TaxForecaster()
+    fc.forecast_total(5, exog_params)
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import pickle
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from forecast_engine import (
+    ENGINE_VERSION,
+    SWEEP_BANDS,
+    DriverAttribution,
+    ForecastPaths,
+    ardl_analytic_frame,
+    build_exog_stack,
+    dataset_fingerprint,
+    driver_attribution,
+    extend_model_kernels,
+    forecast_rng,
+    gaussian_band_frame,
+    path_stream_labels,
+    point_forecast_stack,
+    simulate_head_paths,
+    sweep_cube,
+    total_paths,
+)
+from model_store import open_model_assets
+from result_store import ResultStore, file_fingerprint, result_key
+
+log = logging.getLogger(__name__)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+BUNDLE_PKL = "tax_models_bundle.pkl"
+BUNDLE_NPZ = "tax_models_bundle.npz"  # compact export of BUNDLE_PKL (compact_bundle.py)
+META_JSON = "tax_models_meta.json"
+DATA_CSV = "tax_prepared_data.csv"
+MC_DEFAULT_SEED = 20240701  # Root seed for the per-request RNG streams
+ARDL_VALIDATION_SIMS = 5000  # Bootstrap reference size for the analytic check
+
+# How total bands combine the heads: each head is simulated on its own
+# stream, so the total's spread treats the heads' errors as independent
+TOTAL_BAND_BASIS = "independent_heads"
+
+# Aggregation order of the heads in every total
+TAX_HEADS = ("customs", "dt", "fed", "gst")
+MODEL_KINDS = ("ardl", "arimax", "enet")
+
+# Dashboard sidebar defaults; inflation defaults to the last observed level
+DEFAULT_EXOG_PARAMS = {
+    "gdp_nonagr_g": 12.0,
+    "lsm_g": 10.0,
+    "imports_g": 10.0,
+    "dutiable_g": 10.0,
+    "cons_g": 12.0,
+    "exrate_g": 8.0,
+    "covid_on": False,
+    "regime_on": True,
+    "use_univariate": False,
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# BUNDLE SELECTION
+# ═══════════════════════════════════════════════════════════════════════════
+def _compact_is_current(npz_path: str, pkl_path: str, data_path: str) -> bool:
+    from compact_bundle import read_compact_meta
+
+    try:
+        meta = read_compact_meta(npz_path)
+        return (
+            meta["source"]["fingerprint"] == file_fingerprint(pkl_path)
+            and meta["data"]["fingerprint"] == file_fingerprint(data_path)
+        )
+    except (OSError, ValueError, KeyError) as exc:
+        log.warning("ignoring %s: %s", npz_path, exc)
+        return False
+
+
+def default_bundle_path(pkl_path: str = BUNDLE_PKL, npz_path: str = BUNDLE_NPZ, data_path: str = DATA_CSV) -> str:
+    """Compact bundle, (re-)exported first if missing or stale; else the pickle.
+
+    The export is current when it was written from this pickle and this data
+    CSV. Without the pickle on disk the compact bundle is used as-is; if the
+    export fails (e.g. a read-only checkout) the pickle is served instead.
+    """
+    if not os.path.exists(pkl_path):
+        return npz_path if os.path.exists(npz_path) else pkl_path
+    if os.path.exists(npz_path) and _compact_is_current(npz_path, pkl_path, data_path):
+        return npz_path
+    from compact_bundle import export_compact_bundle
+
+    try:
+        export_compact_bundle(pkl_path, data_path, npz_path)
+    except (OSError, ValueError) as exc:
+        log.warning("could not export %s (%s); using the pickle", npz_path, exc)
+        return pkl_path
+    log.info("exported %s from %s and %s", npz_path, pkl_path, data_path)
+    return npz_path
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# MODEL SELECTION
+# ═══════════════════════════════════════════════════════════════════════════
+def years_after(df: pd.DataFrame, year) -> int:
+    """Number of rows of a year-indexed frame later than ``year`` (None: 0)"""
+    if year is None:
+        return 0
+    return int((np.asarray(df.index.year) > int(year)).sum())
+
+
+def perf_table(meta) -> pd.DataFrame:
+    """Extract performance metrics"""
+    return pd.DataFrame(meta["performance"])
+
+
+def best_model_by_mape(perf: pd.DataFrame, head: str) -> str:
+    """Find best model by MAE%"""
+    sub = perf[perf["tax_head"] == head].sort_values("mae_pct")
+    return str(sub.iloc[0]["model"])
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SCENARIO BUILDING
+# ═══════════════════════════════════════════════════════════════════════════
+def build_future_exog(
+    df_hist: pd.DataFrame,
+    horizon: int,
+    spec_x: List[str],
+    gdp_nonagr_g: float,
+    lsm_g: float,
+    imports_g: float,
+    dutiable_g: float,
+    cons_g: float,
+    exrate_g: float,
+    inflation_level: float,
+    covid_on: bool,
+    regime_on: bool,
+    use_univariate: bool = False,
+) -> pd.DataFrame:
+    """Build future exogenous variables"""
+    scenario = dict(
+        gdp_nonagr_g=gdp_nonagr_g, lsm_g=lsm_g, imports_g=imports_g, dutiable_g=dutiable_g,
+        cons_g=cons_g, exrate_g=exrate_g, inflation_level=inflation_level,
+        covid_on=covid_on, regime_on=regime_on, use_univariate=use_univariate,
+    )
+    return build_exog_stack(df_hist, horizon, spec_x, [scenario]).frame(0)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# FORECASTER
+# ═══════════════════════════════════════════════════════════════════════════
+class TaxForecaster:
+    """Forecasting core over one bundle; assets load lazily on first use"""
+
+    def __init__(
+        self,
+        bundle_path: Optional[str] = None,
+        meta_path: str = META_JSON,
+        data_path: str = DATA_CSV,
+        store: Optional[ResultStore] = None,
+        pool=None,
+        refresh_ardl: bool = False,
+    ):
+        self.bundle_path = bundle_path or default_bundle_path()
+        self.meta_path = meta_path
+        self.data_path = data_path
+        self.store = store
+        self.refresh_ardl = refresh_ardl
+        self._pool = pool
+        self._base: Optional[TaxForecaster] = None
+        self._lock = threading.Lock()
+        self._assets = None
+        self._full_bundle = None
+
+    # ─── Assets ───
+    def _load(self):
+        with self._lock:
+            if self._assets is None:
+                bundle, df = open_model_assets(self.bundle_path, self.data_path)
+                with open(self.meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                # Actuals newer than the training sample: roll the kernels forward
+                n_new = years_after(df, meta.get("data_span", {}).get("end"))
+                if n_new:
+                    bundle = extend_model_kernels(bundle, df, n_new, self.refresh_ardl)
+                    log.info("kernels extended by %d year(s) past the training sample", n_new)
+                bundle_fp = file_fingerprint(self.bundle_path)
+                dataset_fp = dataset_fingerprint(df)
+                self._assets = {
+                    "bundle": bundle,
+                    "meta": meta,
+                    "df_hist": df,
+                    "perf": perf_table(meta),
+                    "bundle_fp": bundle_fp,
+                    "dataset_fp": dataset_fp,
+                    "version": result_key(
+                        bundle=bundle_fp, meta=file_fingerprint(self.meta_path), dataset=dataset_fp
+                    )[:12],
+                }
+        return self._assets
+
+    def with_history(self, df_hist: pd.DataFrame, dataset_fp: Optional[str] = None) -> "TaxForecaster":
+        """Engine over the same bundle that conditions on ``df_hist`` instead.
+
+        Forecasts, scenario exog and totals start from the last rows of
+        ``df_hist`` (e.g. the base history plus user-entered years), and
+        years appended to the base history are absorbed into the kernels
+        (ARIMAX state, optionally ARDL coefficients) in milliseconds. The
+        view shares this engine's assets, result store and pool; its results
+        are keyed by the new dataset fingerprint, so the base engine's stay
+        valid. ``version`` is unchanged: it names the bundle, not the history.
+        """
+        dataset_fp = dataset_fp or dataset_fingerprint(df_hist)
+        base = self._base or self
+        if dataset_fp == base.dataset_fp:
+            return base
+        view = TaxForecaster(
+            base.bundle_path, base.meta_path, base.data_path, store=base.store, refresh_ardl=base.refresh_ardl
+        )
+        view._base = base
+        assets = base._load()
+        # Years appended after the base history update the kernels incrementally
+        n_new = years_after(df_hist, assets["df_hist"].index.max().year)
+        if n_new and df_hist.index[:-n_new].equals(assets["df_hist"].index):
+            bundle = extend_model_kernels(assets["bundle"], df_hist, n_new, base.refresh_ardl)
+        else:
+            bundle = assets["bundle"]
+        view._assets = {**assets, "bundle": bundle, "df_hist": df_hist, "dataset_fp": dataset_fp}
+        view._full_bundle = base._full_bundle
+        return view
+
+    @property
+    def pool(self):
+        """Worker pool, shared with history views of this engine"""
+        return self._pool if self._base is None else self._base.pool
+
+    @pool.setter
+    def pool(self, pool):
+        if self._base is None:
+            self._pool = pool
+        else:
+            self._base.pool = pool
+
+    def close(self):
+        """Release the worker pool; later calls run serially. No-op on history views"""
+        if self._base is not None:
+            return
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=False)
+
+    @property
+    def bundle(self) -> dict:
+        return self._load()["bundle"]
+
+    @property
+    def meta(self) -> dict:
+        return self._load()["meta"]
+
+    @property
+    def df_hist(self) -> pd.DataFrame:
+        return self._load()["df_hist"]
+
+    @property
+    def perf(self) -> pd.DataFrame:
+        return self._load()["perf"]
+
+    @property
+    def bundle_fp(self) -> str:
+        """Content hash of the model bundle, tags persisted results"""
+        return self._load()["bundle_fp"]
+
+    @property
+    def dataset_fp(self) -> str:
+        """Fingerprint of the history forecasts condition on (the dataset version)"""
+        return self._load()["dataset_fp"]
+
+    @property
+    def version(self) -> str:
+        """Short id of the bundle + metadata + on-disk history this engine serves"""
+        return self._load()["version"]
+
+    def full_results(self, head: str, model_kind: str):
+        """Fitted statsmodels results object (summaries, diagnostics).
+
+        Kernel-only (compact) bundles do not carry it; the source pickle
+        named in the compact metadata is loaded once, on first request.
+        """
+        model = self.bundle["models"][head][model_kind]
+        if "res" in model:
+            return model["res"]
+        source = self.bundle["compact"]["source"]
+        with self._lock:
+            if self._full_bundle is None:
+                path = os.path.join(os.path.dirname(self.bundle_path), source["file"])
+                if file_fingerprint(path) != source["fingerprint"]:
+                    raise ValueError(f"{path} is not the pickle {self.bundle_path} was exported from")
+                with open(path, "rb") as f:
+                    self._full_bundle = pickle.load(f)
+        return self._full_bundle["models"][head][model_kind]["res"]
+
+    def best_model(self, head: str) -> str:
+        return best_model_by_mape(self.perf, head)
+
+    def exog_params(self, overrides: Optional[dict] = None) -> dict:
+        """Full ``build_future_exog`` parameters: dashboard defaults + overrides"""
+        params = {**DEFAULT_EXOG_PARAMS, "inflation_level": float(self.df_hist["inflation"].iloc[-1])}
+        params.update(overrides or {})
+        return params
+
+    def future_exog(self, head: str, horizon: int, exog_params: dict) -> pd.DataFrame:
+        """Scenario exog for one head's spec, continuing this engine's history"""
+        return build_future_exog(self.df_hist, horizon, self.bundle["models"][head]["spec"]["x"], **exog_params)
+
+    # ─── Single-head forecasts ───
+    def compute_forecast(
+        self, model_kind, head, horizon, exog_future: pd.DataFrame, n_sims=500, mc_mode="iid",
+        seed=MC_DEFAULT_SEED, crn=True, interval_method="bootstrap",
+    ) -> pd.DataFrame:
+        """Generate forecast with uncertainty intervals"""
+        bundle_head = self.bundle["models"][head]
+        exog_future = exog_future.sort_index().iloc[:horizon]
+
+        if model_kind == "ardl" and interval_method != "bootstrap":
+            kernel = bundle_head["ardl"]["kernel"]
+            return ardl_analytic_frame(
+                kernel.forecast(self.df_hist, exog_future), kernel.resid, kernel.ar_params, exog_future.index,
+                empirical=(interval_method == "analytic_empirical"),
+            )
+
+        elif model_kind == "arimax":
+            mean, se = bundle_head["arimax"]["kernel"].forecast(exog_future)
+            return gaussian_band_frame(mean, se, exog_future.index)
+
+        return self.compute_paths(
+            model_kind, head, horizon, exog_future, n_sims, mc_mode=mc_mode, seed=seed, crn=crn
+        ).bands()
+
+    def compute_paths(
+        self, model_kind, head, horizon, exog_future: pd.DataFrame, n_sims=500, mc_mode="iid",
+        seed=MC_DEFAULT_SEED, crn=True,
+    ) -> ForecastPaths:
+        """Simulate (n_sims, horizon) level paths for one head and model"""
+        rng = forecast_rng(seed, *path_stream_labels(model_kind, head, exog_future, crn))
+        return simulate_head_paths(
+            self.bundle["models"][head], self.df_hist, model_kind, horizon, exog_future, n_sims, mc_mode, rng
+        )
+
+    def store_key(self, kind, model_kind, head, horizon, exog_future: pd.DataFrame, **parts) -> str:
+        """Result-store key for one head/model forecast on this engine's history"""
+        if self.refresh_ardl and model_kind == "ardl":
+            parts["ardl_rls"] = True  # Refreshed coefficients are a different model
+        return result_key(
+            kind=kind,
+            engine=ENGINE_VERSION,
+            bundle=self.bundle_fp,
+            dataset=self.dataset_fp,
+            head=head,
+            model=model_kind,
+            horizon=int(horizon),
+            exog=dataset_fingerprint(exog_future),
+            **parts,
+        )
+
+    def paths_batch(self, tasks: Sequence[Dict]) -> List[ForecastPaths]:
+        """Paths for several head/model tasks; store misses run on the worker pool.
+
+        Each task holds the keyword arguments of ``compute_paths``. With
+        fewer than two misses (or no pool) the work stays in-process.
+        """
+        keys = [
+            self.store_key(
+                "paths", t["model_kind"], t["head"], t["horizon"], t["exog_future"],
+                n_sims=int(t["n_sims"]), mc_mode=t["mc_mode"], seed=int(t["seed"]), crn=bool(t["crn"]),
+            )
+            for t in tasks
+        ]
+        out = [None] * len(tasks)
+        misses = []
+        for i, key in enumerate(keys):
+            hit = self.store.get(key) if self.store is not None else None
+            if hit is not None:
+                out[i] = ForecastPaths.from_arrays(hit)
+            else:
+                misses.append(i)
+
+        computed = None
+        if self.pool is not None and len(misses) > 1:
+            try:
+                # Workers hold the base history and the kernels as trained;
+                # views send their history, and every task its current kernel
+                history = None if self._base is None else self.df_hist
+                models = self.bundle["models"]
+                computed = self.pool.map_paths(
+                    [{**tasks[i], "kernel": models[tasks[i]["head"]][tasks[i]["model_kind"]]["kernel"]} for i in misses],
+                    df_hist=history,
+                )
+            except BrokenProcessPool:
+                # A worker died: drop the pool and finish in-process from now on
+                log.warning("forecast pool broke; continuing serially")
+                self.pool.shutdown()
+                self.pool = None
+        if computed is None:
+            computed = [self.compute_paths(**tasks[i]) for i in misses]
+
+        for i, paths in zip(misses, computed):
+            t = tasks[i]
+            if self.store is not None:
+                self.store.put(
+                    keys[i],
+                    self.bundle_fp,
+                    paths.to_arrays(),
+                    meta={"head": t["head"], "model": t["model_kind"], "horizon": int(t["horizon"]), "n_sims": int(t["n_sims"])},
+                )
+            out[i] = paths
+        return out
+
+    def paths(
+        self, model_kind, head, horizon, exog_future: pd.DataFrame, n_sims=500, mc_mode="iid",
+        seed=MC_DEFAULT_SEED, crn=True,
+    ) -> ForecastPaths:
+        """Simulated level paths, served from the result store when available"""
+        task = dict(
+            model_kind=model_kind, head=head, horizon=horizon, exog_future=exog_future,
+            n_sims=n_sims, mc_mode=mc_mode, seed=seed, crn=crn,
+        )
+        return self.paths_batch([task])[0]
+
+    def forecast(
+        self, model_kind, head, horizon, exog_future: pd.DataFrame, n_sims=500, mc_mode="iid",
+        seed=MC_DEFAULT_SEED, crn=True, interval_method="bootstrap",
+    ) -> pd.DataFrame:
+        """Forecast with intervals, served from the result store when available"""
+        if model_kind == "enet" or (model_kind == "ardl" and interval_method == "bootstrap"):
+            # Simulated models: bands come straight from the stored paths
+            return self.paths(
+                model_kind, head, horizon, exog_future, n_sims, mc_mode=mc_mode, seed=seed, crn=crn
+            ).bands()
+
+        key = self.store_key("bands", model_kind, head, horizon, exog_future, interval_method=interval_method)
+        hit = self.store.get(key) if self.store is not None else None
+        if hit is not None:
+            return pd.DataFrame(
+                hit["values"],
+                index=pd.PeriodIndex(hit["years"], freq="Y"),
+                columns=[str(c) for c in hit["columns"]],
+            )
+
+        fc = self.compute_forecast(model_kind, head, horizon, exog_future, interval_method=interval_method)
+        if self.store is not None:
+            self.store.put(
+                key,
+                self.bundle_fp,
+                {
+                    "values": fc.to_numpy(dtype=float),
+                    "years": np.asarray(fc.index.year, dtype=int),
+                    "columns": np.asarray(fc.columns, dtype=str),
+                },
+                meta={"head": head, "model": model_kind, "horizon": int(horizon), "interval_method": interval_method},
+            )
+        return fc
+
+    def forecast_category(
+        self, model_kind, head, horizon, exog_params: dict, n_sims=500, mc_mode="iid",
+        seed=MC_DEFAULT_SEED, crn=True, interval_method="bootstrap",
+    ) -> pd.DataFrame:
+        """One head's forecast for a scenario given as ``build_future_exog`` parameters"""
+        return self.forecast(
+            model_kind, head, horizon, self.future_exog(head, horizon, exog_params), n_sims,
+            mc_mode=mc_mode, seed=seed, crn=crn, interval_method=interval_method,
+        )
+
+    # ─── Totals ───
+    def head_paths(
+        self, horizon, exog_params: dict, n_sims=500, mc_mode="iid", seed=MC_DEFAULT_SEED, crn=True,
+    ) -> Dict[str, ForecastPaths]:
+        """Best-model simulated paths per head; every total query derives from these"""
+        # One task per head; uncached heads simulate in parallel on the pool
+        tasks = [
+            dict(
+                model_kind=self.best_model(h), head=h, horizon=horizon,
+                exog_future=self.future_exog(h, horizon, exog_params),
+                n_sims=n_sims, mc_mode=mc_mode, seed=seed, crn=crn,
+            )
+            for h in TAX_HEADS
+        ]
+        return dict(zip(TAX_HEADS, self.paths_batch(tasks)))
+
+    def forecast_total(
+        self, horizon, exog_params: dict, n_sims=500, mc_mode="iid", seed=MC_DEFAULT_SEED, crn=True,
+    ) -> pd.DataFrame:
+        """Total forecast using best models.
+
+        Bands are quantiles of the path-wise sum across heads (quantiles do
+        not add), with heads simulated on independent streams. That treats
+        the heads' errors as independent although they share macro drivers,
+        so the bands are likely too narrow; callers label them with
+        ``TOTAL_BAND_BASIS``.
+        """
+        parts = self.head_paths(horizon, exog_params, n_sims, mc_mode=mc_mode, seed=seed, crn=crn)
+        return total_paths(parts.values()).bands()
+
+    # ─── Scenario analysis ───
+    def sweep(
+        self, model_kind, head, horizon, scenarios: Sequence[dict], n_sims=500, mc_mode="iid",
+        seed=MC_DEFAULT_SEED, interval_method="bootstrap",
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Scenario x year x band cube (bands ordered as SWEEP_BANDS) and its years.
+
+        All scenarios' exog is built as one stacked array and each model is
+        evaluated across the whole stack in one pass; only the first
+        scenario needs a full forecast with intervals. Draws are common
+        across scenarios.
+        """
+        bundle_head = self.bundle["models"][head]
+        stack = build_exog_stack(self.df_hist, horizon, bundle_head["spec"]["x"], scenarios)
+        base_bands = self.forecast(
+            model_kind, head, horizon, stack.frame(0), n_sims, mc_mode=mc_mode, seed=seed,
+            crn=True, interval_method=interval_method,
+        )
+        yhat_log = point_forecast_stack(bundle_head, self.df_hist, model_kind, stack)
+        return sweep_cube(yhat_log, base_bands), np.asarray(stack.index.year, dtype=int)
+
+    def forecast_batch(
+        self, model_kind, head, horizon, scenarios: Sequence[dict], n_sims=500, mc_mode="iid",
+        seed=MC_DEFAULT_SEED, interval_method="bootstrap",
+    ) -> List[pd.DataFrame]:
+        """``forecast_category`` for many scenarios of one head/model at once.
+
+        Requests sharing (head, model, settings) with common random numbers
+        differ only in their exog, so they are answered from one stacked
+        sweep rather than one simulation each.
+        """
+        cube, years = self.sweep(
+            model_kind, head, horizon, scenarios, n_sims, mc_mode=mc_mode, seed=seed,
+            interval_method=interval_method,
+        )
+        index = pd.PeriodIndex(years, freq="Y")
+        cols = ["yhat", "lo80", "hi80", "lo95", "hi95"]
+        return [pd.DataFrame(c, index=index, columns=list(SWEEP_BANDS))[cols] for c in cube]
+
+    def attribution(self, model_kind, head, horizon, exog_params: dict) -> DriverAttribution:
+        """Per-driver contributions, Jacobians and +/-1pp swings for one head"""
+        return driver_attribution(self.bundle["models"][head], self.df_hist, model_kind, horizon, exog_params)
+
+    def compare_ardl_intervals(self, head, horizon, exog_future: pd.DataFrame, seed=MC_DEFAULT_SEED) -> pd.DataFrame:
+        """Analytic ARDL bands next to a large bootstrap reference, gaps in %"""
+        boot = self.compute_forecast(
+            "ardl", head, horizon, exog_future, ARDL_VALIDATION_SIMS, mc_mode="iid", seed=seed,
+            interval_method="bootstrap",
+        )
+        normal = self.compute_forecast("ardl", head, horizon, exog_future, interval_method="analytic")
+        empirical = self.compute_forecast("ardl", head, horizon, exog_future, interval_method="analytic_empirical")
+        rows = []
+        for band in ["lo95", "lo80", "hi80", "hi95"]:
+            for year in boot.index:
+                b = boot.loc[year, band]
+                rows.append({
+                    "year": int(year.year),
+                    "band": band,
+                    "bootstrap": b,
+                    "analytic": normal.loc[year, band],
+                    "analytic_empirical": empirical.loc[year, band],
+                    "gap_analytic_pct": (normal.loc[year, band] / b - 1) * 100,
+                    "gap_empirical_pct": (empirical.loc[year, band] / b - 1) * 100,
+                })
+        return pd.DataFrame(rows)
@@ -0,0 +1,67 @@
+"""BundleRegistry: reloads only rebuild engines when artifacts change."""
+import os
+
+import pytest
+
+import bundle_registry
+from bundle_registry import BundleRegistry, RetiredVersion
+
+
+class FakeEngine:
+    def __init__(self, version):
+        self.version = version
+        self.dataset_fp = "base"
+        self.bundle = {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = tmp_path / "bundle.bin"
+    path.write_bytes(b"v1")
+    return path
+
+
+@pytest.fixture
+def registry(artifact, monkeypatch):
+    monkeypatch.setattr(bundle_registry, "validate_engine", lambda engine: None)
+    builds = []
+
+    def factory():
+        builds.append(artifact.read_bytes().decode())
+        return FakeEngine(builds[-1])
+
+    reg = BundleRegistry(factory, watch=[str(artifact)], keep=1)
+    reg.builds = builds
+    return reg
+
+
+def test_unchanged_files_do_not_build_an_engine(registry, artifact):
+    assert registry.current.version == "v1"
+    os.utime(artifact, ns=(0, 0))  # touched, same content
+    assert registry.reload() is False
+    assert registry.builds == ["v1"]
+
+
+def test_changed_files_swap_in_a_new_engine(registry, artifact):
+    old = registry.current
+    artifact.write_bytes(b"v2")
+    assert registry.reload() is True
+    assert registry.builds == ["v1", "v2"]
+    assert registry.current.version == "v2" and old.closed
+    assert registry.reload() is False
+    with pytest.raises(RetiredVersion):
+        registry.engine("v1")
+
+
+def test_failed_version_is_not_retried_until_files_change(registry, artifact, monkeypatch):
+    registry.current
+    monkeypatch.setattr(bundle_registry, "validate_engine", lambda engine: 1 / 0)
+    artifact.write_bytes(b"bad")
+    assert registry.reload() is False
+    assert registry.reload() is False
+    assert registry.builds == ["v1", "bad"]
+    assert registry.current.version == "v1"
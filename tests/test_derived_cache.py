@@ -0,0 +1,138 @@
+"""DerivedCache and VersionUsers: sharing, invalidation and retirement."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from derived_cache import DerivedCache, VersionUsers
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def blocking(value, started: threading.Event, release: threading.Event, calls: list):
+    def compute():
+        calls.append(value)
+        started.set()
+        assert release.wait(10)
+        return value
+    return compute
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = DerivedCache()
+    started, release, calls = threading.Event(), threading.Event(), []
+    compute = blocking({"v": 1}, started, release, calls)
+
+    with ThreadPoolExecutor(4) as ex:
+        leader = ex.submit(cache.get, "k", compute)
+        assert started.wait(10)
+        waiters = [ex.submit(cache.get, "k", compute) for _ in range(3)]
+        while cache.stats()["misses"] < 4:  # every waiter has joined the computation
+            time.sleep(0.01)
+        release.set()
+        results = [leader.result()] + [w.result() for w in waiters]
+
+    assert calls == [{"v": 1}]
+    assert results == [{"v": 1}] * 4
+    assert len({id(r) for r in results}) == 4  # each caller gets its own copy
+    assert cache.get("k", lambda: {"v": 2}) == {"v": 1}
+
+
+def test_failed_computation_reaches_every_waiter():
+    cache = DerivedCache()
+    started, release = threading.Event(), threading.Event()
+
+    def boom():
+        started.set()
+        assert release.wait(10)
+        raise RuntimeError("model failed")
+
+    with ThreadPoolExecutor(2) as ex:
+        leader = ex.submit(cache.get, "k", boom)
+        assert started.wait(10)
+        waiter = ex.submit(cache.get, "k", boom)
+        while cache.stats()["misses"] < 2:
+            time.sleep(0.01)
+        release.set()
+        for f in (leader, waiter):
+            with pytest.raises(RuntimeError):
+                f.result()
+    assert cache.stats()["entries"] == 0 and cache.stats()["in_flight"] == 0
+
+
+def test_write_invalidated_mid_computation_is_dropped():
+    cache = DerivedCache()
+    started, release, calls = threading.Event(), threading.Event(), []
+    deps = [("dataset", "d1")]
+
+    with ThreadPoolExecutor(1) as ex:
+        stale = ex.submit(cache.get, ("forecast", 1), blocking("old", started, release, calls), deps)
+        assert started.wait(10)
+        assert cache.invalidate(("dataset", "d1")) == 0
+        # Callers after the invalidation start afresh instead of joining
+        assert cache.get(("forecast", 1), lambda: "new", deps) == "new"
+        release.set()
+        assert stale.result() == "old"  # its own caller still gets it...
+
+    # ...but it never overwrites the fresh entry
+    assert cache.get(("forecast", 1), lambda: "recomputed", deps) == "new"
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_invalidated_computation_without_successor_stores_nothing():
+    cache = DerivedCache()
+    started, release, calls = threading.Event(), threading.Event(), []
+    deps = [("dataset", "d1")]
+
+    with ThreadPoolExecutor(1) as ex:
+        stale = ex.submit(cache.get, ("forecast", 1), blocking("old", started, release, calls), deps)
+        assert started.wait(10)
+        cache.invalidate(("dataset", "d1"))
+        release.set()
+        stale.result()
+
+    assert cache.get(("forecast", 1), lambda: "fresh", deps) == "fresh"
+    assert calls == ["old"]
+
+
+def test_shared_version_retired_when_last_user_leaves():
+    users = VersionUsers()
+    assert users.use("s1", "X") == []
+    assert users.use("s2", "X") == []
+    assert users.use("s1", "base") == []
+    assert users.users("X") == 1
+    assert users.use("s2", "base") == ["X"]
+    assert users.users("X") == 0
+
+
+def test_idle_session_version_is_retired():
+    clock = Clock()
+    users = VersionUsers(ttl=60, clock=clock)
+    users.use("idle", "X")
+    users.use("active", "base")
+
+    clock.now = 59
+    assert users.use("active", "base") == []
+    clock.now = 61
+    assert users.use("active", "base") == ["X"]
+    assert users.users("X") == 0
+
+    # The idle session coming back simply registers again
+    assert users.use("idle", "X") == []
+    assert users.users("X") == 1
+
+
+def test_idle_session_does_not_release_a_version_still_in_use():
+    clock = Clock()
+    users = VersionUsers(ttl=60, clock=clock)
+    users.use("idle", "X")
+    clock.now = 100
+    assert users.use("active", "X") == []
+    assert users.users("X") == 1
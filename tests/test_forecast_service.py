@@ -0,0 +1,103 @@
+"""Round trips against the forecast service on an ephemeral localhost port."""
+import http.client
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def server():
+    os.chdir(ROOT)
+    from forecast_service import make_server
+    from tax_forecaster import TaxForecaster
+
+    engine = TaxForecaster()
+    engine.bundle
+    srv = make_server(engine, "127.0.0.1", 0, window=0.2)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv.server_address[1]
+    srv.shutdown()
+    srv.server_close()
+
+
+def call(port, method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    try:
+        conn.request(method, path, body=None if body is None else json.dumps(body),
+                     headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        return resp.status, json.loads(resp.read())
+    finally:
+        conn.close()
+
+
+def forecast(port, exog_params, **extra):
+    body = {"head": "gst", "model": "ardl", "horizon": 3, "n_sims": 100, "exog_params": exog_params, **extra}
+    return call(port, "POST", "/forecast", body)
+
+
+def test_health(server):
+    status, body = call(server, "GET", "/health")
+    assert status == 200 and body["status"] == "ok"
+
+
+def test_forecast_and_total_round_trip(server):
+    status, body = forecast(server, {"cons_g": 11.0})
+    assert status == 200
+    assert len(body["years"]) == 3 and len(body["yhat"]) == 3
+    status, body = call(server, "POST", "/total", {"horizon": 2, "n_sims": 100})
+    assert status == 200 and len(body["yhat"]) == 2
+    assert body["band_basis"] == "independent_heads"
+
+
+def test_concurrent_requests_share_a_batch(server):
+    with ThreadPoolExecutor(2) as ex:
+        results = list(ex.map(lambda g: forecast(server, {"cons_g": g}), [9.0, 15.0]))
+    assert [status for status, _ in results] == [200, 200]
+    assert {body["batch_size"] for _, body in results} == {2}
+    assert results[0][1]["yhat"] != results[1][1]["yhat"]
+
+
+def test_bad_request_does_not_fail_its_batch(server):
+    with ThreadPoolExecutor(2) as ex:
+        good = ex.submit(forecast, server, {"cons_g": 10.0})
+        bad = ex.submit(forecast, server, {"gdp_nonagr_g": "abc"})
+        (good_status, good_body), (bad_status, bad_body) = good.result(), bad.result()
+    assert good_status == 200 and good_body["batch_size"] == 1
+    assert bad_status == 400 and "gdp_nonagr_g" in bad_body["error"]
+
+
+@pytest.mark.parametrize("crn", [True, False])
+def test_unknown_exog_key_rejected_on_both_paths(server, crn):
+    status, body = forecast(server, {"gdp_growth": 5.0}, crn=crn)
+    assert status == 400 and "gdp_growth" in body["error"]
+
+
+@pytest.mark.parametrize("params", [{"covid_on": "false"}, {"lsm_g": True}, {"lsm_g": None}])
+def test_exog_types_checked(server, params):
+    assert forecast(server, params)[0] == 400
+
+
+def test_crn_must_be_boolean(server):
+    assert forecast(server, {}, crn="false")[0] == 400
+    assert call(server, "POST", "/total", {"horizon": 2, "n_sims": 100, "crn": "false"})[0] == 400
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_bad_content_length_is_a_400(server, length):
+    conn = http.client.HTTPConnection("127.0.0.1", server, timeout=30)
+    try:
+        conn.putrequest("POST", "/forecast")
+        conn.putheader("Content-Length", length)
+        conn.endheaders()
+        resp = conn.getresponse()
+        assert resp.status == 400
+        assert "Content-Length" in json.loads(resp.read())["error"]
+    finally:
+        conn.close()
@@ -0,0 +1,108 @@
+"""HistoryBuffer: appended rows, growth, rebase and dataset versions."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_engine import dataset_fingerprint
+from history_buffer import HistoryBuffer
+
+
+def make_base(end=2024, n=4):
+    years = pd.PeriodIndex(range(end - n + 1, end + 1), freq="Y")
+    return pd.DataFrame(
+        {"log_gst": np.linspace(7.0, 7.6, n), "inflation": np.linspace(5.0, 8.0, n), "label": ["a"] * n},
+        index=years,
+    )
+
+
+def test_empty_buffer_is_the_base():
+    base = make_base()
+    buf = HistoryBuffer(base)
+    assert len(buf) == 0
+    assert buf.frame() is base
+    assert buf.fingerprint() == dataset_fingerprint(base)
+
+
+def test_append_fills_missing_columns_forward():
+    base = make_base()
+    buf = HistoryBuffer(base)
+    buf.append(2025, {"log_gst": 7.8})
+    buf.append(2026, {"inflation": 9.5})
+
+    frame = buf.frame()
+    assert list(frame.index.year) == [2021, 2022, 2023, 2024, 2025, 2026]
+    assert frame.loc[pd.Period(2025, "Y"), "inflation"] == base["inflation"].iloc[-1]
+    assert frame.loc[pd.Period(2025, "Y"), "label"] == "a"
+    assert frame.loc[pd.Period(2026, "Y"), "log_gst"] == 7.8
+    assert frame.loc[pd.Period(2026, "Y"), "inflation"] == 9.5
+    assert buf.years == (2025, 2026)
+
+
+def test_growth_past_capacity_keeps_every_row():
+    base = make_base()
+    buf = HistoryBuffer(base, capacity=2)
+    for i, year in enumerate(range(2025, 2032)):
+        buf.append(year, {"log_gst": 8.0 + i})
+
+    frame = buf.frame()
+    assert len(buf) == 7
+    assert list(frame.index.year[-7:]) == list(range(2025, 2032))
+    np.testing.assert_array_equal(frame["log_gst"].iloc[-7:], 8.0 + np.arange(7))
+    pd.testing.assert_frame_equal(frame.iloc[:len(base)], base)
+
+
+def test_rebase_replays_rows_on_the_new_base():
+    buf = HistoryBuffer(make_base())
+    buf.append(2025, {"log_gst": 7.8})
+    version = buf.version
+
+    new_base = make_base()
+    new_base["inflation"] += 1.0
+    new_base["extra"] = 3.0
+    buf.rebase(new_base)
+
+    frame = buf.frame()
+    assert buf.version > version
+    assert buf.years == (2025,)
+    assert frame.loc[pd.Period(2025, "Y"), "log_gst"] == 7.8
+    # A column the old base lacked is filled from the new base's last row
+    assert frame.loc[pd.Period(2025, "Y"), "extra"] == 3.0
+
+
+def test_rebase_on_the_same_base_is_a_no_op():
+    base = make_base()
+    buf = HistoryBuffer(base)
+    buf.append(2025, {})
+    version, frame = buf.version, buf.frame()
+    buf.rebase(base)
+    assert buf.version == version
+    assert buf.frame() is frame
+
+
+@pytest.mark.parametrize("change", ["append", "clear", "rebase"])
+def test_every_change_is_a_new_dataset_version(change):
+    base = make_base()
+    buf = HistoryBuffer(base)
+    buf.append(2025, {"log_gst": 7.8})
+    frame, fp, version = buf.frame(), buf.fingerprint(), buf.version
+    assert buf.frame() is frame  # materialised once per version
+
+    if change == "append":
+        buf.append(2026, {"log_gst": 7.9})
+    elif change == "clear":
+        buf.clear()
+    else:
+        buf.rebase(make_base(end=2023))
+
+    assert buf.version != version
+    assert buf.frame() is not frame
+    assert buf.fingerprint() != fp
+    assert buf.fingerprint() == dataset_fingerprint(buf.frame())
+
+
+def test_identical_rows_share_a_fingerprint():
+    base = make_base()
+    a, b = HistoryBuffer(base), HistoryBuffer(base)
+    for buf in (a, b):
+        buf.append(2025, {"log_gst": 7.8})
+    assert a.fingerprint() == b.fingerprint()